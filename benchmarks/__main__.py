@@ -0,0 +1,142 @@
+"""
+Times the parts of a render on the bundled samples and on generated scenes.
+
+    python -m benchmarks run [--quick] [--filter TEXT] [--output FILE]
+    python -m benchmarks compare BASELINE CURRENT [--threshold 0.1]
+
+`run` prints a table, and writes the results as JSON (one entry per
+benchmark, with every timing in seconds) if `--output` is given. `compare`
+reads two of those files, and exits with 1 if any benchmark got slower by
+more than the threshold.
+"""
+from __future__ import annotations
+
+from .suite import benchmarks
+
+import scrivid
+
+import argparse
+import datetime
+import json
+import os
+from pathlib import Path
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+
+RESULTS_VERSION = 1
+
+
+def _time(function, *, repeat: int, max_time: float) -> list[float]:
+    # At least one run; more, up to `repeat`, while under `max_time` seconds.
+    times = []
+    started = time.perf_counter()
+    while len(times) < repeat:
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+        if time.perf_counter() - started > max_time:
+            break
+    return times
+
+
+def _environment() -> dict[str, object]:
+    return {
+        "scrivid": scrivid.__version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def run(arguments) -> int:
+    results = {}
+    print(f"{'benchmark':<48} {'runs':>5} {'min':>10} {'median':>10}")
+
+    for benchmark in benchmarks():
+        if arguments.quick and not benchmark.quick:
+            continue
+        if arguments.filter and arguments.filter not in benchmark.name:
+            continue
+
+        with tempfile.TemporaryDirectory(prefix=".scrivid-benchmark-") as directory:
+            directory = Path(directory)
+            instructions, metadata = [], None
+            if benchmark.scene is not None:
+                instructions, metadata = benchmark.scene.load(directory)
+            function = benchmark.prepare(instructions, metadata, directory)
+            times = _time(function, repeat=arguments.repeat, max_time=arguments.max_time)
+
+        results[benchmark.name] = {
+            "group": benchmark.group,
+            "scene": None if benchmark.scene is None else benchmark.scene.name,
+            "params": {} if benchmark.scene is None else benchmark.scene.params,
+            "times": times,
+            "min": min(times),
+            "median": statistics.median(times)
+        }
+        print(f"{benchmark.name:<48} {len(times):>5} {min(times):>10.4f} {statistics.median(times):>10.4f}")
+
+    if arguments.output is not None:
+        document = {
+            "version": RESULTS_VERSION,
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "environment": _environment(),
+            "results": results
+        }
+        Path(arguments.output).write_text(json.dumps(document, indent=2))
+    return 0
+
+
+def compare(arguments) -> int:
+    baseline = json.loads(Path(arguments.baseline).read_text())["results"]
+    current = json.loads(Path(arguments.current).read_text())["results"]
+
+    slower = 0
+    print(f"{'benchmark':<48} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name in sorted(baseline.keys() & current.keys()):
+        # The minimum is the least noisy measure of how fast the code can go.
+        before, after = baseline[name]["min"], current[name]["min"]
+        ratio = after / before if before > 0 else float("inf")
+        flag = ""
+        if ratio > 1 + arguments.threshold:
+            flag = "  slower"
+            slower += 1
+        elif ratio < 1 - arguments.threshold:
+            flag = "  faster"
+        print(f"{name:<48} {before:>10.4f} {after:>10.4f} {ratio:>7.2f}{flag}")
+
+    for name in sorted(baseline.keys() ^ current.keys()):
+        print(f"{name:<48} only in {'baseline' if name in baseline else 'current'}")
+    return 1 if slower else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--quick", action="store_true", help="only the samples and the smallest scenes")
+    run_parser.add_argument("--filter", help="only the benchmarks whose name contains this text")
+    run_parser.add_argument("--output", "-o", help="the JSON file to write the results to")
+    run_parser.add_argument("--repeat", type=int, default=5, help="the most runs of each benchmark")
+    run_parser.add_argument("--max-time", type=float, default=10.0, help="stop repeating after this many seconds")
+    run_parser.set_defaults(function=run)
+
+    compare_parser = subparsers.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="the ratio that counts as a change")
+    compare_parser.set_defaults(function=compare)
+
+    arguments = parser.parse_args(argv)
+    return arguments.function(arguments)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import scrivid
+
+import importlib.util
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from typing import Any
+
+
+SAMPLES_DIRECTORY = Path(__file__).absolute().parent.parent / "tests" / "samples"
+SAMPLE_NAMES = ("empty", "figure_eight", "image_drawing", "overlap", "slide")
+
+
+class Scene:
+    """ A set of instructions to benchmark, built lazily by `load`. """
+    __slots__ = ("_loader", "name", "params")
+
+    def __init__(self, name: str, loader: Callable[[Path], tuple[list, scrivid.Metadata]], params: dict[str, Any]):
+        self._loader = loader
+        self.name = name
+        self.params = params
+
+    def __repr__(self):
+        name = self.name
+        return f"{self.__class__.__name__}({name=})"
+
+    def load(self, directory: Path) -> tuple[list, scrivid.Metadata]:
+        instructions, metadata = self._loader(directory)
+        metadata.save_location = directory
+        return list(instructions), metadata
+
+
+def _load_sample(name: str) -> Callable[[Path], tuple[list, scrivid.Metadata]]:
+    def loader(_):
+        spec = importlib.util.spec_from_file_location(f"benchmark_sample_{name}", SAMPLES_DIRECTORY / f"{name}.py")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module.ALL()
+    return loader
+
+
+def sample_scenes() -> list[Scene]:
+    return [Scene(name, _load_sample(name), {"sample": name}) for name in SAMPLE_NAMES]
+
+
+def _synthetic(
+        references: int,
+        adjustments: int,
+        frames: int,
+        window_size: tuple[int, int],
+        seed: int
+) -> Callable[[Path], tuple[list, scrivid.Metadata]]:
+    def loader(_):
+        instructions = scrivid.testing.generate_scene(references, adjustments, frames, window_size, seed)
+        metadata = scrivid.Metadata(frame_rate=12, video_name="benchmark", window_size=window_size)
+        return instructions, metadata
+    return loader
+
+
+def synthetic_scene(
+        name: str,
+        *,
+        references: int,
+        adjustments: int,
+        frames: int,
+        window_size: tuple[int, int],
+        seed: int = 0
+) -> Scene:
+    params = {
+        "references": references,
+        "adjustments": adjustments,
+        "frames": frames,
+        "window_size": list(window_size),
+        "seed": seed
+    }
+    return Scene(name, _synthetic(references, adjustments, frames, window_size, seed), params)
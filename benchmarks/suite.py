@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+from .scenes import sample_scenes, synthetic_scene
+
+import scrivid
+from scrivid import properties
+from scrivid._frame_plan import FrameKind
+from scrivid._frame_program import compile_program, ProgramRunner
+from scrivid._memory import AssetCache, MemoryBudget
+from scrivid._rendering import CanvasPool, draw_on_frame, draw_placements, evaluate_frame
+from scrivid._separating_instructions import separate_instructions
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .scenes import Scene
+
+    from collections.abc import Callable
+    from pathlib import Path
+
+
+MERGE_COUNT = 10_000
+
+
+class Benchmark:
+    """
+    One function to time, on one scene. `prepare` does the setup that is not
+    timed, and returns the function that is.
+    """
+    __slots__ = ("group", "prepare", "quick", "scene")
+
+    def __init__(
+            self,
+            group: str,
+            scene: Scene | None,
+            prepare: Callable[[list, scrivid.Metadata, Path], Callable[[], object]],
+            *,
+            quick: bool
+    ):
+        self.group = group
+        self.prepare = prepare
+        self.quick = quick
+        self.scene = scene
+
+    def __repr__(self):
+        name = self.name
+        return f"{self.__class__.__name__}({name=})"
+
+    @property
+    def name(self) -> str:
+        if self.scene is None:
+            return self.group
+        return f"{self.group}[{self.scene.name}]"
+
+
+def _prepare_separate_instructions(instructions, metadata, directory):
+    return lambda: separate_instructions(instructions)
+
+
+def _prepare_parse(instructions, metadata, directory):
+    separated_instructions = separate_instructions(instructions)
+    return lambda: scrivid.motion_tree.parse(separated_instructions)
+
+
+def _prepare_parse_uncached(instructions, metadata, directory):
+    return lambda: scrivid.motion_tree.parse(instructions)
+
+
+def _prepare_parse_cache_hit(instructions, metadata, directory):
+    # Parsing the same adjustments again, as when a template is rendered with
+    # other images; compare with `parse_uncached`.
+    cache = scrivid.motion_tree.ParseCache()
+    scrivid.motion_tree.parse(instructions, cache=cache)
+    return lambda: scrivid.motion_tree.parse(instructions, cache=cache)
+
+
+def _prepare_properties_merge(instructions, metadata, directory):
+    # The same merge that is done for every adjustment of every frame.
+    base = properties.create(layer=1, scale=1, x=0, y=0)
+    change = properties.Properties(x=1, y=-1)
+    mode = properties.MergeMode.REVERSE_APPEND
+
+    def merge():
+        merged = base
+        for _ in range(MERGE_COUNT):
+            merged = merged.merge(change, mode=mode)
+        return merged
+    return merge
+
+
+def _parse(instructions):
+    separated_instructions = separate_instructions(instructions)
+    return separated_instructions, scrivid.motion_tree.parse(separated_instructions)
+
+
+def _program(instructions):
+    separated_instructions, parsed_motion_tree = _parse(instructions)
+    return compile_program(parsed_motion_tree, separated_instructions)
+
+
+def _middle_drawn_frame(program) -> tuple[int, list]:
+    # The index and placements of the drawn frame in the middle of the video.
+    middle = program.drawn_frame_count // 2
+    runner = ProgramRunner(program)
+    drawn = 0
+    for span in runner:
+        if span.kind is not FrameKind.DRAW:
+            continue
+        if drawn == middle:
+            return span.index, runner.placements()
+        drawn += 1
+    raise ValueError("The program draws no frames.")
+
+
+def _prepare_compile_program(instructions, metadata, directory):
+    separated_instructions, parsed_motion_tree = _parse(instructions)
+    return lambda: compile_program(parsed_motion_tree, separated_instructions)
+
+
+def _prepare_evaluate(instructions, metadata, directory):
+    # Runs the frame program through the video, getting the placements of
+    # every drawn frame, like the render does.
+    program = _program(instructions)
+
+    def evaluate():
+        runner = ProgramRunner(program)
+        for span in runner:
+            if span.kind is FrameKind.DRAW:
+                runner.placements()
+    return evaluate
+
+
+def _prepare_composite(instructions, metadata, directory):
+    # Draws the placements of one frame from the middle of the video, with
+    # its images already decoded.
+    index, placements = _middle_drawn_frame(_program(instructions))
+    budget = MemoryBudget()
+    assets = AssetCache(budget)
+    pool = CanvasPool(metadata.window_size, budget=budget)
+
+    def composite():
+        canvas = pool.acquire(index)
+        draw_placements(canvas, placements, assets)
+        pool.release(canvas)
+
+    composite()
+    return composite
+
+
+# The object path that renders used before frame programs: the state of every
+# reference is worked out again for the frame, then drawn layer by layer.
+# These are kept only to compare against; renders no longer run them.
+
+
+def _prepare_legacy_evaluate(instructions, metadata, directory):
+    # Every drawn frame, like `evaluate`.
+    separated_instructions = separate_instructions(instructions)
+    drawn = [index for span in _program(instructions).spans() if span.kind is FrameKind.DRAW for index in span]
+
+    def evaluate():
+        for index in drawn:
+            evaluate_frame(index, separated_instructions)
+    return evaluate
+
+
+def _prepare_legacy_composite(instructions, metadata, directory):
+    separated_instructions = separate_instructions(instructions)
+    index, _ = _middle_drawn_frame(_program(instructions))
+    layer_reference = evaluate_frame(index, separated_instructions)
+    budget = MemoryBudget()
+    assets = AssetCache(budget)
+    pool = CanvasPool(metadata.window_size, budget=budget)
+
+    def composite():
+        canvas = pool.acquire(index)
+        draw_on_frame(canvas, layer_reference, assets)
+        pool.release(canvas)
+
+    composite()
+    return composite
+
+
+def _prepare_compile_video(instructions, metadata, directory):
+    return lambda: scrivid.compile_video(instructions, metadata, sink=scrivid.sinks.NullSink())
+
+
+def _scaled_scenes() -> dict[str, list[Scene]]:
+    return {
+        "references": [
+            synthetic_scene(f"references-{n}", references=n, adjustments=2 * n, frames=48, window_size=(320, 240))
+            for n in (10, 100, 1000)
+        ],
+        # A reference has at most one adjustment a frame, so the largest of
+        # these needs more frames than the others.
+        "adjustments": [
+            synthetic_scene(
+                f"adjustments-{n}", references=50, adjustments=n, frames=max(48, n // 50), window_size=(320, 240)
+            )
+            for n in (100, 1000, 10_000)
+        ],
+        "frames": [
+            synthetic_scene(f"frames-{n}", references=10, adjustments=40, frames=n, window_size=(320, 240))
+            for n in (24, 240, 2400)
+        ],
+        "resolution": [
+            synthetic_scene(
+                f"resolution-{width}x{height}", references=10, adjustments=20, frames=24, window_size=(width, height)
+            )
+            for width, height in ((320, 240), (1280, 720), (1920, 1080))
+        ]
+    }
+
+
+def benchmarks() -> list[Benchmark]:
+    """
+    Every benchmark, in the order they're run. The ones marked `quick` run on
+    the samples and the smallest generated scenes only.
+    """
+    samples = sample_scenes()
+    scaled = _scaled_scenes()
+    smallest = [scenes[0] for scenes in scaled.values()]
+    every_scene = samples + [scene for scenes in scaled.values() for scene in scenes]
+    # Rendering every frame of the largest scenes takes minutes, pixel by
+    # pixel; those are only composited a frame at a time.
+    rendered_scenes = samples + [scene for scenes in scaled.values() for scene in scenes[:2]]
+
+    suite = [Benchmark("properties_merge", None, _prepare_properties_merge, quick=True)]
+    for group, prepare, scenes in (
+            ("separate_instructions", _prepare_separate_instructions, every_scene),
+            ("parse", _prepare_parse, every_scene),
+            ("parse_uncached", _prepare_parse_uncached, every_scene),
+            ("parse_cache_hit", _prepare_parse_cache_hit, every_scene),
+            ("compile_program", _prepare_compile_program, every_scene),
+            ("evaluate", _prepare_evaluate, every_scene),
+            ("composite", _prepare_composite, every_scene),
+            ("legacy_evaluate", _prepare_legacy_evaluate, every_scene),
+            ("legacy_composite", _prepare_legacy_composite, every_scene),
+            ("compile_video", _prepare_compile_video, rendered_scenes)
+    ):
+        for scene in scenes:
+            quick = scene in samples or scene in smallest
+            suite.append(Benchmark(group, scene, prepare, quick=quick))
+    return suite
@@ -1,5 +1,7 @@
-from . import adjustments, errors, file_access, motion_tree, properties, qualms
+from . import adjustments, errors, file_access, frame_store, motion_tree, progress, properties, qualms, sinks, testing
 from ._file_objects import create_image_reference, ImageFileReference, ImageReference
+from ._planning import plan, RenderPlan
+from ._statistics import FrameStatistics, RenderStatistics, StageTime
 from ._version import __version__, __version_tuple__
 from ._video_crafting import compile_video
 from .metadata import Metadata
@@ -7,5 +9,7 @@ from .metadata import Metadata
 
 __all__ = [
     "__version__", "__version_tuple__", "adjustments", "compile_video", "create_image_reference", "errors",
-    "file_access", "ImageFileReference", "ImageReference", "Metadata", "motion_tree", "properties", "qualms"
+    "file_access", "frame_store", "FrameStatistics", "ImageFileReference", "ImageReference", "Metadata",
+    "motion_tree", "plan", "progress", "properties", "qualms", "RenderPlan", "RenderStatistics", "sinks",
+    "StageTime", "testing"
 ]
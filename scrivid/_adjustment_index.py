@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+from . import adjustments
+
+import bisect
+import heapq
+import operator
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .abc import Adjustment
+
+    from collections.abc import Hashable, Iterable, Sequence
+    from typing import TypeAlias
+
+    MoveAdjustment: TypeAlias = adjustments.core.MoveAdjustment
+    VisibilityAdjustment: TypeAlias = adjustments.core.HideAdjustment | adjustments.core.ShowAdjustment
+
+    # (start, end, order, adjustment), where `order` is the position of the
+    # adjustment in the merged timeline.
+    INTERVAL: TypeAlias = tuple[int, int, int, MoveAdjustment]
+
+
+class _IntervalNode:
+    """
+    A node of a centered interval tree: the intervals that contain `center`,
+    sorted both by their start and by their end, and the subtrees of the
+    intervals that end before it and start after it.
+    """
+    __slots__ = ("by_end", "by_start", "center", "left", "right")
+
+    def __init__(self, intervals: list[INTERVAL]):
+        endpoints = sorted(point for start, end, _, _ in intervals for point in (start, end - 1))
+        self.center = center = endpoints[len(endpoints) // 2]
+
+        here, left, right = [], [], []
+        for interval in intervals:
+            if interval[1] <= center:
+                left.append(interval)
+            elif interval[0] > center:
+                right.append(interval)
+            else:
+                here.append(interval)
+
+        self.by_end = sorted(here, key=operator.itemgetter(1), reverse=True)
+        self.by_start = sorted(here, key=operator.itemgetter(0))
+        self.left = _IntervalNode(left) if left else None
+        self.right = _IntervalNode(right) if right else None
+
+    def overlapping(self, start: int, stop: int, found: list[INTERVAL]):
+        node = self
+        while node is not None:
+            center = node.center
+            if stop <= center:
+                # Every interval here ends after the center, so it overlaps if
+                # it starts before `stop`.
+                for interval in node.by_start:
+                    if interval[0] >= stop:
+                        break
+                    found.append(interval)
+                node = node.left
+            elif start > center:
+                # Likewise, every interval here starts at or before the
+                # center, so it overlaps if it ends after `start`.
+                for interval in node.by_end:
+                    if interval[1] <= start:
+                        break
+                    found.append(interval)
+                node = node.right
+            else:
+                found.extend(node.by_start)
+                if node.left is not None:
+                    node.left.overlapping(start, stop, found)
+                node = node.right
+
+
+class _IntervalTree:
+    __slots__ = ("_root",)
+
+    def __init__(self, intervals: list[INTERVAL]):
+        self._root = _IntervalNode(intervals) if intervals else None
+
+    def overlapping(self, start: int, stop: int) -> list[INTERVAL]:
+        found = []
+        if self._root is not None and start < stop:
+            self._root.overlapping(start, stop, found)
+        return found
+
+
+def _sorted_adjustments(found: Iterable[INTERVAL]) -> list[MoveAdjustment]:
+    return [interval[3] for interval in sorted(found, key=operator.itemgetter(2))]
+
+
+class AdjustmentIndex:
+    """
+    An index over the adjustments of a set of instructions, for asking which
+    adjustments affect a reference at a given time. Each query takes
+    O(log n + k) time, for n adjustments and k results.
+
+    A `MoveAdjustment` is in progress over the frames
+    `[activation_time, activation_time + duration)`; a `HideAdjustment` or
+    `ShowAdjustment` lasts until the next one of the same reference. Results
+    are in the order that the motion tree has them: by activation time, then
+    by the order in which the IDs were first seen.
+    """
+    __slots__ = ("_adjustments", "_all_moves", "_moves", "_times", "_visibility", "_visibility_times")
+
+    _adjustments: dict[Hashable, list[Adjustment]]
+    _all_moves: _IntervalTree
+    _moves: dict[Hashable, _IntervalTree]
+    _times: dict[Hashable, list[int]]
+    _visibility: dict[Hashable, list[VisibilityAdjustment]]
+    _visibility_times: dict[Hashable, list[int]]
+
+    def __init__(self, adjustments_: dict[Hashable, Sequence[Adjustment]]):
+        self._adjustments = {}
+        self._times = {}
+        self._visibility = {}
+        self._visibility_times = {}
+
+        every_move = []
+        moves = {ID: [] for ID in adjustments_}
+        merged = heapq.merge(*adjustments_.values(), key=operator.attrgetter("activation_time"))
+        for order, adjustment in enumerate(merged):
+            ID = adjustment.ID
+            time = adjustment.activation_time
+            self._adjustments.setdefault(ID, []).append(adjustment)
+            self._times.setdefault(ID, []).append(time)
+
+            adjustment_type = type(adjustment)
+            if adjustment_type is adjustments.core.MoveAdjustment:
+                interval = (time, time + max(adjustment.duration, 1), order, adjustment)
+                every_move.append(interval)
+                moves[ID].append(interval)
+            elif adjustment_type in (adjustments.core.HideAdjustment, adjustments.core.ShowAdjustment):
+                self._visibility.setdefault(ID, []).append(adjustment)
+                self._visibility_times.setdefault(ID, []).append(time)
+
+        self._all_moves = _IntervalTree(every_move)
+        self._moves = {ID: _IntervalTree(intervals) for ID, intervals in moves.items() if intervals}
+
+    def __repr__(self):
+        ids = len(self._adjustments)
+        return f"{self.__class__.__name__}({ids=}, adjustments={len(self)})"
+
+    def __len__(self):
+        return sum(len(value) for value in self._adjustments.values())
+
+    def active(self, time: int, ID: Hashable | None = None) -> list[MoveAdjustment]:
+        """ The moves that are in progress on frame `time`, of one ID or all of them. """
+        return self.overlapping(time, time + 1, ID)
+
+    def applied(self, ID: Hashable, time: int) -> list[Adjustment]:
+        """ Every adjustment of `ID` that has started by frame `time`, in order. """
+        times = self._times.get(ID)
+        if times is None:
+            return []
+        return self._adjustments[ID][:bisect.bisect_right(times, time)]
+
+    def overlapping(self, start: int, stop: int, ID: Hashable | None = None) -> list[MoveAdjustment]:
+        """ The moves that are in progress on any frame in `[start, stop)`. """
+        if ID is None:
+            tree = self._all_moves
+        else:
+            tree = self._moves.get(ID)
+            if tree is None:
+                return []
+        return _sorted_adjustments(tree.overlapping(start, stop))
+
+    def visibility(self, ID: Hashable, time: int) -> VisibilityAdjustment | None:
+        """ The last `HideAdjustment` or `ShowAdjustment` of `ID` by frame `time`, if any. """
+        times = self._visibility_times.get(ID)
+        if times is None:
+            return None
+        position = bisect.bisect_right(times, time)
+        if position == 0:
+            return None
+        return self._visibility[ID][position - 1]
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from . import errors
+
+import subprocess
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .progress import CancellationToken
+
+    from pathlib import Path
+
+
+# How often a running ffmpeg process is checked for cancellation.
+_POLL_SECONDS = 0.1
+
+
+def raw_input_arguments(window_size: tuple[int, int], frame_rate: int, source: str | Path) -> list[str]:
+    return [
+        "-f", "rawvideo",
+        "-pix_fmt", "rgb24",
+        "-s", f"{window_size[0]}x{window_size[1]}",
+        "-framerate", str(frame_rate),
+        "-i", str(source)
+    ]
+
+
+def command(
+        executable: str,
+        input_arguments: list[str],
+        output_file: str | Path,
+        *,
+        bit_rate: str,
+        codec: str,
+        window_size: tuple[int, int]
+) -> list[str]:
+    # I honest to god could not tell you how I figured this out. I just
+    # couldn't figure out how to make a stable result for the life of me.
+    return [
+        executable,
+        "-y", "-loglevel", "error",
+        *input_arguments,  # # # # # # # # # # # # INPUT SETTINGS
+        "-b:v", bit_rate,  # # # # # # # # # # # # OUTPUT SETTINGS
+        "-vcodec", codec,
+        "-pix_fmt", "yuv420p",
+        "-s", f"{window_size[0]}x{window_size[1]}",
+        str(output_file)
+    ]
+
+
+def _kill(process: subprocess.Popen):
+    process.kill()
+    process.communicate()
+    raise errors.CancelledError("The render was cancelled while ffmpeg was running.")
+
+
+def wait(process: subprocess.Popen, cancellation: CancellationToken | None = None) -> int:
+    """ Waits for the process to exit, killing it if the render is cancelled. """
+    if cancellation is None:
+        return process.wait()
+
+    while True:
+        try:
+            return process.wait(timeout=_POLL_SECONDS)
+        except subprocess.TimeoutExpired:
+            if cancellation.is_cancelled:
+                _kill(process)
+
+
+def run(command_: list[str], cancellation: CancellationToken | None = None):
+    try:
+        process = subprocess.Popen(command_, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        while True:
+            try:
+                stdout, stderr = process.communicate(timeout=_POLL_SECONDS)
+                break
+            except subprocess.TimeoutExpired:
+                if cancellation is not None and cancellation.is_cancelled:
+                    _kill(process)
+    except subprocess.SubprocessError as exc:
+        raise errors.InternalErrorFromFFMPEG(exc, exc.stdout, exc.stderr)
+
+    if process.returncode != 0:
+        raise errors.InternalErrorFromFFMPEG(
+            subprocess.CalledProcessError(process.returncode, command_), stdout, stderr
+        )
@@ -41,6 +41,15 @@ class ImageFileReference:
             + ")"
         )
 
+    def __getstate__(self):
+        # The opened file is left behind; the copy is opened again if needed.
+        return self._file
+
+    def __setstate__(self, state):
+        self._file = state
+        self._file_handler = None
+        self._pixel_handler = None
+
     @property
     def is_opened(self):
         return self._file_handler is not None
@@ -63,6 +72,13 @@ class ImageFileReference:
         else:
             return self._pixel_handler.__getitem__(coordinates)
 
+    def read_header(self) -> tuple[tuple[int, int], str]:
+        """ Reads the (size, mode) of the image, without decoding it. """
+        if self.is_opened:
+            return self._file_handler.size, self._file_handler.mode
+        with Image.open(self._file) as image:
+            return image.size, image.mode
+
     def open(self):
         if self._file_handler is not None:
             return
@@ -107,6 +123,13 @@ class ImageReference:
     def __hash__(self):
         return hash(self._ID)
 
+    def __getstate__(self):
+        return self._ID, self._file, self._properties
+
+    def __setstate__(self, state):
+        self._ID, self._file, self._properties = state
+        self._finalizer = weakref.finalize(self, call_close, self._file)
+
     # I'm allowing both lowercase and uppercase 'ID' access, since I'm
     # primarily using the uppercase equivalent to prevent name shadowing.
     @property
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from . import motion_tree
+
+import enum
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from typing import TypeAlias
+
+    # Either a parsed tree, or the stream of nodes from `motion_tree.iterparse`.
+    MotionTree: TypeAlias = motion_tree.VideoInstructions | Iterable[motion_tree.MOTION_NODES]
+
+
+class FrameKind(enum.Enum):
+    DRAW = enum.auto()
+    HOLD = enum.auto()
+
+
+class FrameSpan:
+    """
+    A run of consecutive frames of the same kind: either frames that need to
+    be drawn, or frames that repeat the previously drawn frame.
+    """
+    __slots__ = ("index", "kind", "length")
+
+    def __init__(self, index: int, length: int, kind: FrameKind):
+        self.index = index
+        self.kind = kind
+        self.length = length
+
+    def __repr__(self):
+        index = self.index
+        length = self.length
+        kind = self.kind
+        return f"{self.__class__.__name__}({index=}, {length=}, {kind=})"
+
+    def __eq__(self, other):
+        if not isinstance(other, FrameSpan):
+            return NotImplemented
+        return (self.index, self.length, self.kind) == (other.index, other.length, other.kind)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(self.index, self.end))
+
+    @property
+    def end(self) -> int:
+        return self.index + self.length
+
+
+def _coalesce(spans: Iterator[FrameSpan]) -> Iterator[FrameSpan]:
+    pending = None
+    for span in spans:
+        if pending is None:
+            pending = span
+        elif pending.kind is span.kind and pending.end == span.index:
+            pending.length += span.length
+        else:
+            yield pending
+            pending = span
+    if pending is not None:
+        yield pending
+
+
+def _node_kinds(parsed_motion_tree: MotionTree) -> Iterator[tuple[type, int]]:
+    # The type and length of every node; a ColumnarBody has them without
+    # making the nodes.
+    body = getattr(parsed_motion_tree, "body", parsed_motion_tree)
+    if isinstance(body, motion_tree.ColumnarBody):
+        return body.kinds()
+    return ((type(node), getattr(node, "length", 0)) for node in body)
+
+
+def _spans(parsed_motion_tree: MotionTree) -> Iterator[FrameSpan]:
+    index = 0
+    next_undrawn = 0  # The index following the last drawn frame.
+
+    def draw(start, stop):
+        nonlocal next_undrawn
+        if start > next_undrawn:
+            yield FrameSpan(next_undrawn, start - next_undrawn, FrameKind.HOLD)
+        yield FrameSpan(start, stop - start, FrameKind.DRAW)
+        next_undrawn = stop
+
+    for type_, length in _node_kinds(parsed_motion_tree):
+        if type_ is motion_tree.Start:
+            yield from draw(0, 1)
+        elif type_ in (motion_tree.HideImage, motion_tree.MoveImage, motion_tree.ShowImage):
+            if index == next_undrawn - 1:
+                continue
+            yield from draw(index, index + 1)
+        elif type_ is motion_tree.InvokePrevious:
+            start = index
+            if index == next_undrawn - 1:
+                start += 1
+            index += length
+            if start < index:
+                yield from draw(start, index)
+        elif type_ is motion_tree.Continue:
+            index += length
+        elif type_ is motion_tree.End:
+            break
+
+    # The frames after the last drawn frame repeat it until the end.
+    if index > next_undrawn:
+        yield FrameSpan(next_undrawn, index - next_undrawn, FrameKind.HOLD)
+
+
+def plan_frames(parsed_motion_tree: MotionTree) -> Iterator[FrameSpan]:
+    """
+    Lazily describes every frame of the video as a series of spans, in order,
+    without allocating anything for the frames themselves.
+    """
+    return _coalesce(_spans(parsed_motion_tree))
+
+
+def count_frames(parsed_motion_tree: MotionTree) -> int:
+    return frame_totals(parsed_motion_tree)[0]
+
+
+def frame_totals(parsed_motion_tree: MotionTree) -> tuple[int, int]:
+    """ Returns the number of frames in the video, and how many are drawn. """
+    frame_count = drawn_frame_count = 0
+    for span in plan_frames(parsed_motion_tree):
+        frame_count = span.end
+        if span.kind is FrameKind.DRAW:
+            drawn_frame_count += span.length
+    return frame_count, drawn_frame_count
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+from . import adjustments, properties
+from ._frame_plan import _coalesce, FrameKind, FrameSpan, plan_frames
+from ._rendering import evaluate_properties
+
+from array import array
+import heapq
+import operator
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ._file_objects.images import ImageReference
+    from .abc import Adjustment
+    from ._separating_instructions import SeparatedInstructions
+    from .motion_tree import VideoInstructions
+
+    from collections.abc import Hashable, Iterator
+
+
+# The opcodes of a frame program, each followed by its operands:
+# - SET slot layer x y: the reference in `slot` is visible, at (x, y) on
+#   `layer`;
+# - HIDE slot: the reference in `slot` is hidden;
+# - DRAW index: frame `index` is drawn from the current state;
+# - HOLD length: the last drawn frame is repeated for `length` frames.
+SET, HIDE, DRAW, HOLD = range(4)
+OPERAND_COUNTS = (4, 1, 1, 1)
+
+
+class FrameProgram:
+    """
+    A motion tree lowered into a flat array of opcodes, which says which
+    references change before each drawn frame, and which frames are held.
+    Nothing about the timeline has to be worked out again to render it; a
+    worker that only draws some of the frames still runs the SET and HIDE
+    opcodes of the frames it skips, which are cheap.
+
+    :ivar code: The opcodes and their operands, as signed 64-bit integers.
+    :ivar drawn_frame_count: The number of DRAW opcodes.
+    :ivar frame_count: The number of frames in the video.
+    :ivar references: The references, indexed by their slot.
+    """
+    __slots__ = ("code", "drawn_frame_count", "frame_count", "references")
+
+    code: array[int]
+    drawn_frame_count: int
+    frame_count: int
+    references: list[ImageReference]
+
+    def __init__(self, references: list[ImageReference]):
+        self.code = array("q")
+        self.drawn_frame_count = 0
+        self.frame_count = 0
+        self.references = references
+
+    def __repr__(self):
+        frame_count = self.frame_count
+        drawn_frame_count = self.drawn_frame_count
+        size = len(self.code)
+        return f"{self.__class__.__name__}({frame_count=}, {drawn_frame_count=}, {size=})"
+
+    def _emit(self, *words: int):
+        self.code.extend(words)
+
+    def instructions(self) -> Iterator[tuple[int, ...]]:
+        """ Yields every opcode, as a tuple with its operands. """
+        code = self.code
+        position = 0
+        while position < len(code):
+            opcode = code[position]
+            end = position + 1 + OPERAND_COUNTS[opcode]
+            yield tuple(code[position:end])
+            position = end
+
+    def spans(self) -> Iterator[FrameSpan]:
+        """ The frames as a series of drawn and held spans, like `plan_frames`. """
+        return _coalesce(_program_spans(self))
+
+
+def _program_spans(program: FrameProgram) -> Iterator[FrameSpan]:
+    index = 0
+    for instruction in program.instructions():
+        opcode = instruction[0]
+        if opcode == DRAW:
+            index = instruction[1]
+            yield FrameSpan(index, 1, FrameKind.DRAW)
+            index += 1
+        elif opcode == HOLD:
+            yield FrameSpan(index, instruction[1], FrameKind.HOLD)
+            index += instruction[1]
+
+
+def _state_of(properties_: properties.Properties) -> tuple[int, int, int] | None:
+    # Like `draw_on_frame`, which draws the layers from 0 up, a reference on a
+    # negative layer is never drawn.
+    if properties_.visibility is properties.VisibilityStatus.HIDE or properties_.layer < 0:
+        return None
+    return properties_.layer, properties_.x, properties_.y
+
+
+def _is_complete(adjustment: Adjustment, index: int) -> bool:
+    # Whether the adjustment is in full effect on the frame, and stays so.
+    if type(adjustment) is not adjustments.core.MoveAdjustment:
+        return True
+    return index - adjustment.activation_time >= adjustment.duration
+
+
+def compile_program(parsed_motion_tree: VideoInstructions, split_instructions: SeparatedInstructions) -> FrameProgram:
+    """
+    Compiles the motion tree into a FrameProgram. Before each drawn frame,
+    only the references that have an adjustment starting, or a move in
+    progress, since the previous drawn frame are worked out again; the
+    adjustments of a reference that are already in full effect are merged
+    into its properties once, rather than again for every frame.
+
+    The adjustments are merged in the order they started, like
+    `evaluate_frame`: a finished adjustment is kept in progress until every
+    adjustment that started before it has finished too, since a move that
+    changes the visibility only does so once it's done, and must not
+    override a show or hide that started after it.
+    """
+    references = split_instructions.references
+    adjustment_index = split_instructions.index
+    slots: dict[Hashable, int] = {ID: slot for slot, ID in enumerate(references)}
+    states: list[tuple[int, int, int] | None] = [None] * len(slots)
+    program = FrameProgram(list(references.values()))
+    # The properties of each reference, with the adjustments that are in
+    # full effect merged in; the adjustments from the first move still in
+    # progress on; and the number of its adjustments that have been seen.
+    committed = [reference._properties for reference in program.references]
+    in_progress = [[] for _ in slots]
+    seen_counts = [0] * len(slots)
+
+    pending = heapq.merge(
+        *split_instructions.adjustments.values(), key=operator.attrgetter("activation_time")
+    )
+    upcoming = next(pending, None)
+    previous = None
+
+    for span in plan_frames(parsed_motion_tree):
+        program.frame_count = span.end
+        if span.kind is FrameKind.HOLD:
+            program._emit(HOLD, span.length)
+            continue
+
+        for index in span:
+            if previous is None:
+                changed = set(slots.values())
+            else:
+                changed = {
+                    slots[move.ID] for move in adjustment_index.overlapping(previous, index) if move.ID in slots
+                }
+            while upcoming is not None and upcoming.activation_time <= index:
+                if upcoming.ID in slots:
+                    changed.add(slots[upcoming.ID])
+                upcoming = next(pending, None)
+
+            for slot in sorted(changed):
+                applied = adjustment_index.applied(program.references[slot].ID, index)
+                started = in_progress[slot] + applied[seen_counts[slot]:]
+                seen_counts[slot] = len(applied)
+
+                # Only the adjustments before the first one still in progress
+                # are merged in, so that they're all merged in the order they
+                # started (a move only sets the visibility once it's done).
+                complete = 0
+                while complete < len(started) and _is_complete(started[complete], index):
+                    complete += 1
+                if complete:
+                    committed[slot] = evaluate_properties(committed[slot], started[:complete], index)
+                    started = started[complete:]
+                in_progress[slot] = started
+
+                state = _state_of(evaluate_properties(committed[slot], started, index))
+                if state == states[slot]:
+                    continue
+                states[slot] = state
+                if state is None:
+                    program._emit(HIDE, slot)
+                else:
+                    program._emit(SET, slot, *state)
+
+            program._emit(DRAW, index)
+            program.drawn_frame_count += 1
+            previous = index
+
+    return program
+
+
+class ProgramRunner:
+    """
+    Runs a FrameProgram. Iterating over it yields a FrameSpan for every DRAW
+    and HOLD opcode, after the SET and HIDE opcodes before them have been
+    applied; `placements` is the state to draw for the last DRAW.
+    """
+    __slots__ = ("_states", "program")
+
+    _states: dict[int, tuple[int, int, int]]
+    program: FrameProgram
+
+    def __init__(self, program: FrameProgram):
+        self._states = {}
+        self.program = program
+
+    def __iter__(self) -> Iterator[FrameSpan]:
+        code = self.program.code
+        states = self._states
+        index = 0
+        position = 0
+        end = len(code)
+
+        while position < end:
+            opcode = code[position]
+            if opcode == SET:
+                states[code[position + 1]] = (code[position + 2], code[position + 3], code[position + 4])
+                position += 5
+            elif opcode == HIDE:
+                states.pop(code[position + 1], None)
+                position += 2
+            elif opcode == DRAW:
+                index = code[position + 1]
+                position += 2
+                yield FrameSpan(index, 1, FrameKind.DRAW)
+                index += 1
+            else:
+                length = code[position + 1]
+                position += 2
+                yield FrameSpan(index, length, FrameKind.HOLD)
+                index += length
+
+    def placements(self) -> list[tuple[ImageReference, int, int]]:
+        """
+        The visible references and their positions, in the order they're
+        drawn: by layer, then in the order the references were given.
+        """
+        references = self.program.references
+        ordered = sorted(self._states.items(), key=lambda item: (item[1][0], item[0]))
+        return [(references[slot], x, y) for slot, (_, x, y) in ordered]
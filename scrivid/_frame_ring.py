@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from multiprocessing.context import BaseContext
+
+
+EMPTY = -1
+
+
+class FrameRing:
+    """
+    A ring of frame-sized slots in shared memory, written to by the render
+    workers and read from by the process that feeds the sink, so that frames
+    are never pickled between processes.
+
+    The drawn frames are numbered in order, and the n-th drawn frame always
+    goes into slot `n % slot_count`. Each slot records the index of the frame
+    that is allowed to be written into it next (its 'turn'), and whether that
+    frame has been written yet. A worker waits for its frame's turn before
+    writing; the reader waits for the frame to be written, then hands the slot
+    over to the frame that is `slot_count` drawn frames later.
+    """
+    __slots__ = ("_condition", "_memory", "_ready", "_turn", "frame_size", "slot_count")
+
+    def __init__(self, slot_count: int, frame_size: int, context: BaseContext):
+        self._condition = context.Condition()
+        self._memory = shared_memory.SharedMemory(create=True, size=slot_count * frame_size)
+        self._ready = context.RawArray("b", slot_count)
+        self._turn = context.RawArray("q", [EMPTY] * slot_count)
+        self.frame_size = frame_size
+        self.slot_count = slot_count
+
+    def __getstate__(self):
+        return self._condition, self._memory.name, self._ready, self._turn, self.frame_size, self.slot_count
+
+    def __setstate__(self, state):
+        self._condition, name, self._ready, self._turn, self.frame_size, self.slot_count = state
+        self._memory = shared_memory.SharedMemory(name=name)
+
+    def _wait(self, predicate: Callable[[], bool], check: Callable[[], None]):
+        # `check` is called periodically while waiting, so that the waiting
+        # side can bail out if the other side has failed.
+        with self._condition:
+            while not predicate():
+                check()
+                self._condition.wait(0.1)
+
+    def slot(self, position: int) -> memoryview:
+        offset = (position % self.slot_count) * self.frame_size
+        return self._memory.buf[offset:offset + self.frame_size]
+
+    def assign(self, position: int, index: int):
+        """ Sets the first frame index to be written to a slot. """
+        self._turn[position % self.slot_count] = index
+
+    def wait_writable(self, position: int, index: int, check: Callable[[], None]) -> memoryview:
+        slot = position % self.slot_count
+        self._wait(lambda: self._turn[slot] == index and not self._ready[slot], check)
+        return self.slot(position)
+
+    def publish(self, position: int):
+        with self._condition:
+            self._ready[position % self.slot_count] = 1
+            self._condition.notify_all()
+
+    def wait_readable(self, position: int, index: int, check: Callable[[], None]) -> memoryview:
+        slot = position % self.slot_count
+        self._wait(lambda: self._turn[slot] == index and self._ready[slot], check)
+        return self.slot(position)
+
+    def release(self, position: int, next_index: int):
+        """ Hands the slot over to the frame `next_index` (or EMPTY). """
+        with self._condition:
+            slot = position % self.slot_count
+            self._ready[slot] = 0
+            self._turn[slot] = next_index
+            self._condition.notify_all()
+
+    def close(self):
+        self._memory.close()
+
+    def unlink(self):
+        self._memory.unlink()
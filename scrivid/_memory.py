@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+from . import errors
+
+from collections import OrderedDict
+from copy import copy
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ._file_objects.images import ImageReference
+    from .file_access import FileAccess
+
+    from collections.abc import Hashable
+
+
+# Pillow keeps the pixels of most modes in 4 bytes (RGB is padded to RGBX);
+# only the single-byte modes are stored as they are.
+_SINGLE_BYTE_MODES = ("1", "L", "P")
+
+
+def decoded_size(size: tuple[int, int], mode: str) -> int:
+    return size[0] * size[1] * (1 if mode in _SINGLE_BYTE_MODES else 4)
+
+
+def read_header(reference: ImageReference) -> tuple[tuple[int, int], str]:
+    file = reference._file
+    if hasattr(file, "read_header"):
+        return file.read_header()
+
+    # Other FileAccess objects have no way to peek at the image, so it has to
+    # be opened.
+    was_opened = reference.is_opened
+    if not was_opened:
+        reference.open()
+    try:
+        return (reference.get_image_width(), reference.get_image_height()), "RGB"
+    finally:
+        if not was_opened:
+            reference.close()
+
+
+def _opened_size(file: FileAccess) -> int:
+    if hasattr(file, "read_header"):
+        return decoded_size(*file.read_header())
+    return decoded_size((file.get_image_width(), file.get_image_height()), "RGB")
+
+
+class MemoryBudget:
+    """
+    Counts the bytes held by each part of a render (decoded images, canvases,
+    frame buffers) against an optional limit. A limit of None is unbounded.
+    """
+    __slots__ = ("_usage", "limit", "peak")
+
+    _usage: dict[str, int]
+    limit: int | None
+    peak: int
+
+    def __init__(self, limit: int | None = None):
+        self._usage = {}
+        self.limit = limit
+        self.peak = 0
+
+    def __repr__(self):
+        limit = self.limit
+        usage = self.usage
+        peak = self.peak
+        return f"{self.__class__.__name__}({limit=}, {usage=}, {peak=})"
+
+    @property
+    def usage(self) -> int:
+        return sum(self._usage.values())
+
+    def usage_of(self, category: str) -> int:
+        return self._usage.get(category, 0)
+
+    def fits(self, size: int) -> bool:
+        """ Whether `size` more bytes can be held without going over the limit. """
+        return self.limit is None or self.usage + size <= self.limit
+
+    def charge(self, category: str, size: int):
+        self._usage[category] = self._usage.get(category, 0) + size
+        self.peak = max(self.peak, self.usage)
+
+    def release(self, category: str, size: int):
+        self._usage[category] -= size
+
+
+class AssetCache:
+    """
+    Keeps the decoded images between frames, so that an image is not decoded
+    again for every frame it's drawn on. The images are counted against a
+    MemoryBudget; when a new image does not fit, the least recently used
+    images are closed to make room for it. An image that does not fit on its
+    own is still decoded, but closed again as soon as the next one is asked
+    for.
+    """
+    __slots__ = ("_budget", "_entries", "_transient", "evictions", "hits", "misses")
+
+    _entries: OrderedDict[Hashable, tuple[FileAccess, int]]
+    _transient: tuple[FileAccess, int] | None
+
+    def __init__(self, budget: MemoryBudget):
+        self._budget = budget
+        self._entries = OrderedDict()
+        self._transient = None
+        self.evictions = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        hits = self.hits
+        misses = self.misses
+        evictions = self.evictions
+        return f"{self.__class__.__name__}({hits=}, {misses=}, {evictions=})"
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _close_transient(self):
+        if self._transient is None:
+            return
+        file, size = self._transient
+        file.close()
+        self._budget.release("assets", size)
+        self._transient = None
+
+    def _evict(self):
+        _, (file, size) = self._entries.popitem(last=False)
+        file.close()
+        self._budget.release("assets", size)
+        self.evictions += 1
+
+    def get(self, reference: ImageReference) -> FileAccess:
+        """ The opened file of the reference, decoding it if it is not kept. """
+        self._close_transient()
+
+        ID = reference.ID
+        entry = self._entries.get(ID)
+        if entry is not None:
+            self._entries.move_to_end(ID)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        # The references that are drawn are copies, which close their file
+        # once they are collected; the cache keeps a file of its own.
+        file = copy(reference._file)
+        file.open()
+        size = _opened_size(file)
+
+        while self._entries and not self._budget.fits(size):
+            self._evict()
+
+        fits = self._budget.fits(size)
+        self._budget.charge("assets", size)
+        if fits:
+            self._entries[ID] = (file, size)
+        else:
+            self._transient = (file, size)
+        return file
+
+    def close(self):
+        self._close_transient()
+        while self._entries:
+            _, (file, size) = self._entries.popitem(last=False)
+            file.close()
+            self._budget.release("assets", size)
+
+
+def fit_to_limit(
+        memory_limit: int,
+        window_size: tuple[int, int],
+        largest_asset: int,
+        *,
+        workers: int,
+        queue_depth: int
+) -> tuple[int, int]:
+    """
+    Fits a render under `memory_limit`, by reducing the number of frames
+    queued between the workers and the sink. Returns the queue depth, and
+    the limit for the memory of each render process (which is what is left
+    for its decoded images, canvases and frame buffers).
+
+    Raises errors.AttributeError if the limit is too small for even one frame
+    in flight.
+    """
+    frame_size = window_size[0] * window_size[1] * 3
+    if workers == 1:
+        # The template, the canvas being drawn, and the bytes handed to the
+        # sink.
+        required = 2 * decoded_size(window_size, "RGB") + frame_size + largest_asset
+    else:
+        # One queued frame, plus a background and an image for every worker.
+        required = frame_size + workers * (frame_size + largest_asset)
+
+    if memory_limit < required:
+        raise errors.AttributeError(
+            f"`memory_limit` of {memory_limit} bytes is less than the {required} bytes that the render needs."
+        )
+
+    if workers == 1:
+        return queue_depth, memory_limit
+
+    # The frames queued past the first take at most half of the memory to
+    # spare; the rest is left to the workers, to keep their images decoded.
+    spare = memory_limit - required
+    queue_depth = min(queue_depth, 1 + spare // 2 // frame_size)
+    return queue_depth, (memory_limit - queue_depth * frame_size) // workers
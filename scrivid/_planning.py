@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+from . import _scene_store, errors, motion_tree
+from ._frame_plan import FrameKind, plan_frames
+from ._memory import decoded_size, fit_to_limit, read_header
+from ._rendering import evaluate_frame
+from ._separating_instructions import separate_instructions
+from ._video_crafting import _check_concurrency_settings, _check_memory_limit
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ._file_objects.images import ImageReference
+    from ._separating_instructions import SeparatedInstructions
+    from .abc import Adjustment
+    from .metadata import Metadata
+
+    from collections.abc import Hashable, Iterable, Iterator
+    from typing import Any, TypeAlias
+
+    INSTRUCTIONS: TypeAlias = ImageReference | Adjustment
+
+
+class RenderPlan:
+    """
+    A summary of the work that `compile_video` would do for a set of
+    instructions, worked out without rendering anything. Returned by `plan`.
+
+    :ivar frame_count: The total number of frames in the video.
+    :ivar drawn_frame_count: The number of frames that get drawn; the rest
+        repeat the frame before them.
+    :ivar unique_frame_count: The number of drawn frames that differ from
+        every other drawn frame.
+    :ivar held_spans: The (index, length) of every run of held frames.
+    :ivar pixels_per_frame: The number of pixels composited on each drawn
+        frame, by frame index.
+    :ivar asset_sizes: The size, in bytes, of every decoded image, by ID.
+    :ivar canvas_size: The size, in bytes, of one canvas.
+    :ivar peak_memory: The estimated peak memory of the render, in bytes.
+    """
+
+    __slots__ = (
+        "asset_sizes", "canvas_size", "drawn_frame_count", "frame_count", "held_spans", "peak_memory",
+        "pixels_per_frame", "unique_frame_count"
+    )
+
+    asset_sizes: dict[Hashable, int]
+    canvas_size: int
+    drawn_frame_count: int
+    frame_count: int
+    held_spans: list[tuple[int, int]]
+    peak_memory: int
+    pixels_per_frame: dict[int, int]
+    unique_frame_count: int
+
+    def __init__(self):
+        self.asset_sizes = {}
+        self.canvas_size = 0
+        self.drawn_frame_count = 0
+        self.frame_count = 0
+        self.held_spans = []
+        self.peak_memory = 0
+        self.pixels_per_frame = {}
+        self.unique_frame_count = 0
+
+    def __repr__(self):
+        frame_count = self.frame_count
+        drawn_frame_count = self.drawn_frame_count
+        unique_frame_count = self.unique_frame_count
+        peak_memory = self.peak_memory
+
+        return f"{self.__class__.__name__}({frame_count=}, {drawn_frame_count=}, {unique_frame_count=}, {peak_memory=})"
+
+    @property
+    def composited_pixels(self) -> int:
+        """ The total number of pixels composited over the whole render. """
+        return sum(self.pixels_per_frame.values())
+
+    @property
+    def max_pixels_per_frame(self) -> int:
+        return max(self.pixels_per_frame.values(), default=0)
+
+
+def _estimate_peak_memory(
+        render_plan: RenderPlan,
+        frame_size: int,
+        workers: int,
+        queue_depth: int,
+        process_limit: int | None
+) -> int:
+    assets = sum(render_plan.asset_sizes.values())
+
+    if workers == 1:
+        # The template, the canvas being drawn, and the bytes handed to the
+        # sink.
+        fixed = 2 * render_plan.canvas_size + frame_size
+        if process_limit is not None:
+            assets = min(assets, process_limit - fixed)
+        return assets + fixed
+
+    # Every worker decodes its own copy of the images and keeps a background
+    # to clear the slots with; the slots themselves are shared.
+    if process_limit is not None:
+        assets = min(assets, process_limit - frame_size)
+    return workers * (assets + frame_size) + queue_depth * frame_size
+
+
+def _visible_rows(
+        separated_instructions: SeparatedInstructions,
+        indices: list[int]
+) -> Iterator[list[tuple[Hashable, Any, Any, Any, Any]]]:
+    # The (ID, layer, x, y, scale) of every visible reference on each frame;
+    # from a SceneStore if NumPy is installed and the scene fits in one.
+    if _scene_store.is_available():
+        try:
+            store = _scene_store.SceneStore(separated_instructions)
+        except errors.TypeError:
+            pass
+        else:
+            return (state.rows() for state in store.states(indices))
+
+    return (
+        [
+            (reference.ID, layer, reference.x, reference.y, reference.scale)
+            for layer, references in evaluate_frame(index, separated_instructions).items()
+            for reference in references
+        ]
+        for index in indices
+    )
+
+
+def plan(
+        instructions: Iterable[INSTRUCTIONS],
+        metadata: Metadata,
+        *,
+        workers: int = 1,
+        chunk_size: int | None = None,
+        queue_depth: int | None = None,
+        memory_limit: int | None = None
+) -> RenderPlan:
+    """
+    Works out how much work compiling the instructions into a video would
+    take, without rendering it. The images are not decoded, only their
+    headers are read.
+
+    :param instructions: A list (or any other iterable, such as a generator)
+        of instances of ImageReference's, and/or a class of the Adjustment
+        hierarchy.
+    :param metadata: An instance of Metadata that stores the attributes
+        of the video.
+    :param workers: See `compile_video`; used to estimate the peak memory.
+    :param chunk_size: See `compile_video`.
+    :param queue_depth: See `compile_video`; used to estimate the peak memory.
+    :param memory_limit: See `compile_video`; the estimated peak memory takes
+        the images that would be evicted to stay under it into account.
+    """
+    metadata._validate()
+    _, queue_depth = _check_concurrency_settings(workers, chunk_size, queue_depth)
+    _check_memory_limit(memory_limit)
+
+    separated_instructions = separate_instructions(instructions)
+    parsed_motion_tree = motion_tree.parse(separated_instructions)
+    render_plan = RenderPlan()
+
+    image_sizes = {}
+    for ID, reference in separated_instructions.references.items():
+        size, mode = read_header(reference)
+        image_sizes[ID] = size[0] * size[1]
+        render_plan.asset_sizes[ID] = decoded_size(size, mode)
+
+    width, height = metadata.window_size
+    render_plan.canvas_size = decoded_size(metadata.window_size, "RGB")
+
+    drawn_indices = []
+    for span in plan_frames(parsed_motion_tree):
+        render_plan.frame_count = span.end
+        if span.kind is FrameKind.HOLD:
+            render_plan.held_spans.append((span.index, span.length))
+        else:
+            drawn_indices.extend(span)
+
+    fingerprints = set()
+    for index, rows in zip(drawn_indices, _visible_rows(separated_instructions, drawn_indices)):
+        fingerprints.add(frozenset((layer, ID, x, y, scale) for ID, layer, x, y, scale in rows))
+        render_plan.pixels_per_frame[index] = sum(image_sizes[row[0]] for row in rows)
+        render_plan.drawn_frame_count += 1
+
+    render_plan.unique_frame_count = len(fingerprints)
+
+    process_limit = None
+    if memory_limit is not None:
+        queue_depth, process_limit = fit_to_limit(
+            memory_limit, metadata.window_size, max(render_plan.asset_sizes.values(), default=0),
+            workers=workers, queue_depth=queue_depth
+        )
+    render_plan.peak_memory = _estimate_peak_memory(
+        render_plan, width * height * 3, workers, queue_depth, process_limit
+    )
+    return render_plan
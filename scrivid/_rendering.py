@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+from . import adjustments, properties
+from ._memory import decoded_size, MemoryBudget
+from ._statistics import FrameStatistics
+
+from copy import deepcopy
+import itertools
+from typing import TYPE_CHECKING
+
+from PIL import Image
+
+if TYPE_CHECKING:
+    from ._file_objects.images import ImageReference
+    from ._frame_program import ProgramRunner
+    from ._memory import AssetCache
+    from ._statistics import RenderStatistics
+    from ._separating_instructions import SeparatedInstructions
+    from .abc import Adjustment
+
+    from collections.abc import Sequence
+
+
+BACKGROUND = (255, 255, 255)
+
+# Resolved once, since every reference is merged with it on every frame.
+_merge_adjustments = properties._MERGE_ALL_FUNCTIONS[properties.MergeMode.REVERSE_APPEND]
+
+
+class FrameCanvas:
+    __slots__ = ("_canvas", "_pixel_canvas", "index")
+
+    def __init__(self, index: int, canvas: Image.Image):
+        self._canvas = canvas
+        self._pixel_canvas = self._canvas.load()
+        self.index = index
+
+    @property
+    def image(self) -> Image.Image:
+        return self._canvas
+
+    def set_pixel(self, coordinates: tuple[int, int], pixel_value: tuple[int, int, int]):
+        # TODO: Implement behaviour for when the coordinates has a negative
+        # value, to simply return instead of trying to draw it, since a 
+        # negative value draws on the other side, but not vice versa.
+        try:
+            self._pixel_canvas.__setitem__(coordinates, pixel_value)
+        except IndexError:
+            pass
+
+
+class SlotCanvas:
+    """
+    A canvas that draws straight into the raw RGB bytes of a FrameRing slot,
+    for the render workers.
+    """
+    __slots__ = ("_height", "_slot", "_width", "index")
+
+    def __init__(self, index: int, slot: memoryview, window_size: tuple[int, int]):
+        self._height = window_size[1]
+        self._slot = slot
+        self._width = window_size[0]
+        self.index = index
+
+    def set_pixel(self, coordinates: tuple[int, int], pixel_value: tuple[int, int, int]):
+        # This mirrors the pixel access of FrameCanvas, where a negative
+        # coordinate wraps around to the other side once.
+        x, y = coordinates
+        if x < 0:
+            x += self._width
+        if y < 0:
+            y += self._height
+        if not (0 <= x < self._width and 0 <= y < self._height):
+            return
+
+        offset = (y * self._width + x) * 3
+        self._slot[offset:offset + 3] = bytes(pixel_value[:3])
+
+
+class CanvasPool:
+    """
+    Keeps the canvas buffers that are no longer in use, so that they can be
+    reused instead of allocating a new image for every frame. A reused buffer
+    is cleared by copying the pre-filled background template over it.
+
+    The canvases are counted against a MemoryBudget, if given; a released
+    buffer is not kept while the budget is over its limit.
+    """
+    __slots__ = ("_budget", "_canvas_size", "_capacity", "_free", "_template")
+
+    _free: list[Image.Image]
+
+    def __init__(
+            self,
+            window_size: tuple[int, int],
+            *,
+            capacity: int = 2,
+            background=BACKGROUND,
+            budget: MemoryBudget | None = None
+    ):
+        if budget is None:
+            budget = MemoryBudget()
+
+        self._budget = budget
+        self._canvas_size = decoded_size(window_size, "RGB")
+        self._capacity = capacity
+        self._free = []
+        self._template = Image.new("RGB", window_size, background)
+        self._budget.charge("canvases", self._canvas_size)
+
+    def acquire(self, index: int) -> FrameCanvas:
+        try:
+            canvas = self._free.pop()
+        except IndexError:
+            self._budget.charge("canvases", self._canvas_size)
+            return FrameCanvas(index, self._template.copy())
+
+        canvas.paste(self._template, (0, 0))
+        return FrameCanvas(index, canvas)
+
+    def release(self, canvas: FrameCanvas):
+        if len(self._free) < self._capacity and self._budget.fits(0):
+            self._free.append(canvas.image)
+        else:
+            canvas.image.close()
+            self._budget.release("canvases", self._canvas_size)
+
+    def close(self):
+        for canvas in self._free:
+            canvas.close()
+        self._budget.release("canvases", self._canvas_size * (len(self._free) + 1))
+        self._free.clear()
+        self._template.close()
+
+
+def _composite(canvas: FrameCanvas | SlotCanvas, image, ref_x: int, ref_y: int) -> int:
+    width = image.get_image_width()
+    height = image.get_image_height()
+
+    for x, y in itertools.product(range(ref_x, ref_x + width), range(ref_y, ref_y + height)):
+        canvas.set_pixel((x, y), image.get_pixel_value((x - ref_x, y - ref_y)))
+    return width * height
+
+
+def _open_image(reference: ImageReference, assets: AssetCache | None):
+    if assets is not None:
+        return assets.get(reference)
+    if not reference.is_opened:
+        reference.open()
+    return reference
+
+
+def draw_on_frame(canvas: FrameCanvas | SlotCanvas, references_dict, assets: AssetCache | None = None) -> int:
+    # The images are taken from `assets` if given, otherwise each reference
+    # opens its own file. Returns the number of pixels composited.
+    try:
+        highest_layer = max(references_dict) + 1
+    except ValueError:
+        return 0
+
+    pixels = 0
+
+    for index in range(highest_layer):
+        if index not in references_dict:
+            continue
+
+        references = references_dict[index]
+        for reference in references:
+            image = _open_image(reference, assets)
+            pixels += _composite(canvas, image, reference.x, reference.y)
+
+    return pixels
+
+
+def draw_placements(
+        canvas: FrameCanvas | SlotCanvas,
+        placements: list[tuple[ImageReference, int, int]],
+        assets: AssetCache | None = None
+) -> int:
+    # Draws each (reference, x, y) in order, ignoring the position of the
+    # reference itself. Returns the number of pixels composited.
+    pixels = 0
+    for reference, x, y in placements:
+        pixels += _composite(canvas, _open_image(reference, assets), x, y)
+    return pixels
+
+
+def _invoke_adjustment_duration(index: int, adj: Adjustment):
+    # Assume that the `adj` has a 'duration' attribute.
+    duration = index - adj.activation_time
+    if duration > adj.duration:
+        return adj.duration
+    else:
+        return duration
+
+
+def evaluate_properties(
+        properties_: properties.Properties,
+        applied: Sequence[Adjustment],
+        index: int
+) -> properties.Properties:
+    # Merges the adjustments that have started by the frame into the
+    # properties of a reference, in order, in one batch.
+    move_type = adjustments.core.MoveAdjustment
+    return _merge_adjustments(properties_, [
+        adj._enact(_invoke_adjustment_duration(index, adj)) if type(adj) is move_type else adj._enact()
+        for adj in applied
+    ])
+
+
+def evaluate_frame(index: int, split_instructions: SeparatedInstructions) -> dict[int, set[ImageReference]]:
+    # Works out the state of every reference on the frame, returning the
+    # visible references sorted by layer.
+    adjustment_index = split_instructions.index
+    layer_reference = {}
+
+    for ID, reference in split_instructions.references.items():
+        reference = deepcopy(reference)  # Avoid modifying the original object.
+        reference._properties = evaluate_properties(reference._properties, adjustment_index.applied(ID, index), index)
+
+        if reference.visibility is properties.VisibilityStatus.HIDE:
+            continue
+
+        layer = reference.layer
+        if layer not in layer_reference:
+            layer_reference[layer] = set()
+
+        layer_reference[layer].add(reference)
+
+    return layer_reference
+
+
+def create_frame(
+        canvas: FrameCanvas | SlotCanvas,
+        runner: ProgramRunner,
+        assets: AssetCache | None = None,
+        statistics: RenderStatistics | None = None
+):
+    # Draws the current state of a frame program onto the canvas.
+    if statistics is None:
+        draw_placements(canvas, runner.placements(), assets)
+        return
+
+    index = canvas.index
+    with statistics._span(f"frame {index}", frame=index):
+        with statistics._stage("evaluate", frame=index):
+            placements = runner.placements()
+
+        hits, misses = (assets.hits, assets.misses) if assets is not None else (0, 0)
+        with statistics._stage("composite", frame=index):
+            pixels = draw_placements(canvas, placements, assets)
+    if assets is not None:
+        hits, misses = assets.hits - hits, assets.misses - misses
+
+    statistics.frames.append(FrameStatistics(index, len(placements), pixels, hits, misses))
@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+from . import adjustments, errors, properties
+
+from typing import TYPE_CHECKING
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+if TYPE_CHECKING:
+    from ._separating_instructions import SeparatedInstructions
+
+    from collections.abc import Hashable, Iterable, Iterator
+
+
+EXCLUDED = properties.EXCLUDED
+
+# The visibility of a reference or an adjustment, as a number.
+_VISIBILITIES = (EXCLUDED, properties.VisibilityStatus.HIDE, properties.VisibilityStatus.SHOW,
+                 properties.VisibilityStatus.UNKNOWN)
+_VISIBILITY_CODES = {visibility: code for code, visibility in enumerate(_VISIBILITIES)}
+_HIDDEN = _VISIBILITY_CODES[properties.VisibilityStatus.HIDE]
+
+# The kinds of adjustment.
+HIDE, SHOW, MOVE = range(3)
+
+
+def is_available() -> bool:
+    """ Whether NumPy, which a SceneStore needs, is installed. """
+    return numpy is not None
+
+
+def _check_int(value, what: str) -> bool:
+    # Whether the value is set; raises errors.TypeError if it's set to
+    # something that the integer columns can't hold.
+    if value is EXCLUDED:
+        return False
+    if type(value) is not int:
+        raise errors.TypeError(f"A SceneStore can only hold integer {what}, got {value!r}.")
+    return True
+
+
+class SceneState:
+    """
+    The state of every reference of a SceneStore on one frame, as columns
+    indexed by slot. Where a reference has no value for `layer`, `x` or `y`
+    (it's `properties.EXCLUDED`), the column holds 0; `rows` gives the
+    values as they'd be on the references.
+
+    :ivar index: The index of the frame.
+    :ivar layer: The layer of every reference.
+    :ivar visible: Whether every reference is drawn (that is, not hidden).
+    :ivar x: The x position of every reference.
+    :ivar y: The y position of every reference.
+    """
+    __slots__ = ("_store", "index", "layer", "visible", "x", "y")
+
+    def __init__(self, store: SceneStore, index: int, layer, visible, x, y):
+        self._store = store
+        self.index = index
+        self.layer = layer
+        self.visible = visible
+        self.x = x
+        self.y = y
+
+    def __repr__(self):
+        index = self.index
+        visible = int(self.visible.sum())
+        return f"{self.__class__.__name__}({index=}, {visible=})"
+
+    def rows(self) -> list[tuple[Hashable, object, object, object, object]]:
+        """ The (ID, layer, x, y, scale) of every visible reference, in slot order. """
+        store = self._store
+        slots = numpy.flatnonzero(self.visible).tolist()
+        columns = []
+        for values, is_set in ((self.layer, store.layer_set), (self.x, store.x_set), (self.y, store.y_set)):
+            values = values.tolist()
+            columns.append([values[slot] if is_set[slot] else EXCLUDED for slot in slots])
+        return [
+            (store.ids[slot], layer, x, y, store.scale[slot])
+            for slot, layer, x, y in zip(slots, *columns)
+        ]
+
+
+class SceneStore:
+    """
+    The references and adjustments of a SeparatedInstructions, stored as
+    NumPy columns instead of Python objects, so that the state of every
+    reference on a frame is worked out at once. Each reference has a slot,
+    in the order the references were given; only the adjustments of IDs
+    with a reference are kept.
+
+    Only integer layers and positions can be stored, and moves must be
+    linear, and must not change the scale, or a layer or position that the
+    reference doesn't have; errors.TypeError is raised otherwise. NumPy is
+    needed (it can be installed with the 'columnar' extra); ImportError is
+    raised without it.
+
+    :ivar ids: The ID of every slot.
+    :ivar slots: The slot of every ID.
+    :ivar layer: The layer of every reference.
+    :ivar layer_set: Whether each reference has a layer.
+    :ivar scale: The scale of every reference, as a list; it's never changed.
+    :ivar visibility: The visibility of every reference, as a number.
+    :ivar x: The x position of every reference.
+    :ivar x_set: Whether each reference has an x position.
+    :ivar y: The y position of every reference.
+    :ivar y_set: Whether each reference has a y position.
+    :ivar kinds: The kind of every adjustment (HIDE, SHOW or MOVE).
+    :ivar adjustment_slots: The slot of the reference of every adjustment.
+    :ivar times: The activation time of every adjustment.
+    :ivar durations: The duration of every move; otherwise 0.
+    :ivar changes: The layer, x and y changes of every move, as three
+        columns; otherwise 0.
+    :ivar visibilities: The visibility of every adjustment, as a number.
+    """
+    __slots__ = (
+        "adjustment_slots", "changes", "durations", "ids", "kinds", "layer", "layer_set", "scale", "slots", "times",
+        "visibilities", "visibility", "x", "x_set", "y", "y_set"
+    )
+
+    def __init__(self, separated_instructions: SeparatedInstructions):
+        if numpy is None:
+            raise ImportError("A SceneStore needs NumPy; install it with the 'columnar' extra of scrivid.")
+
+        references = separated_instructions.references
+        self.ids = list(references)
+        self.slots = {ID: slot for slot, ID in enumerate(self.ids)}
+        self.scale = [reference.scale for reference in references.values()]
+
+        base = {"layer": [], "x": [], "y": []}
+        is_set = {"layer": [], "x": [], "y": []}
+        for reference in references.values():
+            for name in base:
+                value = getattr(reference, name)
+                is_set[name].append(_check_int(value, f"{name}s"))
+                base[name].append(value if is_set[name][-1] else 0)
+
+        self.layer, self.x, self.y = (numpy.array(base[name], dtype=numpy.int64) for name in ("layer", "x", "y"))
+        self.layer_set, self.x_set, self.y_set = (
+            numpy.array(is_set[name], dtype=bool) for name in ("layer", "x", "y")
+        )
+        self.visibility = numpy.array(
+            [_VISIBILITY_CODES[reference.visibility] for reference in references.values()], dtype=numpy.int8
+        )
+
+        kinds, slots, times, durations, changes, visibilities = [], [], [], [], [], []
+        for ID, values in separated_instructions.adjustments.items():
+            slot = self.slots.get(ID)
+            if slot is None:
+                continue
+            for adjustment in values:
+                adjustment_type = type(adjustment)
+                if adjustment_type is adjustments.core.MoveAdjustment:
+                    if not adjustment.easing.is_linear:
+                        raise errors.TypeError("A SceneStore can't hold eased moves.")
+                    change = adjustment.change
+                    if change.scale is not EXCLUDED:
+                        raise errors.TypeError("A SceneStore can't hold moves that change the scale.")
+                    delta = []
+                    for name, column in (("layer", self.layer_set), ("x", self.x_set), ("y", self.y_set)):
+                        value = getattr(change, name)
+                        if _check_int(value, f"{name} changes") and not column[slot]:
+                            raise errors.TypeError(
+                                f"A SceneStore can't hold a move of the {name} of {ID!r}, which has none."
+                            )
+                        delta.append(value if value is not EXCLUDED else 0)
+                    kinds.append(MOVE)
+                    durations.append(adjustment.duration)
+                    changes.append(delta)
+                    visibilities.append(_VISIBILITY_CODES[change.visibility])
+                elif adjustment_type is adjustments.core.HideAdjustment:
+                    kinds.append(HIDE)
+                    durations.append(0)
+                    changes.append((0, 0, 0))
+                    visibilities.append(_HIDDEN)
+                elif adjustment_type is adjustments.core.ShowAdjustment:
+                    kinds.append(SHOW)
+                    durations.append(0)
+                    changes.append((0, 0, 0))
+                    visibilities.append(_VISIBILITY_CODES[properties.VisibilityStatus.SHOW])
+                else:
+                    raise errors.TypeError(f"A SceneStore can't hold a {adjustment_type.__name__}.")
+                slots.append(slot)
+                times.append(adjustment.activation_time)
+
+        self.kinds = numpy.array(kinds, dtype=numpy.uint8)
+        self.adjustment_slots = numpy.array(slots, dtype=numpy.int64)
+        self.times = numpy.array(times, dtype=numpy.int64)
+        self.durations = numpy.array(durations, dtype=numpy.int64)
+        self.changes = numpy.array(changes, dtype=numpy.int64).reshape(-1, 3)
+        self.visibilities = numpy.array(visibilities, dtype=numpy.int8)
+
+    def __repr__(self):
+        references = len(self.ids)
+        adjustments_ = len(self.kinds)
+        return f"{self.__class__.__name__}({references=}, {adjustments_=})"
+
+    def __len__(self):
+        return len(self.ids)
+
+    def state(self, index: int) -> SceneState:
+        """ The state of every reference on frame `index`. """
+        return next(self.states((index,)))
+
+    def states(self, indices: Iterable[int]) -> Iterator[SceneState]:
+        """
+        Yields the state of every reference on each frame of `indices`. The
+        frames are swept in order, so that each adjustment is only added in
+        when it starts and ends, rather than on every frame; going back to an
+        earlier frame starts the sweep again.
+        """
+        count = len(self.ids)
+        moves = self.kinds == MOVE
+        move_slots = self.adjustment_slots[moves]
+        times = self.times[moves]
+        durations = self.durations[moves]
+        changes = self.changes[moves]
+        # A move takes full effect once `duration` frames have passed, or on
+        # the frame it starts if it's a single frame (or less). Before that,
+        # it moves by `change // duration` pixels a frame, like `_enact`.
+        gradual = durations > 1
+        ends = numpy.where(gradual, times + durations, times)
+        steps = numpy.zeros((len(times), 2), dtype=numpy.int64)
+        steps[gradual] = changes[gradual, 1:] // durations[gradual, None]
+
+        by_start = numpy.argsort(times, kind="stable")
+        by_end = numpy.argsort(ends, kind="stable")
+        sorted_starts, sorted_ends = times[by_start], ends[by_end]
+
+        # The changes of visibility, which take effect when the adjustment
+        # ends; of two on the same reference, the one that started later
+        # wins, like in the motion tree.
+        visibility_ends = numpy.where(self.durations > 1, self.times + self.durations, self.times)
+        visibility_events = numpy.flatnonzero(self.visibilities != _VISIBILITY_CODES[EXCLUDED])
+        visibility_events = visibility_events[numpy.argsort(visibility_ends[visibility_events], kind="stable")]
+        sorted_visibility_ends = visibility_ends[visibility_events]
+
+        started = ended = visibility_seen = 0
+        previous = None
+        for index in indices:
+            if previous is None or index < previous:
+                committed = numpy.zeros((count, 3), dtype=numpy.int64)
+                rates = numpy.zeros((count, 2), dtype=numpy.int64)
+                offsets = numpy.zeros((count, 2), dtype=numpy.int64)
+                visibility = self.visibility.copy()
+                visibility_times = numpy.full(count, numpy.iinfo(numpy.int64).min, dtype=numpy.int64)
+                started = ended = visibility_seen = 0
+            previous = index
+
+            now_started = int(numpy.searchsorted(sorted_starts, index, side="right"))
+            if now_started > started:
+                new = by_start[started:now_started]
+                numpy.add.at(rates, move_slots[new], steps[new])
+                numpy.add.at(offsets, move_slots[new], steps[new] * times[new, None])
+                started = now_started
+
+            now_ended = int(numpy.searchsorted(sorted_ends, index, side="right"))
+            if now_ended > ended:
+                new = by_end[ended:now_ended]
+                numpy.add.at(committed, move_slots[new], changes[new])
+                numpy.subtract.at(rates, move_slots[new], steps[new])
+                numpy.subtract.at(offsets, move_slots[new], steps[new] * times[new, None])
+                ended = now_ended
+
+            now_seen = int(numpy.searchsorted(sorted_visibility_ends, index, side="right"))
+            for event in visibility_events[visibility_seen:now_seen].tolist():
+                slot = self.adjustment_slots[event]
+                if self.times[event] > visibility_times[slot]:
+                    visibility_times[slot] = self.times[event]
+                    visibility[slot] = self.visibilities[event]
+            visibility_seen = now_seen
+
+            layer = self.layer + committed[:, 0]
+            x = self.x + committed[:, 1] + rates[:, 0] * index - offsets[:, 0]
+            y = self.y + committed[:, 2] + rates[:, 1] * index - offsets[:, 1]
+            yield SceneState(self, index, layer, visibility != _HIDDEN, x, y)
@@ -1,15 +1,19 @@
 from __future__ import annotations
 
 from . import errors
+from ._adjustment_index import AdjustmentIndex
+from ._scene_store import SceneStore
 from .abc import Adjustment
 from ._file_objects.images import ImageReference
 
+import itertools
+import operator
 from typing import TYPE_CHECKING
 
 from sortedcontainers import SortedList
 
 if TYPE_CHECKING:
-    from collections.abc import Sequence
+    from collections.abc import Iterable
     from typing import Hashable, TypeAlias
 
     INSTRUCTIONS: TypeAlias = ImageReference | Adjustment
@@ -17,15 +21,59 @@ if TYPE_CHECKING:
 
 
 class SeparatedInstructions:
-    __slots__ = ("adjustments", "references")
+    __slots__ = ("_index", "adjustments", "references")
 
+    _index: AdjustmentIndex | None
     adjustments: dict[Hashable, SortedList[Adjustment]]
     references: dict[Hashable, ImageReference]
 
     def __init__(self):
+        self._index = None
         self.adjustments = {}
         self.references = {}
 
+    def __getstate__(self):
+        # The index is rebuilt on demand, rather than pickled along.
+        return self.adjustments, self.references
+
+    def __setstate__(self, state):
+        self.adjustments, self.references = state
+        self._index = None
+
+    @property
+    def index(self) -> AdjustmentIndex:
+        """
+        The AdjustmentIndex of the adjustments, built the first time it's
+        asked for, and again after an adjustment is added.
+        """
+        if self._index is None:
+            self._index = AdjustmentIndex(self.adjustments)
+        return self._index
+
+    def to_store(self) -> SceneStore:
+        """
+        The references and adjustments as a SceneStore, of NumPy columns,
+        for working out the state of every reference at once. It's a copy;
+        later changes to the instructions aren't carried over.
+        """
+        return SceneStore(self)
+
+
+def _discard_adjustment(separated_instructions: SeparatedInstructions, adjustment: Adjustment) -> Adjustment | None:
+    # Removes the adjustment of the same ID at the same time, and returns it.
+    # Once the ID has no adjustments left, it's dropped, so that adding one
+    # of it again puts it after the other IDs, like separating them does.
+    values = separated_instructions.adjustments.get(adjustment.ID)
+    if values is None or adjustment not in values:
+        return None
+
+    existing = values[values.index(adjustment)]
+    values.remove(adjustment)
+    if not values:
+        del separated_instructions.adjustments[adjustment.ID]
+    separated_instructions._index = None
+    return existing
+
 
 def _handle_adjustment(separated_instructions: SeparatedInstructions, adjustment: Adjustment):
     if adjustment.ID not in separated_instructions.adjustments:
@@ -35,6 +83,7 @@ def _handle_adjustment(separated_instructions: SeparatedInstructions, adjustment
         return
 
     separated_instructions.adjustments[adjustment.ID].add(adjustment)
+    separated_instructions._index = None
 
 
 def _handle_reference(separated_instructions: SeparatedInstructions, reference: REFERENCES):
@@ -44,13 +93,57 @@ def _handle_reference(separated_instructions: SeparatedInstructions, reference:
     separated_instructions.references[reference.ID] = reference
 
 
-def separate_instructions(instructions: Sequence[INSTRUCTIONS]) -> SeparatedInstructions:
+def _handle_adjustments(separated_instructions: SeparatedInstructions, adjustments: Iterable[Adjustment]):
+    # Like `_handle_adjustment` for each of them, but groups them by ID and
+    # sorts each group once. The sort is stable, so of the adjustments of an
+    # ID at the same time, the first one is kept, as it would be when they're
+    # added one at a time.
+    grouped: dict[Hashable, list[Adjustment]] = {}
+    for adjustment in adjustments:
+        ID = adjustment.ID
+        if ID in grouped:
+            grouped[ID].append(adjustment)
+        else:
+            grouped[ID] = [adjustment]
+
+    for ID, values in grouped.items():
+        if ID in separated_instructions.adjustments:
+            for adjustment in values:
+                _handle_adjustment(separated_instructions, adjustment)
+            continue
+
+        values.sort(key=operator.attrgetter("activation_time"))
+        unique = [values[0]]
+        for adjustment in itertools.islice(values, 1, None):
+            if adjustment.activation_time != unique[-1].activation_time:
+                unique.append(adjustment)
+        separated_instructions.adjustments[ID] = SortedList(unique)
+
+    separated_instructions._index = None
+
+
+def separate_instructions(instructions: Iterable[INSTRUCTIONS]) -> SeparatedInstructions:
     separated_instructions = SeparatedInstructions()
+    pending_adjustments = []
+    # Whether each type of instruction is a reference (True), an adjustment
+    # (False) or neither (None), so that isinstance runs once per type.
+    kinds: dict[type, bool | None] = {}
 
     for instruction in instructions:
-        if isinstance(instruction, ImageReference):
+        instruction_type = type(instruction)
+        if instruction_type in kinds:
+            kind = kinds[instruction_type]
+        else:
+            kind = kinds[instruction_type] = (
+                True if isinstance(instruction, ImageReference)
+                else False if isinstance(instruction, Adjustment)
+                else None
+            )
+
+        if kind:
             _handle_reference(separated_instructions, instruction)
-        elif isinstance(instruction, Adjustment):
-            _handle_adjustment(separated_instructions, instruction)
+        elif kind is False:
+            pending_adjustments.append(instruction)
 
+    _handle_adjustments(separated_instructions, pending_adjustments)
     return separated_instructions
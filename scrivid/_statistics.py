@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+import json
+import os
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+    from typing import Any
+
+
+def _complete_event(name: str, category: str, start: float, end: float, args: dict[str, Any]) -> dict[str, Any]:
+    # A span in the Chrome trace-event format, with the times in microseconds.
+    # perf_counter is a system-wide monotonic clock, so the spans of the worker
+    # processes line up with the spans of the process that started them.
+    return {
+        "name": name,
+        "cat": category,
+        "ph": "X",
+        "ts": start * 1e6,
+        "dur": (end - start) * 1e6,
+        "pid": os.getpid(),
+        "tid": 0,
+        "args": args
+    }
+
+
+class StageTime:
+    """ The wall-clock and CPU time spent in one stage of a render, in seconds. """
+    __slots__ = ("cpu", "wall")
+
+    def __init__(self, wall: float = 0.0, cpu: float = 0.0):
+        self.cpu = cpu
+        self.wall = wall
+
+    def __repr__(self):
+        wall = self.wall
+        cpu = self.cpu
+        return f"{self.__class__.__name__}({wall=}, {cpu=})"
+
+    def add(self, wall: float, cpu: float):
+        self.cpu += cpu
+        self.wall += wall
+
+
+class FrameStatistics:
+    """
+    The counts for one drawn frame.
+
+    :ivar index: The index of the frame.
+    :ivar references: The number of images drawn on the frame.
+    :ivar pixels: The number of pixels composited onto the frame.
+    :ivar cache_hits: The number of images that were already decoded.
+    :ivar cache_misses: The number of images that had to be decoded.
+    """
+    __slots__ = ("cache_hits", "cache_misses", "index", "pixels", "references")
+
+    def __init__(self, index: int, references: int, pixels: int, cache_hits: int, cache_misses: int):
+        self.cache_hits = cache_hits
+        self.cache_misses = cache_misses
+        self.index = index
+        self.pixels = pixels
+        self.references = references
+
+    def __repr__(self):
+        index = self.index
+        references = self.references
+        pixels = self.pixels
+        return f"{self.__class__.__name__}({index=}, {references=}, {pixels=})"
+
+
+class RenderStatistics:
+    """
+    Where the time of a render went, as returned by `compile_video`.
+
+    The stages are:
+    - "separate_instructions", "parse": reading the instructions into a
+      motion tree;
+    - "tune": picking the concurrency settings, if `workers="auto"`;
+    - "plan": compiling the motion tree into a frame program, which says
+      which frames are drawn, which are held, and where every image is on
+      each drawn frame;
+    - "evaluate": reading the state of every image on each drawn frame from
+      the frame program;
+    - "composite": drawing the images onto the canvases;
+    - "wait": waiting on the worker processes for the next frame;
+    - "write": passing the frames to the sink (which includes piping them
+      into ffmpeg, or writing the files);
+    - "close": closing the sink (which includes waiting for ffmpeg to finish
+      encoding).
+
+    With more than one worker, the "evaluate" and "composite" stages are
+    summed over the workers, so they can add up to more than `total`.
+
+    :ivar frame_count: The total number of frames in the video.
+    :ivar drawn_frame_count: The number of frames that were drawn.
+    :ivar frames: The FrameStatistics of every drawn frame, in order.
+    :ivar stages: The StageTime of each stage, by name.
+    :ivar total: The StageTime of the whole render.
+    :ivar workers: The number of processes that rendered the frames.
+    """
+    __slots__ = ("_trace", "drawn_frame_count", "frame_count", "frames", "stages", "total", "workers")
+
+    _trace: list[dict[str, Any]] | None
+
+    drawn_frame_count: int
+    frame_count: int
+    frames: list[FrameStatistics]
+    stages: dict[str, StageTime]
+    total: StageTime
+    workers: int
+
+    def __init__(self, *, trace: bool = False):
+        self._trace = [] if trace else None
+        self.drawn_frame_count = 0
+        self.frame_count = 0
+        self.frames = []
+        self.stages = {}
+        self.total = StageTime()
+        self.workers = 1
+
+    def __repr__(self):
+        frame_count = self.frame_count
+        drawn_frame_count = self.drawn_frame_count
+        total = self.total
+        return f"{self.__class__.__name__}({frame_count=}, {drawn_frame_count=}, {total=})"
+
+    @property
+    def cache_hits(self) -> int:
+        return sum(frame.cache_hits for frame in self.frames)
+
+    @property
+    def cache_misses(self) -> int:
+        return sum(frame.cache_misses for frame in self.frames)
+
+    @property
+    def pixels_composited(self) -> int:
+        return sum(frame.pixels for frame in self.frames)
+
+    @property
+    def references_drawn(self) -> int:
+        return sum(frame.references for frame in self.frames)
+
+    @contextmanager
+    def _stage(self, name: str, **args) -> Iterator[None]:
+        # Times a stage, and records it as a span if a trace is kept.
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            if name not in self.stages:
+                self.stages[name] = StageTime()
+            self.stages[name].add(end - wall, time.process_time() - cpu)
+            if self._trace is not None:
+                self._trace.append(_complete_event(name, "stage", wall, end, args))
+
+    @contextmanager
+    def _span(self, name: str, **args) -> Iterator[None]:
+        # Records a span in the trace only, without timing it as a stage.
+        if self._trace is None:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._trace.append(_complete_event(name, "frame", start, time.perf_counter(), args))
+
+    def _name_process(self, name: str):
+        if self._trace is not None:
+            self._trace.append({"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": name}})
+
+    def _merge(self, other: RenderStatistics):
+        # Adds the stages, frames and spans of a worker.
+        for name, stage in other.stages.items():
+            if name not in self.stages:
+                self.stages[name] = StageTime()
+            self.stages[name].add(stage.wall, stage.cpu)
+        self.frames.extend(other.frames)
+        self.frames.sort(key=lambda frame: frame.index)
+        if self._trace is not None and other._trace is not None:
+            self._trace.extend(other._trace)
+
+    def _write_trace(self, path: str | Path):
+        # Writes the spans as a Chrome trace-event file, with the times
+        # starting from the first span.
+        events = self._trace or []
+        origin = min((event["ts"] for event in events if "ts" in event), default=0.0)
+        for event in events:
+            if "ts" in event:
+                event["ts"] -= origin
+        self._trace = []
+
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
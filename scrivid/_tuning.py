@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+from ._frame_plan import FrameKind
+from ._frame_program import ProgramRunner
+from ._memory import AssetCache, MemoryBudget, read_header
+from ._rendering import CanvasPool, draw_placements
+
+import json
+import math
+import os
+from pathlib import Path
+import platform
+import sys
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ._file_objects.images import ImageReference
+    from ._frame_program import FrameProgram
+
+    from collections.abc import Iterator
+
+
+AUTO = "auto"
+
+_CACHE_VERSION = 2
+_CALIBRATION_FRAMES = 3
+_MAX_CHUNK_SIZE = 64
+# A chunk should keep a worker busy for at least this long, so that waiting
+# on the frame ring stays a small part of the work.
+_MIN_CHUNK_SECONDS = 0.02
+# The memory that the frame ring is allowed to take up, if it was not set.
+_MAX_QUEUE_BYTES = 256 * 1024 * 1024
+# Starting a worker process is not free; with less work than this per worker,
+# the render stays in one process.
+_MIN_SECONDS_PER_WORKER = 0.5
+
+
+def cache_file() -> Path:
+    """
+    The file where the measured cost model of this machine is kept. The
+    directory can be set with the 'SCRIVID_CACHE_DIR' environment variable.
+    """
+    directory = os.environ.get("SCRIVID_CACHE_DIR")
+    if directory:
+        return Path(directory) / "tuning.json"
+
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "scrivid" / "tuning.json"
+
+
+def _machine_key() -> str:
+    return f"{platform.node()}|{platform.machine()}|{os.cpu_count()}|{platform.python_implementation()}"
+
+
+class CostModel:
+    """
+    The measured cost of rendering on this machine, per unit of work: running
+    the frame program up to a drawn frame and getting its placements, per
+    reference; compositing one pixel; and copying one pixel of a frame
+    (clearing a canvas, or handing it over).
+    """
+    __slots__ = ("composite_seconds", "copy_seconds", "evaluate_seconds")
+
+    def __init__(self, evaluate_seconds: float, composite_seconds: float, copy_seconds: float):
+        self.composite_seconds = composite_seconds
+        self.copy_seconds = copy_seconds
+        self.evaluate_seconds = evaluate_seconds
+
+    def __repr__(self):
+        evaluate_seconds = self.evaluate_seconds
+        composite_seconds = self.composite_seconds
+        copy_seconds = self.copy_seconds
+        return f"{self.__class__.__name__}({evaluate_seconds=}, {composite_seconds=}, {copy_seconds=})"
+
+    def to_dict(self) -> dict[str, float]:
+        return {
+            "evaluate_seconds": self.evaluate_seconds,
+            "composite_seconds": self.composite_seconds,
+            "copy_seconds": self.copy_seconds
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, float]) -> CostModel:
+        return cls(data["evaluate_seconds"], data["composite_seconds"], data["copy_seconds"])
+
+
+def load_cost_model(path: Path) -> CostModel | None:
+    try:
+        data = json.loads(path.read_text())
+        if data.get("version") != _CACHE_VERSION:
+            return None
+        return CostModel.from_dict(data["machines"][_machine_key()])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def store_cost_model(path: Path, cost_model: CostModel):
+    try:
+        data = json.loads(path.read_text())
+        if data.get("version") != _CACHE_VERSION:
+            raise ValueError
+    except (OSError, ValueError):
+        data = {"version": _CACHE_VERSION, "machines": {}}
+
+    data["machines"][_machine_key()] = cost_model.to_dict()
+
+    # A cache that cannot be written only means that the next render has to
+    # calibrate again.
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        temporary.write_text(json.dumps(data, indent=2))
+        os.replace(temporary, path)
+    except OSError:
+        pass
+
+
+def _sample_frames(program: FrameProgram, count: int) -> Iterator[tuple[int, ProgramRunner]]:
+    # Runs the program up to each of the first `count` drawn frames, like the
+    # render does, yielding the runner once it's ready to draw the frame.
+    if count == 0:
+        return
+    runner = ProgramRunner(program)
+    for span in runner:
+        if span.kind is not FrameKind.DRAW:
+            continue
+        yield span.index, runner
+        count -= 1
+        if count == 0:
+            return
+
+
+def _count_pixels(placements: list[tuple[ImageReference, int, int]], sizes: dict[int, int]) -> int:
+    # The size of each image is read from its header, rather than decoding it.
+    pixels = 0
+    for reference, _, _ in placements:
+        area = sizes.get(id(reference))
+        if area is None:
+            (width, height), _ = read_header(reference)
+            area = sizes[id(reference)] = width * height
+        pixels += area
+    return pixels
+
+
+class _Workload:
+    __slots__ = ("drawn_frames", "frame_count", "pixels", "references", "window_size")
+
+    def __init__(self, program: FrameProgram, window_size):
+        self.drawn_frames = program.drawn_frame_count
+        self.frame_count = program.frame_count
+        self.pixels = 0.0  # Composited per drawn frame, on average.
+        self.references = len(program.references)
+        self.window_size = window_size
+
+    @property
+    def canvas_pixels(self) -> int:
+        return self.window_size[0] * self.window_size[1]
+
+
+def calibrate(
+        program: FrameProgram,
+        window_size: tuple[int, int],
+        budget: MemoryBudget | None = None
+) -> tuple[CostModel, float]:
+    """
+    Renders the first few drawn frames of the program (without passing them
+    to a sink), the same way that the render does, and measures how long
+    each part took. Returns the cost model, and the average number of pixels
+    composited per frame.
+
+    The images are decoded into an AssetCache counted against `budget`, and
+    closed again before returning.
+    """
+    if budget is None:
+        budget = MemoryBudget()
+    assets = AssetCache(budget)
+    pool = CanvasPool(window_size, budget=budget)
+    evaluate_seconds = composite_seconds = copy_seconds = 0.0
+    pixels = frames = 0
+    sizes = {}
+
+    try:
+        start = time.perf_counter()
+        for index, runner in _sample_frames(program, _CALIBRATION_FRAMES):
+            placements = runner.placements()
+            evaluated = time.perf_counter()
+            frame_pixels = _count_pixels(placements, sizes)
+
+            opened = time.perf_counter()
+            canvas = pool.acquire(index)
+            canvas.image.tobytes()
+            copied = time.perf_counter()
+            draw_placements(canvas, placements, assets)
+            drawn = time.perf_counter()
+            pool.release(canvas)
+
+            evaluate_seconds += evaluated - start
+            copy_seconds += copied - opened
+            composite_seconds += drawn - copied
+            pixels += frame_pixels
+            frames += 1
+            # Running the program up to the next drawn frame counts towards
+            # evaluating it.
+            start = time.perf_counter()
+    finally:
+        assets.close()
+        pool.close()
+
+    frames = max(frames, 1)
+    canvas_pixels = window_size[0] * window_size[1]
+    cost_model = CostModel(
+        evaluate_seconds / frames / max(len(program.references), 1),
+        composite_seconds / max(pixels, 1),
+        copy_seconds / frames / canvas_pixels
+    )
+    return cost_model, pixels / frames
+
+
+def _average_pixels(program: FrameProgram) -> float:
+    pixels = frames = 0
+    sizes = {}
+    for _, runner in _sample_frames(program, _CALIBRATION_FRAMES):
+        pixels += _count_pixels(runner.placements(), sizes)
+        frames += 1
+    return pixels / max(frames, 1)
+
+
+def choose_settings(
+        cost_model: CostModel,
+        workload: _Workload,
+        *,
+        cpu_count: int,
+        chunk_size: int | None = None,
+        queue_depth: int | None = None
+) -> tuple[int, int, int]:
+    """ Picks (workers, chunk_size, queue_depth) for the workload. """
+    seconds_per_frame = (
+        cost_model.evaluate_seconds * workload.references
+        + cost_model.composite_seconds * workload.pixels
+        + cost_model.copy_seconds * workload.canvas_pixels
+    )
+    render_seconds = seconds_per_frame * workload.drawn_frames
+    # The sink is fed from one process, held frames included; past the point
+    # where it cannot keep up, more workers do not help.
+    handoff_seconds = cost_model.copy_seconds * workload.canvas_pixels * max(workload.frame_count, 1)
+
+    workers = min(
+        cpu_count,
+        max(workload.drawn_frames, 1),
+        int(render_seconds // _MIN_SECONDS_PER_WORKER) or 1,
+        math.ceil(render_seconds / handoff_seconds) if handoff_seconds > 0 else cpu_count
+    )
+    workers = max(workers, 1)
+
+    if chunk_size is None:
+        chunk_size = 1
+        if seconds_per_frame > 0:
+            chunk_size = math.ceil(_MIN_CHUNK_SECONDS / seconds_per_frame)
+        chunk_size = max(1, min(chunk_size, _MAX_CHUNK_SIZE, math.ceil(workload.drawn_frames / workers)))
+
+    if queue_depth is None:
+        frame_bytes = workload.canvas_pixels * 3
+        queue_depth = max(1, min(2 * workers * chunk_size, _MAX_QUEUE_BYTES // frame_bytes))
+
+    return workers, chunk_size, queue_depth
+
+
+def tune(
+        program: FrameProgram,
+        window_size: tuple[int, int],
+        *,
+        chunk_size: int | None = None,
+        queue_depth: int | None = None,
+        budget: MemoryBudget | None = None
+) -> tuple[int, int, int]:
+    """
+    Picks the concurrency settings for rendering the frame program, using the
+    cost model of this machine from the cache file. If there is none yet,
+    the first frames are calibrated (with the images counted against
+    `budget`), and the result is stored for the next render.
+    """
+    workload = _Workload(program, window_size)
+
+    path = cache_file()
+    cost_model = load_cost_model(path)
+    if cost_model is None:
+        cost_model, workload.pixels = calibrate(program, window_size, budget)
+        store_cost_model(path, cost_model)
+    else:
+        workload.pixels = _average_pixels(program)
+
+    return choose_settings(
+        cost_model, workload, cpu_count=os.cpu_count() or 1, chunk_size=chunk_size, queue_depth=queue_depth
+    )
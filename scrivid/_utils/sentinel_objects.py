@@ -1,3 +1,6 @@
+import sys
+
+
 class SentinelBase(type):
     def __new__(mcs, *_, **__):
         raise TypeError(f"{mcs!r} is not callable")
@@ -9,4 +12,7 @@ class SentinelBase(type):
 def sentinel(name):
     cls = type.__new__(SentinelBase, name, (SentinelBase,), {})
     cls.__class__ = cls
+    # Sentinels are pickled by reference, like classes are, so they need to
+    # point back to the module that they are assigned in.
+    cls.__module__ = sys._getframe(1).f_globals.get("__name__", __name__)
     return cls
@@ -1,241 +1,431 @@
 from __future__ import annotations
 
-from . import adjustments, errors, motion_tree, properties
+from . import _tuning, errors, motion_tree, sinks
+from ._frame_plan import FrameKind
+from ._frame_program import compile_program, ProgramRunner
+from ._frame_ring import EMPTY, FrameRing
+from ._memory import AssetCache, decoded_size, fit_to_limit, MemoryBudget, read_header
+from ._rendering import BACKGROUND, CanvasPool, create_frame, SlotCanvas
 from ._separating_instructions import separate_instructions
-from ._utils import TemporaryAttribute
+from ._statistics import RenderStatistics
+from .progress import _ProgressTracker
 
-from copy import deepcopy
+import functools
 import itertools
-import os
-from pathlib import Path
-import subprocess
-import tempfile
+import multiprocessing
+import time
 from typing import TYPE_CHECKING
 
-from PIL import Image
-
 if TYPE_CHECKING:
     from ._file_objects.images import ImageReference
+    from ._frame_plan import FrameSpan
+    from ._frame_program import FrameProgram
     from ._separating_instructions import SeparatedInstructions
-    from .abc import Adjustment
+    from .abc import Adjustment, Sink
     from .metadata import Metadata
+    from .progress import CancellationToken, Progress
 
-    from collections.abc import Sequence
+    from collections.abc import Callable, Iterable, Iterator
+    from pathlib import Path
+    from multiprocessing.process import BaseProcess
+    from multiprocessing.queues import SimpleQueue
     from typing import TypeAlias
 
     INSTRUCTIONS: TypeAlias = ImageReference | Adjustment
-    MotionTree: TypeAlias = motion_tree.MotionTree
-
-
-class _FrameCanvas:
-    __slots__ = ("_canvas", "_pixel_canvas", "index")
-
-    def __init__(self, index: int, window_size: tuple[int, int]):
-        self._canvas = Image.new("RGB", window_size, (255, 255, 255))
-        self._pixel_canvas = self._canvas.load()
-        self.index = index
-
-    def save(self, save_file: Path):
-        self._canvas.save(save_file, "PNG")
-        self._canvas.close()
-        self._canvas = None
-        self._pixel_canvas = None
-
-    def set_pixel(self, coordinates: tuple[int, int], pixel_value: tuple[int, int, int]):
-        # TODO: Implement behaviour for when the coordinates has a negative
-        # value, to simply return instead of trying to draw it, since a 
-        # negative value draws on the other side, but not vice versa.
-        try:
-            self._pixel_canvas.__setitem__(coordinates, pixel_value)
-        except IndexError:
-            pass
 
 
-class _FrameInfo:
-    __slots__ = ("canvas", "index", "temp_dir")
+def _write_frames(
+        program: FrameProgram,
+        window_size: tuple[int, int],
+        sink: Sink,
+        budget: MemoryBudget,
+        tracker: _ProgressTracker,
+        statistics: RenderStatistics
+):
+    # Only the frames that change are drawn, and only one canvas is in use at
+    # a time; the held frames repeat the last drawn canvas.
+    canvas = None
+    budget.charge("frames", window_size[0] * window_size[1] * 3)  # Handed to the sink.
+    assets = AssetCache(budget)
+    pool = CanvasPool(window_size, budget=budget)
 
-    def __init__(self, index: int, temp_dir: Path, window_size: tuple[int, int]):
-        self.canvas = _FrameCanvas(index, window_size)
-        self.index = index
-        self.temp_dir = temp_dir
+    runner = ProgramRunner(program)
 
-    @property
-    def save_file(self):
-        return self.temp_dir / f"{self.index:06d}.png"
-
-
-def _call_close(value):
-    value.close()
-
-
-def _draw_on_frame(frame: _FrameInfo, references_dict):
     try:
-        highest_layer = max(references_dict) + 1
-    except ValueError:
-        return
+        for span in runner:
+            if span.kind is FrameKind.HOLD:
+                for index in span:
+                    with statistics._stage("write", frame=index):
+                        sink.write(index, canvas.image)
+                    tracker.encoded()
+                continue
 
-    for index in range(highest_layer):
-        if index not in references_dict:
+            index = span.index
+            if canvas is not None:
+                pool.release(canvas)
+            canvas = pool.acquire(index)
+            create_frame(canvas, runner, assets, statistics)
+            tracker.rendered()
+            with statistics._stage("write", frame=index):
+                sink.write(index, canvas.image)
+            tracker.encoded()
+    finally:
+        if canvas is not None:
+            pool.release(canvas)
+        pool.close()
+        assets.close()
+
+
+def _drawn_frames(spans: Iterable[FrameSpan]) -> Iterator[tuple[int, int]]:
+    # Yields the (position, index) of every drawn frame, where `position` is
+    # the count of drawn frames before it.
+    position = 0
+    for span in spans:
+        if span.kind is not FrameKind.DRAW:
             continue
+        for index in span:
+            yield position, index
+            position += 1
+
+
+def _render_worker(
+        ring: FrameRing,
+        program: FrameProgram,
+        window_size: tuple[int, int],
+        worker: int,
+        workers: int,
+        chunk_size: int,
+        budget: MemoryBudget,
+        failures: SimpleQueue,
+        results: SimpleQueue,
+        trace: bool
+):
+    # The drawn frames are dealt out to the workers in chunks, round-robin;
+    # every worker runs the whole program, but only draws its own frames.
+    # The statistics of the worker are sent back once it's done.
+    statistics = RenderStatistics(trace=trace)
+    statistics._name_process(f"render worker {worker}")
+    background = bytes(BACKGROUND) * (window_size[0] * window_size[1])
+    budget.charge("frames", len(background))
+    assets = AssetCache(budget)
+    runner = ProgramRunner(program)
 
-        references = references_dict[index]
-        for reference in references:
-            if not reference.is_opened:
-                reference.open()
-
-            ref_x = reference.x
-            ref_y = reference.y
-
-            for x, y in itertools.product(
-                    range(ref_x, ref_x + reference.get_image_width()),
-                    range(ref_y, ref_y + reference.get_image_height())
-            ):
-                frame.canvas.set_pixel((x, y), reference.get_pixel_value((x - ref_x, y - ref_y)))
-
-
-def _invoke_adjustment_duration(index: int, adj: Adjustment):
-    # Assume that the `adj` has a 'duration' attribute.
-    duration = index - adj.activation_time
-    if duration > adj.duration:
-        return adj.duration
-    else:
-        return duration
-
-
-def _create_frame(frame: _FrameInfo, split_instructions: SeparatedInstructions):
-    index = frame.index
-    instructions = deepcopy(split_instructions)  # Avoid modifying the
-    # original objects.
-    layer_reference = {}
-    merge_settings = {"mode": properties.MergeMode.REVERSE_APPEND}
+    try:
+        for position, index in _drawn_frames(runner):
+            if (position // chunk_size) % workers != worker:
+                continue
 
-    for ID, reference in instructions.references.items():
+            slot = ring.wait_writable(position, index, _no_check)
+            try:
+                slot[:] = background
+                create_frame(SlotCanvas(index, slot, window_size), runner, assets, statistics)
+            finally:
+                slot.release()
+            ring.publish(position)
+        results.put(statistics)
+    except BaseException as exc:
         try:
-            relevant_adjustments = instructions.adjustments[ID]
-        except KeyError:
-            relevant_adjustments = None
-
-        while relevant_adjustments:
-            adj = relevant_adjustments.pop(0)
-
-            if adj.activation_time > index:
-                break
-
-            args = ()
-            if type(adj) is adjustments.core.MoveAdjustment:
-                args = (_invoke_adjustment_duration(index, adj),)
-
-            reference._properties = reference._properties.merge(adj._enact(*args), **merge_settings)
-
-        if reference.visibility is properties.VisibilityStatus.HIDE:
+            failures.put(exc)
+        except Exception:
+            failures.put(RuntimeError(repr(exc)))
+        raise
+    finally:
+        assets.close()
+        ring.close()
+
+
+def _no_check():
+    pass
+
+
+def _check_workers(processes: list[BaseProcess], failures: SimpleQueue, tracker: _ProgressTracker):
+    tracker.check()
+    if not failures.empty():
+        raise failures.get()
+
+    for process in processes:
+        if process.exitcode not in (None, 0):
+            raise errors.InternalError(RuntimeError(f"Render worker exited with code {process.exitcode}."))
+
+
+def _collect_statistics(
+        processes: list[BaseProcess],
+        results: SimpleQueue,
+        check: Callable[[], None],
+        statistics: RenderStatistics
+):
+    # Every worker sends its statistics before it exits; they're read before
+    # joining the workers, since a worker cannot exit while the pipe is full.
+    remaining = len(processes)
+    while remaining:
+        if results.empty():
+            check()
+            time.sleep(0.01)
             continue
-
-        layer = reference.layer
-        if layer not in layer_reference:
-            layer_reference[layer] = set()
-
-        layer_reference[layer].add(reference)
-
-    _draw_on_frame(frame, layer_reference)
-    frame.canvas.save(frame.save_file)
-
-
-def _fill_undrawn_frames(temporary_directory: Path, video_length: int):
-    with TemporaryAttribute(cleanup=_call_close) as frame_assignment:
-        for index in range(video_length):
-            try:
-                frame_assignment.value = Image.open(
-                    str(temporary_directory / f"{index:06d}.png")
-                )
-            except FileNotFoundError:
-                frame_assignment.value.save(
-                    temporary_directory / f"{index:06d}.png"
-                )
-
-
-def _generate_frames(
-        parsed_motion_tree: MotionTree,
-        temporary_directory: Path,
-        window_size: tuple[int, int]
-) -> tuple[list[_FrameInfo], int]:
-    # ...
-    frames = []
-    index = 0
-
-    for node in parsed_motion_tree.body:
-        type_ = type(node)
-        if type_ is motion_tree.Start:
-            frames.append(_FrameInfo(0, temporary_directory, window_size))
-        elif type_ in (motion_tree.HideImage, motion_tree.MoveImage, motion_tree.ShowImage):
-            if index == frames[-1].index:
-                continue
-            frames.append(_FrameInfo(index, temporary_directory, window_size))
-        elif type_ is motion_tree.InvokePrevious:
-            start = 0
-            if index == frames[-1].index:
-                start = 1
-                index += 1
-            for _ in range(start, node.length):
-                frames.append(_FrameInfo(index, temporary_directory, window_size))
-                index += 1
-            del start
-        elif type_ is motion_tree.Continue:
-            index += node.length
-        elif type_ is motion_tree.End:
-            break
-
-    return frames, index
-
-
-def _concatenate(command):
-    try:
-        subprocess.run(command, capture_output=True)
-    except subprocess.SubprocessError as exc:
-        raise errors.InternalErrorFromFFMPEG(exc, exc.stdout, exc.stderr)
-
-
-def _stitch_video(temporary_directory, metadata, video_length):
-    input_file = os.path.join(temporary_directory, "%06d.png")
-    output_file = str(metadata.save_location / f"{metadata.video_name}.mp4")
-    dimensions = f"{metadata.window_width}x{metadata.window_height}"
-
-    # I honest to god could not tell you how I figured this out. I just
-    # couldn't figure out how to make a stable result for the life of me.
-    command = [
-        "ffmpeg",
-        "-framerate", str(metadata.frame_rate),  # INPUT SETTINGS
-        "-i", str(input_file),
-        "-b:v", "4M",  # # # # # # # # # # # # # # OUTPUT SETTINGS
-        "-vcodec", "libx264",
-        "-pix_fmt", "yuv420p",
-        "-s", dimensions,
-        output_file
+        statistics._merge(results.get())
+        remaining -= 1
+
+
+def _write_frames_in_parallel(
+        program: FrameProgram,
+        window_size: tuple[int, int],
+        sink: Sink,
+        *,
+        workers: int,
+        chunk_size: int,
+        queue_depth: int,
+        process_limit: int | None,
+        tracker: _ProgressTracker,
+        statistics: RenderStatistics
+):
+    # The drawn frames are rendered by worker processes into a ring of shared
+    # memory slots, while this process passes them to the sink in order. A
+    # slot is handed back to the workers once its frame, and any frames that
+    # hold it, have been written.
+    context = multiprocessing.get_context()
+    spans = list(program.spans())
+    ring = FrameRing(queue_depth, window_size[0] * window_size[1] * 3, context)
+    failures = context.SimpleQueue()
+    results = context.SimpleQueue()
+
+    upcoming = _drawn_frames(spans)
+    for position, index in itertools.islice(upcoming, queue_depth):
+        ring.assign(position, index)
+
+    processes = [
+        context.Process(
+            target=_render_worker,
+            args=(
+                ring, program, window_size, worker, workers, chunk_size,
+                MemoryBudget(process_limit), failures, results, statistics._trace is not None
+            ),
+            daemon=True
+        )
+        for worker in range(workers)
     ]
+    check = functools.partial(_check_workers, processes, failures, tracker)
 
-    _concatenate(command)
-
+    try:
+        for process in processes:
+            process.start()
+
+        position = -1
+        for span in spans:
+            if span.kind is FrameKind.HOLD:
+                slot = ring.slot(position)
+                try:
+                    for index in span:
+                        with statistics._stage("write", frame=index):
+                            sink.write_buffer(index, slot, window_size)
+                        tracker.encoded()
+                finally:
+                    slot.release()
+                continue
 
-def compile_video(instructions: Sequence[INSTRUCTIONS], metadata: Metadata):
+            for index in span:
+                if position >= 0:
+                    ring.release(position, next(upcoming, (None, EMPTY))[1])
+                position += 1
+
+                with statistics._stage("wait", frame=index):
+                    slot = ring.wait_readable(position, index, check)
+                tracker.rendered()
+                try:
+                    with statistics._stage("write", frame=index):
+                        sink.write_buffer(index, slot, window_size)
+                finally:
+                    slot.release()
+                tracker.encoded()
+
+        _collect_statistics(processes, results, check, statistics)
+        for process in processes:
+            process.join()
+        check()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        ring.close()
+        ring.unlink()
+
+
+def _check_positive_int(name: str, value: int):
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise errors.TypeError(f"`{name}` must be a positive integer.")
+
+
+def _check_concurrency_settings(
+        workers: int,
+        chunk_size: int | None,
+        queue_depth: int | None
+) -> tuple[int, int]:
+    _check_positive_int("workers", workers)
+    if chunk_size is None:
+        chunk_size = 1
+    _check_positive_int("chunk_size", chunk_size)
+    if queue_depth is None:
+        queue_depth = 2 * workers * chunk_size
+    _check_positive_int("queue_depth", queue_depth)
+    return chunk_size, queue_depth
+
+
+def _check_memory_limit(memory_limit: int | None):
+    if memory_limit is not None:
+        _check_positive_int("memory_limit", memory_limit)
+
+
+def _largest_asset(split_instructions: SeparatedInstructions) -> int:
+    return max(
+        (decoded_size(*read_header(reference)) for reference in split_instructions.references.values()),
+        default=0
+    )
+
+
+def compile_video(
+        instructions: Iterable[INSTRUCTIONS],
+        metadata: Metadata,
+        *,
+        sink: Sink | None = None,
+        workers: int | str = 1,
+        chunk_size: int | None = None,
+        queue_depth: int | None = None,
+        memory_limit: int | None = None,
+        progress: Callable[[Progress], None] | None = None,
+        cancellation: CancellationToken | None = None,
+        trace_file: str | Path | None = None,
+        parse_cache: motion_tree.ParseCache | None = None,
+        optimize: bool = False
+) -> RenderStatistics:
     """
     Converts the objects, taken as instructions, into a compiled video.
+    Returns a RenderStatistics, with the time spent in each stage of the
+    render, and the counts of every drawn frame.
 
-    :param instructions: A list of instances of ImageReference's, and/or a 
-        class of the Adjustment hierarchy.
+    :param instructions: A list (or any other iterable, such as a generator)
+        of instances of ImageReference's, and/or a class of the Adjustment
+        hierarchy.
     :param metadata: An instance of Metadata that stores the attributes
         of the video.
+    :param sink: The destination of the rendered frames, as an instance of a
+        subclass of abc.Sink. Defaults to sinks.FFmpegSink, which encodes the
+        frames into '<save_location>/<video_name>.mp4'.
+    :param workers: The number of processes that render the frames. If more
+        than one, the frames are rendered into shared memory, and passed to
+        the sink from there. If "auto", the number of workers (and the chunk
+        size and queue depth, unless specified) are picked from the measured
+        cost of rendering on this machine; see below.
+    :param chunk_size: The number of consecutive drawn frames that are given
+        to each worker at a time. Only used if `workers` is more than one;
+        defaults to 1.
+    :param queue_depth: The number of frames that can be rendered ahead of
+        the sink. Only used if `workers` is more than one; defaults to twice
+        `workers * chunk_size`.
+    :param memory_limit: The number of bytes that the render should stay
+        under, counting the decoded images, the canvases and the queued
+        frames (but not the sink). The decoded images are kept between frames
+        while they fit, and evicted when they don't; the queue depth is
+        reduced to leave room for them. Unbounded by default. Raises
+        errors.AttributeError if the limit cannot fit a single frame.
+    :param progress: Called with a progress.Progress once the frames are
+        planned, and again after every frame that is passed to the sink,
+        with the frames rendered and encoded so far, the throughput and the
+        estimated time left.
+    :param cancellation: A progress.CancellationToken, checked between
+        frames; once cancelled, the render stops, the sink is aborted (which
+        kills ffmpeg for the default sink), and errors.CancelledError is
+        raised.
+    :param trace_file: If given, a trace of the render is written to this
+        path, in the Chrome trace-event format (which can be opened in
+        Perfetto, or 'chrome://tracing'). It has a span for every stage and
+        every frame, on a track for each process, including the workers. The
+        trace is written even if the render fails, or is cancelled.
+    :param parse_cache: A motion_tree.ParseCache, that the motion tree of the
+        instructions is looked up in. Rendering the same adjustments again
+        (even with other images) then skips separating and parsing them.
+    :param optimize: Whether to pass the motion tree through
+        motion_tree.optimize before rendering it, which gives the same video
+        from fewer nodes and adjustments.
+
+    With `workers="auto"`, the first render on a machine times the first few
+    frames to measure the cost of rendering, and stores it in a cache file
+    ('~/.cache/scrivid/tuning.json', or '%LOCALAPPDATA%\\scrivid\\tuning.json'
+    on Windows; the directory can be set with the 'SCRIVID_CACHE_DIR'
+    environment variable). Later renders on the same machine reuse it.
     """
-    metadata._validate()
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    statistics = RenderStatistics(trace=trace_file is not None)
+    statistics._name_process("scrivid")
 
-    separated_instructions = separate_instructions(instructions)
-    parsed_motion_tree = motion_tree.parse(separated_instructions)
+    metadata._validate()
 
-    with tempfile.TemporaryDirectory(dir=metadata.save_location, prefix=".scrivid-cache-") as temp_dir:
-        temp_dir = Path(temp_dir)
+    if workers != _tuning.AUTO:
+        chunk_size, queue_depth = _check_concurrency_settings(workers, chunk_size, queue_depth)
+    _check_memory_limit(memory_limit)
 
-        frames, video_length = _generate_frames(parsed_motion_tree, temp_dir, metadata.window_size)
+    if sink is None:
+        sink = sinks.FFmpegSink(cancellation=cancellation)
 
-        for frame_information in frames:
-            _create_frame(frame_information, separated_instructions)
+    if parse_cache is None:
+        with statistics._stage("separate_instructions"):
+            separated_instructions = separate_instructions(instructions)
+        with statistics._stage("parse"):
+            parsed_motion_tree = motion_tree.parse(separated_instructions, optimize=optimize)
+    else:
+        with statistics._stage("parse"):
+            parsed_motion_tree = motion_tree.parse(instructions, cache=parse_cache, optimize=optimize)
+    separated_instructions = parsed_motion_tree._instructions
+
+    with statistics._stage("plan"):
+        program = compile_program(parsed_motion_tree, separated_instructions)
+
+    if workers == _tuning.AUTO:
+        # The render is tuned on the frame program, which is what it runs.
+        with statistics._stage("tune"):
+            workers, chunk_size, queue_depth = _tuning.tune(
+                program, metadata.window_size, chunk_size=chunk_size, queue_depth=queue_depth,
+                budget=MemoryBudget(memory_limit)
+            )
+        chunk_size, queue_depth = _check_concurrency_settings(workers, chunk_size, queue_depth)
+
+    process_limit = None
+    if memory_limit is not None:
+        queue_depth, process_limit = fit_to_limit(
+            memory_limit, metadata.window_size, _largest_asset(separated_instructions),
+            workers=workers, queue_depth=queue_depth
+        )
+
+    frame_count, drawn_frame_count = program.frame_count, program.drawn_frame_count
+    statistics.drawn_frame_count = drawn_frame_count
+    statistics.frame_count = frame_count
+    statistics.workers = workers
+    tracker = _ProgressTracker(frame_count, drawn_frame_count, progress, cancellation)
 
-        _fill_undrawn_frames(temp_dir, video_length)
-        _stitch_video(temp_dir, metadata, video_length)
+    try:
+        tracker.check()
+        sink.open(metadata, frame_count)
+        try:
+            tracker.report()
+            if workers == 1:
+                _write_frames(
+                    program, metadata.window_size, sink,
+                    MemoryBudget(process_limit), tracker, statistics
+                )
+            else:
+                _write_frames_in_parallel(
+                    program, metadata.window_size, sink,
+                    workers=workers, chunk_size=chunk_size, queue_depth=queue_depth, process_limit=process_limit,
+                    tracker=tracker, statistics=statistics
+                )
+        except BaseException:
+            sink.abort()
+            raise
+        with statistics._stage("close"):
+            sink.close()
+    finally:
+        statistics.total.add(time.perf_counter() - start_wall, time.process_time() - start_cpu)
+        if trace_file is not None:
+            statistics._write_trace(trace_file)
+
+    return statistics
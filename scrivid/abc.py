@@ -6,8 +6,11 @@ from abc import ABC, abstractmethod
 import operator
 from typing import TYPE_CHECKING
 
+from PIL import Image
+
 if TYPE_CHECKING:
     from ._file_objects.properties import Properties
+    from .metadata import Metadata
 
     from typing import Hashable
 
@@ -88,3 +91,45 @@ class Qualm(ABC):
     @abstractmethod
     def check(self):
         raise NotImplementedError
+
+
+class Sink(ABC):
+    """
+    Sinks are the destination of the frames rendered by `compile_video`. The
+    frames are passed in order, one call to `write` per frame index, between a
+    call to `open` and a call to `close`. If the render stops before every
+    frame was written, `abort` is called instead of `close`.
+
+    The image passed to `write` is only valid for the duration of that call;
+    it is reused for held frames, and closed afterwards. Copy it if it needs
+    to be kept.
+
+    When the frames are rendered by multiple processes, they arrive through
+    `write_buffer` instead, as the raw RGB bytes of the frame in shared memory.
+    By default, this wraps the bytes in an image and calls `write`; sinks that
+    can use the bytes directly should override it to avoid the copy. The same
+    lifetime applies to the buffer as to the image.
+    """
+    __slots__ = ()
+
+    @abstractmethod
+    def open(self, metadata: Metadata, frame_count: int):
+        raise NotImplementedError
+
+    @abstractmethod
+    def write(self, index: int, frame: Image.Image):
+        raise NotImplementedError
+
+    @abstractmethod
+    def close(self):
+        raise NotImplementedError
+
+    def write_buffer(self, index: int, buffer: memoryview, size: tuple[int, int]):
+        frame = Image.frombuffer("RGB", size, buffer, "raw", "RGB", 0, 1)
+        try:
+            self.write(index, frame)
+        finally:
+            frame.close()
+
+    def abort(self):
+        self.close()
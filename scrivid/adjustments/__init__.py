@@ -1,4 +1,4 @@
-from . import core, hide, move, show
+from . import core, easing, hide, move, show
 
 
-__all__ = ["core", "hide", "move", "show"]
+__all__ = ["core", "easing", "hide", "move", "show"]
@@ -1,5 +1,7 @@
 from .. import errors
 
+import operator
+
 
 def check_hashable(name, value):
     try:
@@ -16,3 +18,38 @@ def check_inheritance(name, value, root):
 def check_int(name, value):
     if not isinstance(value, int) or isinstance(value, bool):
         raise errors.TypeError(f"`{name}` must be an integer.")
+
+
+# The checks above, for a whole column of values at once, as given to the
+# `create_many` functions. Each returns the values as a list.
+
+
+def check_hashable_column(name, values):
+    values = list(values)
+    try:
+        set(values)
+    except TypeError:
+        raise errors.TypeError(f"Every value of `{name}` must be hashable.")
+    return values
+
+
+def check_int_column(name, values):
+    values = list(values)
+    types = set(map(type, values))
+    if types <= {int}:
+        return values
+    elif bool in types:
+        raise errors.TypeError(f"Every value of `{name}` must be an integer.")
+
+    # Integers of other types, such as those of NumPy arrays, are converted.
+    try:
+        return list(map(operator.index, values))
+    except TypeError:
+        raise errors.TypeError(f"Every value of `{name}` must be an integer.") from None
+
+
+def check_same_length(**columns):
+    lengths = {name: len(values) for name, values in columns.items()}
+    if len(set(lengths.values())) > 1:
+        listed = ", ".join(f"`{name}` ({length})" for name, length in lengths.items())
+        raise errors.AttributeError(f"The columns must have the same length; got {listed}.")
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from .easing import Easing, LINEAR, ONE, PRECISION
+
 from .. import abc, properties
 
 from typing import TYPE_CHECKING
@@ -34,6 +36,16 @@ def _increment_value(
     return value + (remainder - (excess_precision * precision))
 
 
+def _eased_value(full_value: float | int | EXCLUDED, progress: int):
+    # The part of the value made by the fixed-point `progress`, rounded to the
+    # nearest whole number for integers.
+    if full_value is EXCLUDED:
+        return full_value
+    elif type(full_value) is int:
+        return (full_value * progress + (ONE >> 1)) >> PRECISION
+    return full_value * progress / ONE
+
+
 class HideAdjustment(abc.Adjustment):
     __slots__ = ("_activation_time", "_ID")
 
@@ -63,23 +75,26 @@ class HideAdjustment(abc.Adjustment):
         return self._ID
 
     def _enact(self) -> Properties:
-        return properties.Properties(visibility=properties.VisibilityStatus.HIDE)
+        return properties.HIDDEN
 
 
 class MoveAdjustment(abc.Adjustment):
-    __slots__ = ("_activation_time", "_change", "_ID", "duration")
+    __slots__ = ("_activation_time", "_change", "_ID", "_progress", "duration", "easing")
 
     def __init__(
             self,
             ID: Hashable,
             activation_time: int,
             change: properties.Properties,
-            duration: int
+            duration: int,
+            easing: Easing = LINEAR
     ):
         self._change = change
         self.duration = duration
+        self.easing = easing
         self._ID = ID
         self._activation_time = activation_time
+        self._progress = None
 
     def __repr__(self):
         id = self._ID
@@ -87,7 +102,10 @@ class MoveAdjustment(abc.Adjustment):
         change = self._change
         duration = self.duration
 
-        return f"{self.__class__.__name__}({id=!r}, {activation_time=!r}, {change=!r}, {duration=!r})"
+        if self.easing.is_linear:
+            return f"{self.__class__.__name__}({id=!r}, {activation_time=!r}, {change=!r}, {duration=!r})"
+        easing = self.easing
+        return f"{self.__class__.__name__}({id=!r}, {activation_time=!r}, {change=!r}, {duration=!r}, {easing=!r})"
 
     @property
     def activation_time(self):
@@ -108,8 +126,24 @@ class MoveAdjustment(abc.Adjustment):
     def _enact(self, length: int) -> Properties:
         if self.duration == 1 or self.duration == length:
             return self._change
-        else:
+        elif self.easing.is_linear:
             return self._split_change(length)
+        else:
+            return self._eased_change(length)
+
+    def _eased_change(self, length: int) -> Properties:
+        # The progress of every frame of the move is looked up from a table
+        # that's worked out the first time it's needed.
+        table = self._progress
+        if table is None:
+            table = self._progress = self.easing.table(self.duration)
+        progress = table[length]
+
+        return properties.Properties(
+            scale=_eased_value(self._change.scale, progress),
+            x=_eased_value(self._change.x, progress),
+            y=_eased_value(self._change.y, progress)
+        )
 
     def _split_change(self, length: int = 1) -> Properties:
         scale = _increment_value(
@@ -153,4 +187,4 @@ class ShowAdjustment(abc.Adjustment):
         return self._ID
 
     def _enact(self) -> Properties:
-        return properties.Properties(visibility=properties.VisibilityStatus.SHOW)
+        return properties.SHOWN
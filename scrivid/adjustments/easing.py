@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from .. import errors
+
+from array import array
+import math
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Callable
+
+
+# The progress of an eased move is kept as a fixed-point number, where ONE is
+# the full change.
+PRECISION = 16
+ONE = 1 << PRECISION
+
+
+def _bezier(p1: float, p2: float, s: float) -> float:
+    # One coordinate of a cubic bezier curve from 0 to 1, at `s`.
+    inverse = 1 - s
+    return 3 * inverse * inverse * s * p1 + 3 * inverse * s * s * p2 + s * s * s
+
+
+def _cubic_bezier(x1: float, y1: float, x2: float, y2: float) -> Callable[[float], float]:
+    def progress(t: float) -> float:
+        # x is always increasing (since x1 and x2 are within [0, 1]), so the
+        # point of the curve at x = t is found by halving the range.
+        low, high = 0.0, 1.0
+        for _ in range(48):
+            middle = (low + high) / 2
+            if _bezier(x1, x2, middle) < t:
+                low = middle
+            else:
+                high = middle
+        return _bezier(y1, y2, (low + high) / 2)
+    return progress
+
+
+def _steps(count: int, start: bool) -> Callable[[float], float]:
+    def progress(t: float) -> float:
+        return min((math.floor(t * count) + start) / count, 1.0)
+    return progress
+
+
+class Easing:
+    """
+    How a MoveAdjustment moves over its duration. Rather than being worked out
+    on every frame, the progress of a move on each of its frames is put into
+    a table of fixed-point integers (see `table`), once for every duration it
+    is used with.
+
+    :ivar is_linear: Whether the move is at the same speed throughout. Linear
+        moves are split evenly, without a table.
+    :ivar kind: The kind of curve: "linear", "cubic-bezier" or "steps".
+    :ivar parameters: The parameters of the curve.
+    """
+    __slots__ = ("_progress", "_tables", "is_linear", "kind", "parameters")
+
+    def __init__(self, kind: str, parameters: tuple = ()):
+        if kind == "linear":
+            progress = None
+        elif kind == "cubic-bezier":
+            progress = _cubic_bezier(*parameters)
+        elif kind == "steps":
+            progress = _steps(*parameters)
+        else:
+            raise errors.TypeError(f"Unknown kind of easing: {kind!r}.")
+
+        self._progress = progress
+        self._tables = {}
+        self.is_linear = progress is None
+        self.kind = kind
+        self.parameters = parameters
+
+    def __repr__(self):
+        kind = self.kind
+        parameters = self.parameters
+        return f"{self.__class__.__name__}({kind=!r}, {parameters=!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Easing):
+            return NotImplemented
+        return self.kind == other.kind and self.parameters == other.parameters
+
+    def __hash__(self):
+        return hash((self.kind, self.parameters))
+
+    def __reduce__(self):
+        return self.__class__, (self.kind, self.parameters)
+
+    def progress(self, t: float) -> float:
+        """ The fraction of the change made once `t` (from 0 to 1) of the time has passed. """
+        if self._progress is None:
+            return t
+        return self._progress(t)
+
+    def table(self, duration: int) -> array[int]:
+        """
+        The progress of a move of `duration` frames on each of its frames, in
+        units of 1 / ONE, from frame 0 (none of the time has passed) to frame
+        `duration` (which is always ONE). The table is shared by every move
+        with the same duration, so it must not be changed.
+        """
+        table = self._tables.get(duration)
+        if table is None:
+            steps = max(duration, 1)
+            table = array("q", (round(self.progress(length / steps) * ONE) for length in range(steps)))
+            table.append(ONE)
+            self._tables[duration] = table
+        return table
+
+
+def cubic_bezier(x1: float, y1: float, x2: float, y2: float) -> Easing:
+    """
+    An easing along a cubic bezier curve from (0, 0) to (1, 1), with the
+    control points (x1, y1) and (x2, y2), like in CSS. The x coordinates must
+    be within [0, 1]; the y coordinates can be outside of it, to overshoot.
+    """
+    for name, value in (("x1", x1), ("y1", y1), ("x2", x2), ("y2", y2)):
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise errors.TypeError(f"`{name}` must be a number.")
+    if not (0 <= x1 <= 1 and 0 <= x2 <= 1):
+        raise errors.AttributeError(f"`x1` and `x2` must be within [0, 1]; got {x1} and {x2}.")
+    return Easing("cubic-bezier", (x1, y1, x2, y2))
+
+
+def steps(count: int, *, start: bool = False) -> Easing:
+    """
+    An easing that jumps in `count` equal steps, like `steps()` in CSS. The
+    first jump is when the move starts if `start` is true, and otherwise
+    after the first step.
+    """
+    if not isinstance(count, int) or isinstance(count, bool):
+        raise errors.TypeError("`count` must be an integer.")
+    if count < 1:
+        raise errors.AttributeError(f"`count` must be at least 1; got {count}.")
+    return Easing("steps", (count, bool(start)))
+
+
+LINEAR = Easing("linear")
+EASE = cubic_bezier(0.25, 0.1, 0.25, 1)
+EASE_IN = cubic_bezier(0.42, 0, 1, 1)
+EASE_IN_OUT = cubic_bezier(0.42, 0, 0.58, 1)
+EASE_OUT = cubic_bezier(0, 0, 0.58, 1)
+
+_NAMED = {
+    "ease": EASE, "ease-in": EASE_IN, "ease-in-out": EASE_IN_OUT, "ease-out": EASE_OUT, "linear": LINEAR
+}
+
+
+def get(easing: Easing | str) -> Easing:
+    """
+    The easing itself, or the one of a name ("linear", "ease", "ease-in",
+    "ease-out" or "ease-in-out").
+    """
+    if isinstance(easing, Easing):
+        return easing
+    elif isinstance(easing, str):
+        try:
+            return _NAMED[easing]
+        except KeyError:
+            raise errors.AttributeError(f"Unknown easing: {easing!r}.") from None
+    raise errors.TypeError(f"`easing` must be an Easing or the name of one, got type {type(easing)}.")
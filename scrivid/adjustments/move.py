@@ -1,20 +1,78 @@
 from __future__ import annotations
 
-from ._type_check import check_hashable, check_inheritance, check_int
+from ._type_check import (
+    check_hashable, check_hashable_column, check_inheritance, check_int, check_int_column, check_same_length
+)
 from .core import MoveAdjustment
+from .easing import Easing, get as get_easing, LINEAR
 
 from .. import properties
 
+import itertools
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
     from typing import Hashable
 
 
-def create(ID: Hashable, activation_time: int, change: properties.Properties, duration: int) -> MoveAdjustment:
+def create(
+        ID: Hashable,
+        activation_time: int,
+        change: properties.Properties,
+        duration: int,
+        *,
+        easing: Easing | str = LINEAR
+) -> MoveAdjustment:
+    """
+    Creates a move of `change` over `duration` frames. `easing` is how it
+    moves over that time: an Easing from the `easing` module (such as
+    `easing.cubic_bezier(...)` or `easing.steps(...)`), or the name of one
+    ("linear", "ease", "ease-in", "ease-out" or "ease-in-out").
+    """
     check_hashable("ID", ID)
     check_int("activation_time", activation_time)
     check_inheritance("change", change, properties.Properties)
     check_int("duration", duration)
+    easing = get_easing(easing)
 
-    return MoveAdjustment(ID, activation_time, change, duration)
+    return MoveAdjustment(ID, activation_time, change, duration, easing)
+
+
+def create_many(
+        IDs: Iterable[Hashable],
+        activation_times: Iterable[int],
+        durations: Iterable[int],
+        *,
+        x: Iterable[int] | None = None,
+        y: Iterable[int] | None = None,
+        easing: Easing | str = LINEAR
+) -> list[MoveAdjustment]:
+    """
+    Creates a move for every ID, activation time and duration, checking each
+    column once rather than each adjustment. The moves change the x and y
+    positions by the values in `x` and `y`; a position that's not given is
+    excluded from every change. Every move has the same `easing` (see
+    `create`).
+    """
+    IDs = check_hashable_column("IDs", IDs)
+    activation_times = check_int_column("activation_times", activation_times)
+    durations = check_int_column("durations", durations)
+    columns = {"IDs": IDs, "activation_times": activation_times, "durations": durations}
+
+    excluded = itertools.repeat(properties.EXCLUDED, len(IDs))
+    if x is None:
+        x = excluded
+    else:
+        x = columns["x"] = check_int_column("x", x)
+    if y is None:
+        y = excluded
+    else:
+        y = columns["y"] = check_int_column("y", y)
+    check_same_length(**columns)
+    easing = get_easing(easing)
+
+    return [
+        MoveAdjustment(ID, activation_time, properties.Properties(x=x_, y=y_), duration, easing)
+        for ID, activation_time, duration, x_, y_ in zip(IDs, activation_times, durations, x, y)
+    ]
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-from ._type_check import check_hashable, check_int
+from ._type_check import check_hashable, check_hashable_column, check_int, check_int_column, check_same_length
 from .core import ShowAdjustment
 
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
     from typing import Hashable
 
 
@@ -13,3 +14,14 @@ def create(ID: Hashable, activation_time: int) -> ShowAdjustment:
     check_hashable("ID", ID)
     check_int("activation_time", activation_time)
     return ShowAdjustment(ID, activation_time)
+
+
+def create_many(IDs: Iterable[Hashable], activation_times: Iterable[int]) -> list[ShowAdjustment]:
+    """
+    Creates an adjustment for every pair of an ID and an activation time,
+    checking each column once rather than each adjustment.
+    """
+    IDs = check_hashable_column("IDs", IDs)
+    activation_times = check_int_column("activation_times", activation_times)
+    check_same_length(IDs=IDs, activation_times=activation_times)
+    return list(map(ShowAdjustment, IDs, activation_times))
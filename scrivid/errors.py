@@ -41,6 +41,10 @@ class AttributeError(ScrividException):
     ...
 
 
+class CancelledError(ScrividException):
+    """ An exception that is propagated when a render is cancelled. """
+
+
 @define(frozen=True)
 class ConflictingAttributesError(AttributeError):
     """
@@ -64,6 +68,10 @@ class ConflictingAttributesError(AttributeError):
         return _use_default_message_name(self)
 
 
+class DecodeError(ScrividException):
+    """ An exception that is propagated when serialized data cannot be read. """
+
+
 @define(frozen=True)
 class DuplicateIDError(ScrividException):
     """ An exception that is propagated when there is a duplicate ID field. """
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+from . import _ffmpeg, errors
+
+import json
+import mmap
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from PIL import Image
+
+if TYPE_CHECKING:
+    from .progress import CancellationToken
+
+    from collections.abc import Iterator
+
+
+_BYTES_PER_PIXEL = 3  # rgb24
+_INDEX_VERSION = 1
+
+
+def _index_file(data_file: Path) -> Path:
+    return data_file.with_name(f"{data_file.name}.json")
+
+
+def _written_ranges(written: bytearray) -> Iterator[tuple[int, int]]:
+    start = None
+    for index, flag in enumerate(written):
+        if flag and start is None:
+            start = index
+        elif not flag and start is not None:
+            yield start, index
+            start = None
+    if start is not None:
+        yield start, len(written)
+
+
+class RawFrameStore:
+    """
+    Stores frames as raw RGB bytes in one memory-mapped file, where every
+    frame index has a slot of the same size. Since the slots have a fixed
+    stride, reading or writing a frame by its index is a single offset into
+    the file, with nothing to encode or decode. The data file can be read by
+    ffmpeg directly as 'rawvideo' (see `ffmpeg_input_arguments`).
+
+    Alongside the data file, an index file ('<data file>.json') records the
+    dimensions and frame rate of the frames, and which of the slots have been
+    written to.
+
+    Use `create` to make a new store, and `open` to load an existing one.
+    """
+
+    __slots__ = ("_file_handler", "_map", "_written", "frame_count", "frame_rate", "path", "window_size")
+
+    _file_handler: object
+    _map: mmap.mmap | None
+    _written: bytearray
+    frame_count: int
+    frame_rate: int
+    path: Path
+    window_size: tuple[int, int]
+
+    def __init__(self, path: Path, window_size: tuple[int, int], frame_rate: int, frame_count: int, /):
+        self._file_handler = None
+        self._map = None
+        self._written = bytearray(frame_count)
+        self.frame_count = frame_count
+        self.frame_rate = frame_rate
+        self.path = path
+        self.window_size = window_size
+
+    def __repr__(self):
+        path = self.path
+        window_size = self.window_size
+        frame_count = self.frame_count
+        return f"{self.__class__.__name__}({path=!r}, {window_size=}, {frame_count=})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __len__(self):
+        return self.frame_count
+
+    @property
+    def frame_size(self) -> int:
+        """ The size of one slot, in bytes. """
+        return self.window_size[0] * self.window_size[1] * _BYTES_PER_PIXEL
+
+    @property
+    def is_opened(self) -> bool:
+        return self._map is not None
+
+    @classmethod
+    def create(
+            cls,
+            path: str | Path,
+            window_size: tuple[int, int],
+            frame_rate: int,
+            frame_count: int
+    ) -> RawFrameStore:
+        """
+        Creates (or overwrites) the data file at `path`, sized for
+        `frame_count` frames of `window_size`, and opens it for writing.
+        """
+        if frame_count < 1:
+            raise errors.AttributeError("A RawFrameStore must hold at least one frame.")
+
+        self = cls(Path(path), tuple(window_size), frame_rate, frame_count)
+        with self.path.open("wb") as file:
+            file.truncate(self.frame_size * frame_count)
+        self._map_file()
+        self._write_index()
+        return self
+
+    @classmethod
+    def open(cls, path: str | Path) -> RawFrameStore:
+        """ Opens an existing store, as written by `create`. """
+        path = Path(path)
+        index = json.loads(_index_file(path).read_text())
+        if index.get("version") != _INDEX_VERSION:
+            raise errors.AttributeError(f"Unsupported RawFrameStore index version: {index.get('version')!r}.")
+
+        self = cls(path, tuple(index["window_size"]), index["frame_rate"], index["frame_count"])
+        for start, end in index["written"]:
+            self._written[start:end] = b"\x01" * (end - start)
+        self._map_file()
+        return self
+
+    def _map_file(self):
+        self._file_handler = self.path.open("r+b")
+        self._map = mmap.mmap(self._file_handler.fileno(), self.frame_size * self.frame_count)
+
+    def _offset(self, index: int) -> int:
+        if not 0 <= index < self.frame_count:
+            raise IndexError(f"Frame index {index} out of range for a store of {self.frame_count} frames.")
+        return index * self.frame_size
+
+    def _write_index(self):
+        index = {
+            "version": _INDEX_VERSION,
+            "pix_fmt": "rgb24",
+            "window_size": list(self.window_size),
+            "frame_rate": self.frame_rate,
+            "frame_count": self.frame_count,
+            "written": [list(r) for r in _written_ranges(self._written)]
+        }
+        _index_file(self.path).write_text(json.dumps(index))
+
+    def close(self):
+        if self._map is None:
+            return
+        self._map.flush()
+        self._write_index()
+        try:
+            self._map.close()
+        except BufferError:
+            # The store stays open, so that it can be closed once the views
+            # are released.
+            raise errors.AttributeError(
+                "The RawFrameStore can't be closed while views from `read_view` are held; release them first."
+            ) from None
+        self._file_handler.close()
+        self._map = None
+        self._file_handler = None
+
+    def ffmpeg_input_arguments(self) -> list[str]:
+        """ The arguments for ffmpeg to read the data file as an input. """
+        return _ffmpeg.raw_input_arguments(self.window_size, self.frame_rate, self.path)
+
+    def encode(
+            self,
+            output_file: str | Path,
+            *,
+            bit_rate: str = "4M",
+            codec: str = "libx264",
+            executable: str = "ffmpeg",
+            cancellation: CancellationToken | None = None
+    ):
+        """
+        Encodes the stored frames into a video file with ffmpeg, using the
+        same settings as sinks.FFmpegSink. If `cancellation` is cancelled
+        while ffmpeg is running, ffmpeg is killed, and errors.CancelledError
+        is raised.
+        """
+        if self._map is not None:
+            self._map.flush()
+        _ffmpeg.run(_ffmpeg.command(
+            executable,
+            self.ffmpeg_input_arguments(),
+            output_file,
+            bit_rate=bit_rate,
+            codec=codec,
+            window_size=self.window_size
+        ), cancellation)
+
+    def is_written(self, index: int) -> bool:
+        self._offset(index)
+        return bool(self._written[index])
+
+    def read(self, index: int) -> Image.Image:
+        """ A copy of the frame, as an image. """
+        return Image.frombytes("RGB", self.window_size, self.read_bytes(index))
+
+    def read_bytes(self, index: int) -> bytes:
+        """ A copy of the slot of the frame. """
+        offset = self._offset(index)
+        return self._map[offset:offset + self.frame_size]
+
+    def read_view(self, index: int) -> memoryview:
+        """
+        A view of the slot of the frame, without copying it. The view must be
+        released (with `memoryview.release`, or by using it as a context
+        manager) before the store is closed; `close` raises
+        errors.AttributeError while any view of it is still held.
+        """
+        offset = self._offset(index)
+        with memoryview(self._map) as view:
+            return view[offset:offset + self.frame_size]
+
+    def write(self, index: int, frame: Image.Image | bytes | memoryview):
+        offset = self._offset(index)
+        if isinstance(frame, Image.Image):
+            if frame.size != self.window_size:
+                raise errors.AttributeError(
+                    f"Frame of size {frame.size} does not fit in a store of size {self.window_size}."
+                )
+            if frame.mode != "RGB":
+                frame = frame.convert("RGB")
+            frame = frame.tobytes()
+        elif len(frame) != self.frame_size:
+            raise errors.AttributeError(f"Expected {self.frame_size} bytes for a frame; got {len(frame)}.")
+
+        self._map[offset:offset + self.frame_size] = frame
+        self._written[index] = 1
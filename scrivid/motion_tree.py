@@ -1,21 +1,30 @@
 from __future__ import annotations
 
-from . import adjustments
-from ._separating_instructions import separate_instructions, SeparatedInstructions
-
-from collections.abc import Hashable
+from . import _frame_plan, adjustments, errors, properties
+from ._adjustment_index import AdjustmentIndex
+from ._file_objects.images import ImageReference
+from ._scene_store import SceneStore
+from ._separating_instructions import (
+    _discard_adjustment, _handle_adjustment, _handle_adjustments, _handle_reference, separate_instructions,
+    SeparatedInstructions
+)
+from .abc import Adjustment
+
+from array import array
+import bisect
+from collections import Counter, OrderedDict
+from collections.abc import Hashable, MutableSequence
+import heapq
+import itertools
+import json
 import operator
 from typing import TYPE_CHECKING
 
-from sortedcontainers import SortedList
-
 if TYPE_CHECKING:
-    from .abc import Adjustment
-    from ._file_objects.images import ImageReference
-
-    from collections.abc import Sequence
-    from typing import Iterator, TypeAlias
+    from collections.abc import Iterable, Sequence
+    from typing import Any, Iterator, TypeAlias
 
+    INSTRUCTIONS: TypeAlias = ImageReference | Adjustment
     REFERENCES: TypeAlias = ImageReference
 
 
@@ -168,19 +177,32 @@ class Start(_RootMotionTree):
 
 
 class VideoInstructions(_RootMotionTree):
-    __slots__ = ("_body",)
+    __slots__ = ("_body", "_instructions")
 
     _body: list[MOTION_NODES]
+    _instructions: SeparatedInstructions | None
 
     def __new__(cls):
         self = super().__new__(cls)
         self._body = []
+        self._instructions = None
         return self
 
     @property
     def body(self) -> list[MOTION_NODES]:
         return self._body
 
+    @property
+    def index(self) -> AdjustmentIndex:
+        """
+        The AdjustmentIndex of the adjustments that the tree was parsed from,
+        for asking which of them are in effect at a given time. A tree that
+        was not made by `parse` has an empty index.
+        """
+        if self._instructions is None:
+            return AdjustmentIndex({})
+        return self._instructions.index
+
     def convert_to_string(self, *, indent: int = 0, _previous_indent: int = 0) -> str:
         if len(self.body) == 0:
             return repr(self)
@@ -201,6 +223,16 @@ class VideoInstructions(_RootMotionTree):
             + "])"
         )
 
+    def to_store(self) -> SceneStore:
+        """
+        The references and adjustments that the tree was parsed from, as a
+        SceneStore of NumPy columns (see SeparatedInstructions.to_store). A
+        tree that was not made by `parse` gives an empty store.
+        """
+        if self._instructions is None:
+            return SceneStore(SeparatedInstructions())
+        return self._instructions.to_store()
+
 
 if TYPE_CHECKING:
     # This is set up *after* the MotionTree Nodes are defined, to prevent type checking issues
@@ -215,6 +247,200 @@ def dump(motion_tree: VideoInstructions, *, indent: int = 0) -> str:
         return repr(motion_tree)
 
 
+# The binary format: the magic bytes and the format version, the table of
+# IDs, then every node of the body as its tag and operands. Every number is
+# a zigzag-encoded LEB128 varint, and every string is its length followed by
+# its UTF-8 bytes.
+_MAGIC = b"SCMT"
+_FORMAT_VERSION = 1
+
+_INT_ID, _STR_ID = range(2)
+_NODE_TAGS = (Start, End, Continue, InvokePrevious, HideImage, ShowImage, MoveImage)
+_OPERAND_COUNTS = (0, 0, 1, 1, 2, 2, 3)
+_TAGS = {node_type: tag for tag, node_type in enumerate(_NODE_TAGS)}
+_FIRST_ID_TAG = 4  # The nodes from HideImage on have an ID as their first operand.
+
+
+def _write_varint(buffer: bytearray, value: int):
+    value = (value << 1) ^ (value >> 63) if -(1 << 63) <= value < (1 << 63) else None
+    if value is None:
+        raise errors.TypeError("Only integers that fit in 64 bits can be serialized.")
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(data: bytes, position: int) -> tuple[int, int]:
+    value = shift = 0
+    try:
+        while True:
+            byte = data[position]
+            position += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+    except IndexError:
+        raise errors.DecodeError("The motion tree data ends unexpectedly.") from None
+    return (value >> 1) ^ -(value & 1), position
+
+
+def _check_id(ID: Any) -> Any:
+    if type(ID) not in (int, str):
+        raise errors.TypeError(f"Only int and str IDs can be serialized, got type \'{ID.__class__.__name__}\'.")
+    return ID
+
+
+def _node_operands(node: MOTION_NODES) -> tuple:
+    node_type = type(node)
+    if node_type in (Start, End):
+        return ()
+    elif node_type in (Continue, InvokePrevious):
+        return (node.length,)
+    elif node_type in (HideImage, ShowImage):
+        return (_check_id(node.id), node.time)
+    elif node_type is MoveImage:
+        return (_check_id(node.id), node.time, node.duration)
+    raise errors.TypeError(f"Cannot serialize a node of type \'{node_type.__name__}\'.")
+
+
+def _create_node(node_type: type, operands: Sequence) -> MOTION_NODES:
+    try:
+        return node_type(*operands)
+    except TypeError:
+        raise errors.DecodeError(f"Wrong operands for a {node_type.__name__} node: {operands!r}.") from None
+
+
+class ColumnarBody(MutableSequence):
+    """
+    The body of a motion tree, stored as parallel arrays instead of a node
+    object for each node; `to_columnar` and `parse(..., columnar=True)` give
+    a VideoInstructions with one. It takes a fraction of the memory of a
+    list of nodes, and behaves like one (so `walk`, `dump` and the rest work
+    with it): the nodes are made again as they're read.
+
+    The numbers are kept as 32-bit integers, and the tags as bytes. The
+    arrays support the buffer protocol, so they can also be scanned without
+    making any nodes, such as with `numpy.frombuffer`.
+
+    :ivar durations: The duration of each MoveImage node, and the length of
+        each Continue and InvokePrevious node; otherwise 0.
+    :ivar id_numbers: The number of each ID in `ids`; otherwise -1.
+    :ivar ids: The IDs, in the order they were first seen.
+    :ivar tags: The type of each node, as its position in the node tags of
+        the binary format (`Start`, `End`, `Continue`, `InvokePrevious`,
+        `HideImage`, `ShowImage`, `MoveImage`).
+    :ivar times: The time of each HideImage, MoveImage and ShowImage node;
+        otherwise 0.
+    """
+    __slots__ = ("_numbers", "durations", "id_numbers", "ids", "tags", "times")
+
+    _numbers: dict[Hashable, int]
+    durations: array[int]
+    id_numbers: array[int]
+    ids: list[Hashable]
+    tags: array[int]
+    times: array[int]
+
+    def __init__(self, nodes: Iterable[MOTION_NODES] = ()):
+        self._numbers = {}
+        self.durations = array("i")
+        self.id_numbers = array("i")
+        self.ids = []
+        self.tags = array("B")
+        self.times = array("i")
+        self.extend(nodes)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({list(self)!r})"
+
+    def __len__(self):
+        return len(self.tags)
+
+    def __iter__(self) -> Iterator[MOTION_NODES]:
+        ids = self.ids
+        for tag, id_number, time, duration in zip(self.tags, self.id_numbers, self.times, self.durations):
+            yield self._node(tag, ids[id_number] if id_number >= 0 else None, time, duration)
+
+    def __getitem__(self, index: int | slice) -> MOTION_NODES | list[MOTION_NODES]:
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        id_number = self.id_numbers[index]
+        ID = self.ids[id_number] if id_number >= 0 else None
+        return self._node(self.tags[index], ID, self.times[index], self.durations[index])
+
+    def __setitem__(self, index: int | slice, node: MOTION_NODES | Iterable[MOTION_NODES]):
+        if isinstance(index, slice):
+            replacement = ColumnarBody()
+            replacement._numbers, replacement.ids = self._numbers, self.ids
+            replacement.extend(node)
+            for column in ("durations", "id_numbers", "tags", "times"):
+                getattr(self, column)[index] = getattr(replacement, column)
+            return
+        tag, id_number, time, duration = self._columns(node)
+        self.durations[index] = duration
+        self.id_numbers[index] = id_number
+        self.tags[index] = tag
+        self.times[index] = time
+
+    def __delitem__(self, index: int | slice):
+        for column in (self.durations, self.id_numbers, self.tags, self.times):
+            del column[index]
+
+    @staticmethod
+    def _node(tag: int, ID: Hashable, time: int, duration: int) -> MOTION_NODES:
+        node_type = _NODE_TAGS[tag]
+        if node_type is MoveImage:
+            return MoveImage(ID, time, duration)
+        elif node_type in (HideImage, ShowImage):
+            return node_type(ID, time)
+        elif node_type in (Continue, InvokePrevious):
+            return node_type(duration)
+        return node_type()
+
+    def _columns(self, node: MOTION_NODES) -> tuple[int, int, int, int]:
+        node_type = type(node)
+        tag = _TAGS.get(node_type)
+        if tag is None:
+            raise errors.TypeError(f"Cannot store a node of type '{node_type.__name__}' in a ColumnarBody.")
+        elif tag >= _FIRST_ID_TAG:
+            ID = node.id
+            id_number = self._numbers.get(ID)
+            if id_number is None:
+                id_number = self._numbers[ID] = len(self.ids)
+                self.ids.append(ID)
+            return tag, id_number, node.time, getattr(node, "duration", 0)
+        return tag, -1, 0, getattr(node, "length", 0)
+
+    def append(self, node: MOTION_NODES):
+        tag, id_number, time, duration = self._columns(node)
+        self.durations.append(duration)
+        self.id_numbers.append(id_number)
+        self.tags.append(tag)
+        self.times.append(time)
+
+    def extend(self, nodes: Iterable[MOTION_NODES]):
+        if nodes is self:
+            nodes = list(nodes)
+        for node in nodes:
+            self.append(node)
+
+    def insert(self, index: int, node: MOTION_NODES):
+        tag, id_number, time, duration = self._columns(node)
+        self.durations.insert(index, duration)
+        self.id_numbers.insert(index, id_number)
+        self.tags.insert(index, tag)
+        self.times.insert(index, time)
+
+    def kinds(self) -> Iterator[tuple[type, int]]:
+        """ Yields the type of every node with its length (0 unless it has one), without making the nodes. """
+        lengths = (Continue, InvokePrevious)
+        for tag, duration in zip(self.tags, self.durations):
+            node_type = _NODE_TAGS[tag]
+            yield node_type, duration if node_type in lengths else 0
+
+
 def _create_command_node(adjustment: Adjustment) -> ADJUSTMENT_NODES | None:
     adjustment_type = type(adjustment)
     adjustment_time = adjustment.activation_time
@@ -232,14 +458,8 @@ def _create_command_node(adjustment: Adjustment) -> ADJUSTMENT_NODES | None:
 
 def _create_motion_tree(separated_instructions: SeparatedInstructions) -> VideoInstructions:
     motion_tree = VideoInstructions()
-
-    motion_tree.body.append(Start())
-
-    for node in _loop_over_adjustments(separated_instructions.adjustments):
-        motion_tree.body.append(node)
-
-    motion_tree.body.append(End())
-
+    motion_tree.body.extend(_stream_motion_tree(separated_instructions))
+    motion_tree._instructions = separated_instructions
     return motion_tree
 
 
@@ -253,64 +473,741 @@ def _invoke_duration_value(duration_value: int, current_node: ADJUSTMENT_NODES)
         return duration_value
 
 
-def _loop_over_adjustments(adjustments: dict[Adjustment]) -> Iterator[MOTION_NODES]:
-    current_node = None
-    duration_value = 0
-    sorted_adjustments = SortedList(
-        id_of_adj_value 
-        for adj_value in adjustments.values() 
-        for id_of_adj_value in adj_value
-    )
-    time_index = 0
-
-    while sorted_adjustments or current_node:
-        if current_node is None:
-            adjustment = sorted_adjustments.pop(0)
-            current_node = _create_command_node(adjustment)
+def _merge_adjustments(adjustments: dict[Hashable, Sequence[Adjustment]]) -> Iterator[Adjustment]:
+    # Every list of adjustments is already sorted, so they only need to be
+    # merged. Adjustments at the same time come out in the order of their IDs
+    # in the dict, like a stable sort of all of them would give.
+    return heapq.merge(*adjustments.values(), key=operator.attrgetter("activation_time"))
 
-        if current_node.time <= time_index:
-            yield current_node
-            duration_value = _invoke_duration_value(
-                duration_value, current_node
-            )
-            current_node = None
-            continue
 
+def _advance(
+        current_node: ADJUSTMENT_NODES,
+        duration_value: int,
+        time_index: int,
+        nodes: list[MOTION_NODES]
+) -> tuple[int, int]:
+    # Appends the nodes up to, and including, the node of the next
+    # adjustment, and returns the state that the nodes after it start from.
+    while current_node.time > time_index:
         time_difference = current_node.time - time_index
 
         if duration_value != 0 and duration_value <= time_difference:
             duration_value = _invoke_duration_value(duration_value, current_node)
-            yield InvokePrevious(duration_value)
+            nodes.append(InvokePrevious(duration_value))
             time_index += duration_value
             duration_value = 0
-            continue
-
         elif duration_value != 0 and duration_value > time_difference:
-            yield InvokePrevious(time_difference)
+            nodes.append(InvokePrevious(time_difference))
             time_index += time_difference
             duration_value = _invoke_duration_value((duration_value - time_difference), current_node)
-            continue
-
         else:
-            yield Continue(time_difference)
+            nodes.append(Continue(time_difference))
             time_index += time_difference
 
-        yield current_node
+    nodes.append(current_node)
+    return _invoke_duration_value(duration_value, current_node), time_index
 
-        duration_value = _invoke_duration_value(duration_value, current_node)
-        current_node = None
 
-    if current_node is not None:
-        duration_value = _invoke_duration_value(duration_value, current_node)
+def _loop_over_adjustments(adjustments: dict[Hashable, Sequence[Adjustment]]) -> Iterator[MOTION_NODES]:
+    duration_value = 0
+    time_index = 0
+    nodes = []
+
+    for adjustment in _merge_adjustments(adjustments):
+        duration_value, time_index = _advance(_create_command_node(adjustment), duration_value, time_index, nodes)
+        yield from nodes
+        nodes.clear()
+
     if duration_value != 0:
         yield InvokePrevious(duration_value)
 
 
-def parse(instructions: Sequence[REFERENCES] | SeparatedInstructions) -> VideoInstructions:
+def _stream_motion_tree(separated_instructions: SeparatedInstructions) -> Iterator[MOTION_NODES]:
+    yield Start()
+    yield from _loop_over_adjustments(separated_instructions.adjustments)
+    yield End()
+
+
+def from_bytes(data: bytes) -> VideoInstructions:
+    """
+    Reads a motion tree written by `to_bytes`. The tree has an empty index,
+    since the adjustments are not part of the data.
+    """
+    data = bytes(data)
+    if data[:len(_MAGIC)] != _MAGIC:
+        raise errors.DecodeError("The data is not a serialized motion tree.")
+    position = len(_MAGIC)
+    version, position = _read_varint(data, position)
+    if version != _FORMAT_VERSION:
+        raise errors.DecodeError(f"Unsupported motion tree format version {version}.")
+
+    ids = []
+    id_count, position = _read_varint(data, position)
+    for _ in range(id_count):
+        kind, position = _read_varint(data, position)
+        if kind == _INT_ID:
+            ID, position = _read_varint(data, position)
+        elif kind == _STR_ID:
+            length, position = _read_varint(data, position)
+            raw = data[position:position + length]
+            if len(raw) != length:
+                raise errors.DecodeError("The motion tree data ends unexpectedly.")
+            ID = raw.decode("utf-8")
+            position += length
+        else:
+            raise errors.DecodeError(f"Unknown kind of ID {kind}.")
+        ids.append(ID)
+
+    motion_tree = VideoInstructions()
+    body = motion_tree.body
+    node_count, position = _read_varint(data, position)
+    for _ in range(node_count):
+        tag, position = _read_varint(data, position)
+        if not 0 <= tag < len(_NODE_TAGS):
+            raise errors.DecodeError(f"Unknown node tag {tag}.")
+        node_type = _NODE_TAGS[tag]
+
+        operands = []
+        for _ in range(_OPERAND_COUNTS[tag]):
+            operand, position = _read_varint(data, position)
+            operands.append(operand)
+        if tag >= _FIRST_ID_TAG:
+            try:
+                operands[0] = ids[operands[0]]
+            except IndexError:
+                raise errors.DecodeError(f"Unknown ID number {operands[0]}.") from None
+        body.append(_create_node(node_type, operands))
+
+    if position != len(data):
+        raise errors.DecodeError("The motion tree data has trailing bytes.")
+    return motion_tree
+
+
+def from_json(text: str | bytes) -> VideoInstructions:
+    """ Reads a motion tree written by `to_json`, with an empty index. """
+    try:
+        document = json.loads(text)
+        version = document["version"]
+        body = document["body"]
+    except (ValueError, KeyError, TypeError):
+        raise errors.DecodeError("The text is not a serialized motion tree.") from None
+    if version != _FORMAT_VERSION:
+        raise errors.DecodeError(f"Unsupported motion tree format version {version}.")
+
+    node_types = {node_type.__name__: node_type for node_type in _NODE_TAGS}
+    motion_tree = VideoInstructions()
+    for entry in body:
+        if not isinstance(entry, list) or not entry or entry[0] not in node_types:
+            raise errors.DecodeError(f"Unknown node {entry!r}.")
+        motion_tree.body.append(_create_node(node_types[entry[0]], entry[1:]))
+    return motion_tree
+
+
+def _canonical_nodes(nodes: Iterable[MOTION_NODES]) -> Iterator[MOTION_NODES]:
+    # Drops the Continue and InvokePrevious nodes of no length, and joins the
+    # ones that follow a node of the same type.
+    pending = None
+    for node in nodes:
+        node_type = type(node)
+        if node_type in (Continue, InvokePrevious):
+            if node.length == 0:
+                continue
+            if type(pending) is node_type:
+                pending = node_type(pending.length + node.length)
+                continue
+        if pending is not None:
+            yield pending
+        pending = node
+    if pending is not None:
+        yield pending
+
+
+def _is_zero(value) -> bool:
+    return value is properties.EXCLUDED or value == 0
+
+
+def _is_noop_move(adjustment: Adjustment) -> bool:
+    change = adjustment.change
+    return (
+        change.visibility is properties.EXCLUDED
+        and all(_is_zero(getattr(change, name)) for name in ("layer", "scale", "x", "y"))
+    )
+
+
+def _velocity(move: Adjustment) -> tuple | None:
+    # The change of a move per frame, if it moves by the same whole number of
+    # pixels on every frame (and changes nothing else); otherwise None.
+    change, duration = move.change, move.duration
+    if duration < 2 or not move.easing.is_linear:
+        return None
+    if any(getattr(change, name) is not properties.EXCLUDED for name in ("layer", "scale")):
+        return None
+    if change.visibility is not properties.EXCLUDED:
+        return None
+
+    velocity = []
+    for value in (change.x, change.y):
+        if value is properties.EXCLUDED:
+            velocity.append(None)
+        elif type(value) is int and value % duration == 0:
+            velocity.append(value // duration)
+        else:
+            return None
+    return tuple(velocity)
+
+
+def _merge_moves(moves: list[Adjustment]) -> list[Adjustment]:
+    # Joins each move with the move that starts as it ends, if both move at
+    # the same constant speed. Moves of a single frame are left alone, since
+    # they take full effect on the frame they start, and so are moves that
+    # start at the same time as another move.
+    starts = Counter(move.activation_time for move in moves)
+    by_time = {move.activation_time: move for move in moves if starts[move.activation_time] == 1}
+    joined = set()
+    merged = []
+    for move in moves:
+        if id(move) in joined:
+            continue
+        velocity = _velocity(move)
+        x, y, duration = move.change.x, move.change.y, move.duration
+        following = by_time.get(move.activation_time + duration)
+
+        while (
+                velocity is not None and following is not None
+                and _velocity(following) == velocity
+        ):
+            joined.add(id(following))
+            if x is not properties.EXCLUDED:
+                x += following.change.x
+            if y is not properties.EXCLUDED:
+                y += following.change.y
+            duration += following.duration
+            following = by_time.get(move.activation_time + duration)
+
+        if duration != move.duration:
+            move = adjustments.move.create(move.ID, move.activation_time, properties.Properties(x=x, y=y), duration)
+        merged.append(move)
+    return merged
+
+
+def _simplify_adjustments(separated_instructions: SeparatedInstructions) -> SeparatedInstructions:
+    simplified = SeparatedInstructions()
+    simplified.references = separated_instructions.references
+
+    for ID, values in separated_instructions.adjustments.items():
+        moves = [adjustment for adjustment in values if type(adjustment) is adjustments.core.MoveAdjustment]
+        kept = _merge_moves([move for move in moves if not _is_noop_move(move)])
+
+        # Showing a shown image, or hiding a hidden one, does nothing; that
+        # can only be known for an ID with a reference, and no moves that
+        # change its visibility.
+        visibility = None
+        if ID in separated_instructions.references and all(
+                move.change.visibility is properties.EXCLUDED for move in moves
+        ):
+            visibility = separated_instructions.references[ID].visibility
+
+        for adjustment in values:
+            adjustment_type = type(adjustment)
+            if adjustment_type is adjustments.core.MoveAdjustment:
+                continue
+            elif adjustment_type is adjustments.core.HideAdjustment:
+                status = properties.VisibilityStatus.HIDE
+            elif adjustment_type is adjustments.core.ShowAdjustment:
+                status = properties.VisibilityStatus.SHOW
+            else:
+                kept.append(adjustment)
+                continue
+
+            if visibility is status:
+                continue
+            if visibility is not None:
+                visibility = status
+            kept.append(adjustment)
+
+        for adjustment in sorted(kept, key=operator.attrgetter("activation_time")):
+            _handle_adjustment(simplified, adjustment)
+
+    return simplified
+
+
+def _drawn_before(spans: Iterable[_frame_plan.FrameSpan], frame_count: int) -> list[int]:
+    # For every frame, the index of the frame that it shows: itself if it's
+    # drawn, or the last drawn frame before it if it's held.
+    shown = []
+    for span in spans:
+        if span.kind is _frame_plan.FrameKind.DRAW:
+            shown.extend(span)
+        else:
+            shown.extend([span.index - 1] * span.length)
+    return shown[:frame_count]
+
+
+def _shows_same_frames(
+        original: VideoInstructions,
+        candidate: VideoInstructions,
+        simplified: SeparatedInstructions
+) -> bool:
+    # The simplified adjustments give the same state as the originals on
+    # every frame, so a frame looks the same in both trees as long as
+    # nothing changes between the frames that each tree shows for it.
+    frame_count = _frame_plan.count_frames(original)
+    if _frame_plan.count_frames(candidate) != frame_count:
+        return False
+
+    adjustment_index = simplified.index
+    times = sorted(
+        adjustment.activation_time for values in simplified.adjustments.values() for adjustment in values
+    )
+    shown = _drawn_before(_frame_plan.plan_frames(original), frame_count)
+    candidate_shown = _drawn_before(_frame_plan.plan_frames(candidate), frame_count)
+
+    for a, b in set(zip(shown, candidate_shown)):
+        if a == b:
+            continue
+        low, high = min(a, b), max(a, b)
+        if bisect.bisect_right(times, high) > bisect.bisect_right(times, low):
+            return False
+        if adjustment_index.overlapping(low, high):
+            return False
+    return True
+
+
+def _optimize_motion_tree(motion_tree: VideoInstructions) -> VideoInstructions:
+    optimized = VideoInstructions()
+    optimized._instructions = motion_tree._instructions
+    optimized.body.extend(_canonical_nodes(motion_tree.body))
+    if motion_tree._instructions is None:
+        return optimized
+
+    simplified = _simplify_adjustments(motion_tree._instructions)
+    candidate = VideoInstructions()
+    candidate._instructions = simplified
+    nodes = list(_stream_motion_tree(simplified))
+
+    # Dropping a move at the end of the video would make it shorter; the
+    # frame after the last one is drawn instead, and held until the same
+    # length.
+    shortened_by = _frame_plan.count_frames(motion_tree) - _frame_plan.count_frames(nodes)
+    if shortened_by > 0:
+        nodes[-1:-1] = [InvokePrevious(1), Continue(shortened_by - 1)]
+    candidate.body.extend(_canonical_nodes(nodes))
+
+    if len(candidate.body) < len(optimized.body) and _shows_same_frames(motion_tree, candidate, simplified):
+        return candidate
+    return optimized
+
+
+def iterparse(instructions: Iterable[INSTRUCTIONS] | SeparatedInstructions) -> Iterator[MOTION_NODES]:
+    """
+    Yields the nodes of the body of the motion tree one at a time, from
+    `Start` to `End`, instead of building the whole tree. Other than the
+    nodes that are kept by the caller, it only holds one adjustment for every
+    ID at a time.
+    """
     if not isinstance(instructions, SeparatedInstructions):
         instructions = separate_instructions(instructions)
 
-    return _create_motion_tree(instructions)
+    return _stream_motion_tree(instructions)
+
+
+def optimize(motion_tree: VideoInstructions) -> VideoInstructions:
+    """
+    Returns a simpler motion tree that gives the same video. Adjacent
+    `Continue` and `InvokePrevious` nodes are joined, and those of no length
+    are dropped. For a tree made by `parse`, the adjustments are simplified
+    as well: moves that change nothing, and shows and hides that don't change
+    the visibility, are dropped, and a move that starts as another one ends,
+    at the same speed, is joined to it. The simplified adjustments are only
+    kept if every frame of the video stays the same; the index of the new
+    tree is built from them.
+    """
+    return _optimize_motion_tree(motion_tree)
+
+
+_HIDE = adjustments.core.HideAdjustment
+_MOVE = adjustments.core.MoveAdjustment
+_SHOW = adjustments.core.ShowAdjustment
+
+
+class ParseCache:
+    """
+    Keeps the motion trees of recently parsed instructions, so that parsing
+    the same adjustments again (such as rendering the same template with
+    other images) skips separating and parsing them. Pass it to `parse`, or
+    to `compile_video` as `parse_cache`.
+
+    The trees are looked up by the attributes of the adjustments (and the
+    types of their values), in the order they're given. The references are always taken from the instructions being
+    parsed, so a cached tree never refers to the images of an earlier call.
+
+    :param maxsize: The most trees that are kept; the least recently used
+        tree is dropped first.
+    :ivar hits: The number of lookups that found a tree.
+    :ivar misses: The number of lookups that parsed the instructions.
+    """
+    __slots__ = ("_entries", "hits", "maxsize", "misses")
+
+    _entries: OrderedDict[tuple, tuple[SeparatedInstructions, list[MOTION_NODES]]]
+
+    def __init__(self, maxsize: int = 16):
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.maxsize = maxsize
+        self.misses = 0
+
+    def __repr__(self):
+        maxsize = self.maxsize
+        hits = self.hits
+        misses = self.misses
+        return f"{self.__class__.__name__}({maxsize=}, {hits=}, {misses=})"
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    def _parse(self, instructions: Iterable[INSTRUCTIONS]) -> VideoInstructions:
+        separated_instructions = SeparatedInstructions()
+        pending_adjustments = []
+        keys = []
+        cacheable = True
+
+        for instruction in instructions:
+            instruction_type = type(instruction)
+            if instruction_type is _MOVE and isinstance(instruction.change, properties.Properties):
+                layer, scale, visibility, x, y = properties._values(instruction.change)
+                keys.append((
+                    _MOVE, instruction.ID, instruction.activation_time, instruction.duration, instruction.easing,
+                    type(layer), layer, type(scale), scale, type(visibility), visibility, type(x), x, type(y), y
+                ))
+            elif instruction_type is _HIDE or instruction_type is _SHOW:
+                keys.append((instruction_type, instruction.ID, instruction.activation_time))
+            elif isinstance(instruction, ImageReference):
+                _handle_reference(separated_instructions, instruction)
+                continue
+            elif isinstance(instruction, Adjustment):
+                # Other kinds of adjustments aren't keyed, so the
+                # instructions are parsed without the cache.
+                cacheable = False
+            else:
+                continue
+            pending_adjustments.append(instruction)
+
+        if not cacheable:
+            self.misses += 1
+            _handle_adjustments(separated_instructions, pending_adjustments)
+            return _create_motion_tree(separated_instructions)
+
+        key = tuple(keys)
+        cached = self._entries.get(key)
+        motion_tree = VideoInstructions()
+
+        if cached is None:
+            self.misses += 1
+            _handle_adjustments(separated_instructions, pending_adjustments)
+            motion_tree.body.extend(_stream_motion_tree(separated_instructions))
+            # The entry keeps the adjustments, but not the references.
+            shared = SeparatedInstructions()
+            shared.adjustments = separated_instructions.adjustments
+            self._entries[key] = (shared, list(motion_tree.body))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            # The adjustments, their index and the nodes are shared with the
+            # earlier calls; none of them are changed once parsed.
+            shared, body = cached
+            separated_instructions.adjustments = shared.adjustments
+            separated_instructions._index = shared.index
+            motion_tree.body.extend(body)
+
+        motion_tree._instructions = separated_instructions
+        return motion_tree
+
+
+def parse(
+        instructions: Iterable[INSTRUCTIONS] | SeparatedInstructions,
+        *,
+        cache: ParseCache | None = None,
+        optimize: bool = False,
+        columnar: bool = False
+) -> VideoInstructions:
+    """
+    Parses the instructions into a motion tree.
+
+    :param instructions: A list (or any other iterable, such as a generator)
+        of ImageReference's and adjustments, or the SeparatedInstructions of
+        them. The adjustments of each ID are sorted once, after all of them
+        are read.
+    :param cache: A ParseCache, that the tree is looked up in (and added to,
+        if it's not there). Not used for SeparatedInstructions.
+    :param optimize: Whether to pass the tree through `optimize`.
+    :param columnar: Whether to store the body as a ColumnarBody, rather than
+        a list of nodes.
+    """
+    if cache is not None and not isinstance(instructions, SeparatedInstructions):
+        motion_tree = cache._parse(instructions)
+    else:
+        if not isinstance(instructions, SeparatedInstructions):
+            instructions = separate_instructions(instructions)
+        motion_tree = _create_motion_tree(instructions)
+
+    if optimize:
+        motion_tree = _optimize_motion_tree(motion_tree)
+    if columnar:
+        motion_tree = to_columnar(motion_tree)
+    return motion_tree
+
+
+class Timeline:
+    """
+    A motion tree that can be edited. Adding or removing an adjustment only
+    works out the nodes again from that adjustment up to where the tree is
+    the same as before, instead of separating and parsing every instruction
+    again; `insert` and `remove` return the range of frames that may look
+    different because of it.
+
+    The tree is the same as `parse` gives for the `instructions` of the
+    timeline. Like in SeparatedInstructions, an ID has at most one adjustment
+    at a time.
+
+    :param instructions: A list of ImageReference's and adjustments, or the
+        SeparatedInstructions of them, which the timeline then edits.
+    :ivar instructions: The SeparatedInstructions of the timeline.
+    """
+    __slots__ = ("_end_state", "_keys", "_merged", "_motion_tree", "_ranks", "_segments", "_states", "instructions")
+
+    # The adjustments in the order of the tree, and the key of each, which
+    # is (activation time, rank of the ID), the ranks going up in the order
+    # of `instructions.adjustments`;
+    # the nodes of each adjustment; and the (duration_value, time_index) that
+    # the nodes of each adjustment, and the nodes after the last one, start
+    # from.
+    _end_state: tuple[int, int]
+    _keys: list[tuple[int, int]]
+    _merged: list[Adjustment]
+    _motion_tree: VideoInstructions | None
+    _ranks: dict[Hashable, int]
+    _segments: list[list[MOTION_NODES]]
+    _states: list[tuple[int, int]]
+    instructions: SeparatedInstructions
+
+    def __init__(self, instructions: Iterable[INSTRUCTIONS] | SeparatedInstructions = ()):
+        if not isinstance(instructions, SeparatedInstructions):
+            instructions = separate_instructions(instructions)
+
+        self.instructions = instructions
+        self._motion_tree = None
+        self._ranks = {ID: rank for rank, ID in enumerate(instructions.adjustments)}
+        self._merged = list(_merge_adjustments(instructions.adjustments))
+        self._keys = [(adjustment.activation_time, self._ranks[adjustment.ID]) for adjustment in self._merged]
+
+        self._segments = []
+        self._states = []
+        state = (0, 0)
+        for adjustment in self._merged:
+            self._states.append(state)
+            nodes = []
+            state = _advance(_create_command_node(adjustment), *state, nodes)
+            self._segments.append(nodes)
+        self._end_state = state
+
+    def __repr__(self):
+        adjustments_ = len(self)
+        frame_count = self.frame_count
+        return f"{self.__class__.__name__}({adjustments_=}, {frame_count=})"
+
+    def __len__(self):
+        return len(self._merged)
+
+    @property
+    def frame_count(self) -> int:
+        """ The number of frames in the video, without planning them. """
+        duration_value, time_index = self._end_state
+        return time_index + max(duration_value, 1)
+
+    @property
+    def motion_tree(self) -> VideoInstructions:
+        """ The motion tree, put together again from the nodes after an edit. """
+        if self._motion_tree is None:
+            motion_tree = VideoInstructions()
+            motion_tree.body.append(Start())
+            motion_tree.body.extend(itertools.chain.from_iterable(self._segments))
+            if self._end_state[0] != 0:
+                motion_tree.body.append(InvokePrevious(self._end_state[0]))
+            motion_tree.body.append(End())
+            motion_tree._instructions = self.instructions
+            self._motion_tree = motion_tree
+        return self._motion_tree
+
+    def _affected_until(self, adjustment: Adjustment) -> int | None:
+        # A show or hide lasts until the next one of the same ID; anything
+        # else (such as a move) carries over to every frame after it.
+        visibility_types = (adjustments.core.HideAdjustment, adjustments.core.ShowAdjustment)
+        if type(adjustment) not in visibility_types:
+            return None
+
+        values = self.instructions.adjustments.get(adjustment.ID)
+        if values is None:
+            return None
+        for following in values.islice(values.bisect_right(adjustment)):
+            if type(following) in visibility_types:
+                return following.activation_time
+        return None
+
+    def _patch(self, position: int, adjustment: Adjustment, shift: int) -> range:
+        # Works out the nodes again from `position`, until the state after an
+        # adjustment is the same as it was; the nodes after that are kept.
+        # `shift` is how far the adjustments after `position` have moved.
+        frame_count = self.frame_count
+        old_states = self._states
+        state = old_states[position] if position < len(old_states) else self._end_state
+        # The nodes before the adjustment may already have gone past its time
+        # (an InvokePrevious is stretched to the duration of the move after
+        # it), but the frames from its time on still change.
+        start = min(adjustment.activation_time, state[1])
+
+        segments, states = [], []
+        index = position
+        end = len(old_states)
+        converged = False
+        while index < len(self._merged):
+            states.append(state)
+            nodes = []
+            state = _advance(_create_command_node(self._merged[index]), *state, nodes)
+            segments.append(nodes)
+            index += 1
+
+            old_index = index - shift
+            if old_index < len(old_states) and old_states[old_index] == state:
+                end = old_index
+                converged = True
+                break
+        else:
+            self._end_state = state
+
+        self._segments[position:end] = segments
+        self._states[position:end] = states
+        self._motion_tree = None
+
+        # The nodes that changed cover the frames up to the last of them, and
+        # the frame after it, whose node draws it or not depending on them.
+        frame_count = max(frame_count, self.frame_count)
+        stop = frame_count
+        affected_until = self._affected_until(adjustment)
+        if affected_until is not None and converged:
+            stop = min(max(affected_until, state[1] + 2), frame_count)
+        return range(start, stop)
+
+    def insert(self, instruction: INSTRUCTIONS) -> range:
+        """
+        Adds an ImageReference or an adjustment to the timeline, and returns
+        the range of frames that may look different. An adjustment of the
+        same ID at the same time as one that's already there is ignored, like
+        `parse` does, and gives an empty range.
+        """
+        if isinstance(instruction, ImageReference):
+            _handle_reference(self.instructions, instruction)
+            return range(self.frame_count)
+
+        values = self.instructions.adjustments.get(instruction.ID)
+        if values is not None and instruction in values:
+            return range(0)
+
+        _handle_adjustment(self.instructions, instruction)
+        rank = self._ranks.get(instruction.ID)
+        if rank is None:
+            # A new ID (or one whose adjustments were all removed) goes after
+            # the others, as it does in `instructions.adjustments`.
+            rank = self._ranks[instruction.ID] = next(reversed(self._ranks.values()), -1) + 1
+        key = (instruction.activation_time, rank)
+        position = bisect.bisect_left(self._keys, key)
+        self._keys.insert(position, key)
+        self._merged.insert(position, instruction)
+        return self._patch(position, instruction, 1)
+
+    def remove(self, instruction: INSTRUCTIONS) -> range:
+        """
+        Removes the ImageReference of the same ID, or the adjustment of the
+        same ID at the same time, from the timeline, and returns the range of
+        frames that may look different. Raises errors.AttributeError if there
+        isn't one.
+        """
+        if isinstance(instruction, ImageReference):
+            if instruction.ID not in self.instructions.references:
+                raise errors.AttributeError(f"No reference of ID {instruction.ID!r} in the timeline.")
+            del self.instructions.references[instruction.ID]
+            return range(self.frame_count)
+
+        removed = _discard_adjustment(self.instructions, instruction)
+        if removed is None:
+            raise errors.AttributeError(
+                f"No adjustment of ID {instruction.ID!r} at time {instruction.activation_time} in the timeline."
+            )
+
+        position = bisect.bisect_left(self._keys, (removed.activation_time, self._ranks[removed.ID]))
+        del self._keys[position]
+        if removed.ID not in self.instructions.adjustments:
+            del self._ranks[removed.ID]
+        del self._merged[position]
+        return self._patch(position, removed, -1)
+
+
+def to_bytes(motion_tree: VideoInstructions) -> bytes:
+    """
+    Writes the body of a motion tree in a compact binary format, which
+    `from_bytes` reads back. The IDs must be ints or strs.
+    """
+    ids = {}
+    nodes = bytearray()
+    for node in motion_tree.body:
+        operands = _node_operands(node)
+        tag = _TAGS[type(node)]
+        _write_varint(nodes, tag)
+        if operands and tag >= _FIRST_ID_TAG:
+            operands = (ids.setdefault(operands[0], len(ids)),) + operands[1:]
+        for operand in operands:
+            _write_varint(nodes, operand)
+
+    data = bytearray(_MAGIC)
+    _write_varint(data, _FORMAT_VERSION)
+    _write_varint(data, len(ids))
+    for ID in ids:
+        if type(ID) is int:
+            _write_varint(data, _INT_ID)
+            _write_varint(data, ID)
+        else:
+            encoded = ID.encode("utf-8")
+            _write_varint(data, _STR_ID)
+            _write_varint(data, len(encoded))
+            data += encoded
+    _write_varint(data, len(motion_tree.body))
+    data += nodes
+    return bytes(data)
+
+
+def to_columnar(motion_tree: VideoInstructions) -> VideoInstructions:
+    """
+    Returns a copy of the motion tree with its body stored as a ColumnarBody,
+    which takes much less memory than a list of nodes for a long video.
+    """
+    columnar = VideoInstructions()
+    columnar._body = ColumnarBody(motion_tree.body)
+    columnar._instructions = motion_tree._instructions
+    return columnar
+
+
+def to_json(motion_tree: VideoInstructions, *, indent: int | None = None) -> str:
+    """
+    Writes the body of a motion tree as JSON, which `from_json` reads back:
+    each node is a list of its type name and its operands. The IDs must be
+    ints or strs.
+    """
+    body = [[type(node).__name__, *_node_operands(node)] for node in motion_tree.body]
+    return json.dumps({"version": _FORMAT_VERSION, "body": body}, indent=indent)
 
 
 def walk(motion_tree: VideoInstructions) -> Iterator[MOTION_NODES]:
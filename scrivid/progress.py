@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+from . import errors
+
+import threading
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+class CancellationToken:
+    """
+    A flag that asks a render to stop. `cancel` can be called from any thread
+    (such as a scheduler, or a signal handler); the render checks the token
+    between frames, and while waiting on ffmpeg, and stops by raising
+    errors.CancelledError. The sink is aborted, and any worker processes and
+    ffmpeg subprocesses are killed.
+    """
+    __slots__ = ("_event",)
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def __repr__(self):
+        is_cancelled = self.is_cancelled
+        return f"{self.__class__.__name__}({is_cancelled=})"
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        self._event.set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise errors.CancelledError("The render was cancelled.")
+
+
+class Progress:
+    """
+    A snapshot of how far a render has come, as passed to the `progress`
+    callback of `compile_video`.
+
+    :ivar frame_count: The total number of frames in the video.
+    :ivar drawn_frame_count: The number of frames that get drawn; the rest
+        repeat the frame before them.
+    :ivar frames_rendered: The number of drawn frames that are done.
+    :ivar frames_encoded: The number of frames that have been passed to the
+        sink, held frames included.
+    :ivar elapsed: The seconds since the first frame was started.
+    """
+    __slots__ = ("drawn_frame_count", "elapsed", "frame_count", "frames_encoded", "frames_rendered")
+
+    def __init__(
+            self,
+            frame_count: int,
+            drawn_frame_count: int,
+            frames_rendered: int,
+            frames_encoded: int,
+            elapsed: float
+    ):
+        self.drawn_frame_count = drawn_frame_count
+        self.elapsed = elapsed
+        self.frame_count = frame_count
+        self.frames_encoded = frames_encoded
+        self.frames_rendered = frames_rendered
+
+    def __repr__(self):
+        frames_encoded = self.frames_encoded
+        frame_count = self.frame_count
+        fps = self.fps
+        eta = self.eta
+        return f"{self.__class__.__name__}({frames_encoded=}, {frame_count=}, {fps=}, {eta=})"
+
+    @property
+    def fraction(self) -> float:
+        """ The fraction of the frames that have been passed to the sink. """
+        if self.frame_count == 0:
+            return 1.0
+        return self.frames_encoded / self.frame_count
+
+    @property
+    def fps(self) -> float:
+        """ The number of frames passed to the sink per second, so far. """
+        if self.elapsed <= 0:
+            return 0.0
+        return self.frames_encoded / self.elapsed
+
+    @property
+    def eta(self) -> float | None:
+        """
+        The estimated seconds until the render is done, or None if nothing has
+        been measured yet. While there are frames left to draw, it's based on
+        the time taken per drawn frame, since the held frames cost next to
+        nothing.
+        """
+        remaining = self.drawn_frame_count - self.frames_rendered
+        if remaining > 0:
+            if self.frames_rendered == 0:
+                return None
+            return self.elapsed / self.frames_rendered * remaining
+
+        remaining = self.frame_count - self.frames_encoded
+        if remaining <= 0:
+            return 0.0
+        if self.frames_encoded == 0:
+            return None
+        return remaining / self.fps
+
+
+class _ProgressTracker:
+    # Counts the frames of a render, reporting them to the callback and
+    # checking the cancellation token as it goes.
+    __slots__ = (
+        "_callback", "_cancellation", "_start", "drawn_frame_count", "frame_count", "frames_encoded",
+        "frames_rendered"
+    )
+
+    def __init__(
+            self,
+            frame_count: int,
+            drawn_frame_count: int,
+            callback: Callable[[Progress], None] | None = None,
+            cancellation: CancellationToken | None = None
+    ):
+        self._callback = callback
+        self._cancellation = cancellation
+        self._start = time.perf_counter()
+        self.drawn_frame_count = drawn_frame_count
+        self.frame_count = frame_count
+        self.frames_encoded = 0
+        self.frames_rendered = 0
+
+    def check(self):
+        if self._cancellation is not None:
+            self._cancellation.raise_if_cancelled()
+
+    def rendered(self):
+        self.frames_rendered += 1
+
+    def encoded(self):
+        self.frames_encoded += 1
+        self.report()
+        self.check()
+
+    def report(self):
+        if self._callback is None:
+            return
+        self._callback(Progress(
+            self.frame_count,
+            self.drawn_frame_count,
+            self.frames_rendered,
+            self.frames_encoded,
+            time.perf_counter() - self._start
+        ))
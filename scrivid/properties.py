@@ -4,23 +4,31 @@ from . import errors
 from ._utils import sentinel, SentinelBase
 
 import enum
+import functools
+from typing import TYPE_CHECKING
+import weakref
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Sequence
+    from typing import TypeAlias
+
+    MERGE_FUNCTION: TypeAlias = Callable[["Properties", "Properties"], "Properties"]
+    MERGE_ALL_FUNCTION: TypeAlias = Callable[["Properties", "Iterable[Properties]"], "Properties"]
 
 
 EXCLUDED = sentinel("EXCLUDED")
 
 
-def _calculate_append(property_: str, a: Properties, b: Properties):
-    a_attr, b_attr = getattr(a, property_), getattr(b, property_)
-    return (
-        a_attr + b_attr if EXCLUDED not in (a_attr, b_attr)
-        else a_attr if a_attr is not EXCLUDED
-        else b_attr
-    )
+def _append(a, b):
+    if a is EXCLUDED:
+        return b
+    elif b is EXCLUDED:
+        return a
+    return a + b
 
 
-def _calculate_replacement(property_: str, a: Properties, b: Properties):
-    a_attr, b_attr = getattr(a, property_), getattr(b, property_)
-    return a_attr if a_attr is not EXCLUDED else b_attr
+def _replace(a, b):
+    return a if a is not EXCLUDED else b
 
 
 class MergeMode(enum.Enum):
@@ -80,7 +88,7 @@ class Properties:
     def _check_confliction(self, other):
         NO_RETURN = sentinel("NO_RETURN")
 
-        for attr in self.__slots__:
+        for attr in Properties.__slots__:
             a = getattr(self, attr, NO_RETURN)
             b = getattr(other, attr, NO_RETURN)
 
@@ -103,33 +111,235 @@ class Properties:
                 second_value=b
             )
 
+    def freeze(self) -> FrozenProperties:
+        """ The interned FrozenProperties object with the same attributes. """
+        return freeze(self)
+
     def merge(self, other: Properties, /, *, mode: MergeMode = MergeMode.STRICT_REPLACEMENT):
-        if not isinstance(other, Properties):
-            raise errors.TypeError(
-                f"Expected Properties object, got type {type(other)}."
-            )
-        elif mode in _STRICT_MODES:
-            self._check_confliction(other)
+        return _MERGE_FUNCTIONS[mode](self, other)
+
+
+def _values(properties_: Properties) -> tuple:
+    return properties_.layer, properties_.scale, properties_.visibility, properties_.x, properties_.y
+
+
+def _typed_values(values: tuple) -> tuple:
+    # The values with their types, since 1, 1.0 and True are equal (and hash
+    # the same), but a move of 1.0 is split differently from a move of 1.
+    return tuple((type(value), value) for value in values)
+
+
+class FrozenProperties(Properties):
+    """
+    A Properties object that can't be changed once it's created. It's
+    compared and hashed by its attributes and their types (the hash is worked
+    out once), so it can be used as a dictionary key, such as to memoize
+    merges. Merging it creates another FrozenProperties object.
 
-        if mode in _FORWARD_MODES:
-            a, b = self, other
-        elif mode in _REVERSE_MODES:
-            a, b = other, self
-
-        visibility = _calculate_replacement("visibility", a, b)
-
-        if mode in _REPLACEMENT_MODES:
-            layer = _calculate_replacement("layer", a, b)
-            scale = _calculate_replacement("scale", a, b)
-            x = _calculate_replacement("x", a, b)
-            y = _calculate_replacement("y", a, b)
-        elif mode in _APPENDING_MODES:
-            layer = _calculate_append("layer", a, b)
-            scale = _calculate_append("scale", a, b)
-            x = _calculate_append("x", a, b)
-            y = _calculate_append("y", a, b)
-
-        return self.__class__(layer=layer, scale=scale, visibility=visibility, x=x, y=y)
+    `freeze` returns the same object for the same attributes, so that common
+    values (like the deltas of `HideAdjustment` and `ShowAdjustment`) are
+    shared, and compared by identity first.
+    """
+    __slots__ = ("_hash", "__weakref__")
+
+    def __init__(
+            self, *,
+            layer: int | SentinelBase = EXCLUDED,
+            scale: float | int | SentinelBase = EXCLUDED,
+            visibility: VisibilityStatus | SentinelBase = EXCLUDED,
+            x: int | SentinelBase = EXCLUDED,
+            y: int | SentinelBase = EXCLUDED
+    ):
+        set_ = object.__setattr__
+        set_(self, "layer", layer)
+        set_(self, "scale", scale)
+        set_(self, "visibility", visibility)
+        set_(self, "x", x)
+        set_(self, "y", y)
+        set_(self, "_hash", hash(_typed_values((layer, scale, visibility, x, y))))
+
+    def __setattr__(self, name, value):
+        raise errors.AttributeError(f"{self.__class__.__name__} objects can't be changed.")
+
+    def __delattr__(self, name):
+        raise errors.AttributeError(f"{self.__class__.__name__} objects can't be changed.")
+
+    def __eq__(self, other):
+        if other is self:
+            return True
+        elif not isinstance(other, FrozenProperties):
+            return NotImplemented
+        return self._hash == other._hash and _typed_values(_values(self)) == _typed_values(_values(other))
+
+    def __hash__(self):
+        return self._hash
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        layer, scale, visibility, x, y = _values(self)
+        return _unpickle_frozen, (layer, scale, visibility, x, y)
+
+    def freeze(self) -> FrozenProperties:
+        return freeze(self)
+
+    def thaw(self) -> Properties:
+        """ A Properties object with the same attributes, which can be changed. """
+        layer, scale, visibility, x, y = _values(self)
+        return Properties(layer=layer, scale=scale, visibility=visibility, x=x, y=y)
+
+
+# Every interned FrozenProperties object, by its attributes and their types.
+# They're only kept while they're used elsewhere.
+_interned: weakref.WeakValueDictionary[tuple, FrozenProperties] = weakref.WeakValueDictionary()
+
+
+def freeze(properties_: Properties) -> FrozenProperties:
+    """
+    The FrozenProperties object with the same attributes as `properties_`.
+    While it's still in use, the same object is returned for the same
+    attributes (of the same types).
+    """
+    _check_type(properties_)
+    values = _values(properties_)
+    key = _typed_values(values)
+    frozen = _interned.get(key)
+    if frozen is None:
+        if type(properties_) is FrozenProperties:
+            frozen = properties_
+        else:
+            layer, scale, visibility, x, y = values
+            frozen = FrozenProperties(layer=layer, scale=scale, visibility=visibility, x=x, y=y)
+        _interned[key] = frozen
+    return frozen
+
+
+def _unpickle_frozen(layer, scale, visibility, x, y) -> FrozenProperties:
+    return freeze(FrozenProperties(layer=layer, scale=scale, visibility=visibility, x=x, y=y))
+
+
+def _check_type(other):
+    if not isinstance(other, Properties):
+        raise errors.TypeError(
+            f"Expected Properties object, got type {type(other)}."
+        )
+
+
+def _merge_function(mode: MergeMode) -> MERGE_FUNCTION:
+    # Works out what the mode means once, rather than on every merge.
+    combine = _append if mode in _APPENDING_MODES else _replace
+    reverse = mode in _REVERSE_MODES
+    strict = mode in _STRICT_MODES
+
+    def merge(self: Properties, other: Properties, /) -> Properties:
+        _check_type(other)
+        if strict:
+            self._check_confliction(other)
+        a, b = (other, self) if reverse else (self, other)
+        return self.__class__(
+            layer=combine(a.layer, b.layer),
+            scale=combine(a.scale, b.scale),
+            visibility=_replace(a.visibility, b.visibility),
+            x=combine(a.x, b.x),
+            y=combine(a.y, b.y)
+        )
+
+    merge.__name__ = merge.__qualname__ = f"merge_{mode.name.lower()}"
+    return merge
+
+
+def _merge_all_function(mode: MergeMode) -> MERGE_ALL_FUNCTION:
+    merge = _MERGE_FUNCTIONS[mode]
+    if mode in _STRICT_MODES:
+        # Every merge is checked against the one before, so it can't be
+        # folded any further than this.
+        def merge_all(properties_: Properties, deltas: Iterable[Properties], /) -> Properties:
+            return functools.reduce(merge, deltas, properties_)
+        return merge_all
+
+    combine = _append if mode in _APPENDING_MODES else _replace
+    reverse = mode in _REVERSE_MODES
+
+    def merge_all(properties_: Properties, deltas: Iterable[Properties], /) -> Properties:
+        # The attributes are carried over from delta to delta, and only put
+        # into a Properties object at the end.
+        layer, scale, visibility, x, y = (
+            properties_.layer, properties_.scale, properties_.visibility, properties_.x, properties_.y
+        )
+        for delta in deltas:
+            _check_type(delta)
+            if reverse:
+                layer = combine(delta.layer, layer)
+                scale = combine(delta.scale, scale)
+                visibility = _replace(delta.visibility, visibility)
+                x = combine(delta.x, x)
+                y = combine(delta.y, y)
+            else:
+                layer = combine(layer, delta.layer)
+                scale = combine(scale, delta.scale)
+                visibility = _replace(visibility, delta.visibility)
+                x = combine(x, delta.x)
+                y = combine(y, delta.y)
+        return properties_.__class__(layer=layer, scale=scale, visibility=visibility, x=x, y=y)
+
+    merge_all.__name__ = merge_all.__qualname__ = f"merge_all_{mode.name.lower()}"
+    return merge_all
+
+
+# The deltas of hiding and showing a reference, which every HideAdjustment and
+# ShowAdjustment shares.
+HIDDEN = freeze(Properties(visibility=VisibilityStatus.HIDE))
+SHOWN = freeze(Properties(visibility=VisibilityStatus.SHOW))
+
+_MERGE_FUNCTIONS = {mode: _merge_function(mode) for mode in MergeMode}
+_MERGE_ALL_FUNCTIONS = {mode: _merge_all_function(mode) for mode in MergeMode}
+
+
+def merge_function(mode: MergeMode = MergeMode.STRICT_REPLACEMENT) -> MERGE_FUNCTION:
+    """
+    The function that `Properties.merge` uses for `mode`, which takes the two
+    Properties objects. Looking it up once saves working out the mode on
+    every merge.
+    """
+    return _MERGE_FUNCTIONS[mode]
+
+
+def merge_all(
+        properties_: Properties,
+        deltas: Iterable[Properties],
+        /, *,
+        mode: MergeMode = MergeMode.STRICT_REPLACEMENT
+) -> Properties:
+    """
+    Merges every delta into `properties_` in turn, like calling
+    `Properties.merge` on the result of the last merge, but without creating
+    a Properties object for every step (except with the strict modes, which
+    check each merge for conflictions).
+    """
+    return _MERGE_ALL_FUNCTIONS[mode](properties_, deltas)
+
+
+def merge_each(
+        properties_: Sequence[Properties],
+        deltas: Sequence[Iterable[Properties]],
+        /, *,
+        mode: MergeMode = MergeMode.STRICT_REPLACEMENT
+) -> list[Properties]:
+    """
+    Merges the deltas at each position into the Properties object at the same
+    position (such as the adjustments of every reference into the
+    references), with `merge_all`.
+    """
+    if len(properties_) != len(deltas):
+        raise errors.AttributeError(
+            f"Expected as many lists of deltas as Properties objects, got {len(deltas)} and {len(properties_)}."
+        )
+    merge_all_ = _MERGE_ALL_FUNCTIONS[mode]
+    return [merge_all_(base, values) for base, values in zip(properties_, deltas)]
 
 
 def create(
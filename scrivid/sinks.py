@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+from . import _ffmpeg, errors
+from .abc import Sink
+from .frame_store import RawFrameStore
+
+from pathlib import Path
+import subprocess
+import tempfile
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .metadata import Metadata
+    from .progress import CancellationToken
+
+    from typing import IO
+
+    from PIL import Image
+
+
+def _as_rgb(frame: Image.Image) -> Image.Image:
+    if frame.mode == "RGB":
+        return frame
+    return frame.convert("RGB")
+
+
+class FFmpegSink(Sink):
+    """
+    Pipes the raw frames into an ffmpeg subprocess, which encodes them into a
+    video file. This is the sink used by `compile_video` if none is specified.
+
+    :param output_file: The path of the encoded video. Defaults to
+        '<save_location>/<video_name>.mp4', as taken from the metadata.
+    :param bit_rate: The target bit rate, in the format that ffmpeg accepts.
+    :param codec: The video codec used to encode the output.
+    :param executable: The name or path of the ffmpeg executable.
+    :param cancellation: If cancelled while ffmpeg finishes encoding (after
+        the last frame was written), ffmpeg is killed, and
+        errors.CancelledError is raised from `close`. `compile_video` passes
+        its own token to the sink it creates.
+    """
+
+    __slots__ = ("_bit_rate", "_cancellation", "_codec", "_executable", "_output_file", "_process", "_stderr")
+
+    _process: subprocess.Popen | None
+    _stderr: IO[bytes] | None
+
+    def __init__(
+            self,
+            output_file: str | Path | None = None,
+            *,
+            bit_rate: str = "4M",
+            codec: str = "libx264",
+            executable: str = "ffmpeg",
+            cancellation: CancellationToken | None = None
+    ):
+        if isinstance(output_file, str):
+            output_file = Path(output_file)
+
+        self._bit_rate = bit_rate
+        self._cancellation = cancellation
+        self._codec = codec
+        self._executable = executable
+        self._output_file = output_file
+        self._process = None
+        self._stderr = None
+
+    def __repr__(self):
+        output_file = self._output_file
+        return f"{self.__class__.__name__}({output_file=!r})"
+
+    def _command(self, metadata: Metadata) -> list[str]:
+        output_file = self._output_file
+        if output_file is None:
+            output_file = metadata.save_location / f"{metadata.video_name}.mp4"
+
+        return _ffmpeg.command(
+            self._executable,
+            _ffmpeg.raw_input_arguments(metadata.window_size, metadata.frame_rate, "-"),
+            output_file,
+            bit_rate=self._bit_rate,
+            codec=self._codec,
+            window_size=metadata.window_size
+        )
+
+    def _raise_from_process(self, exc: Exception):
+        self._stderr.seek(0)
+        raise errors.InternalErrorFromFFMPEG(exc, None, self._stderr.read())
+
+    def open(self, metadata: Metadata, frame_count: int):
+        command = self._command(metadata)
+        # stderr goes into a file rather than a pipe, since nothing reads from
+        # it while the frames are being written; a full pipe would otherwise
+        # stall ffmpeg.
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr
+        )
+
+    def write(self, index: int, frame: Image.Image):
+        self.write_buffer(index, _as_rgb(frame).tobytes(), frame.size)
+
+    def write_buffer(self, index: int, buffer: memoryview, size: tuple[int, int]):
+        try:
+            self._process.stdin.write(buffer)
+        except (BrokenPipeError, OSError) as exc:
+            self._process.wait()
+            self._raise_from_process(exc)
+
+    def close(self):
+        if self._process is None:
+            return
+
+        process, self._process = self._process, None
+        try:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+            returncode = _ffmpeg.wait(process, self._cancellation)
+            if returncode != 0:
+                self._raise_from_process(subprocess.CalledProcessError(returncode, process.args))
+        finally:
+            self._stderr.close()
+            self._stderr = None
+
+    def abort(self):
+        if self._process is None:
+            return
+
+        process, self._process = self._process, None
+        process.kill()
+        process.wait()
+        self._stderr.close()
+        self._stderr = None
+
+
+class ImageSequenceSink(Sink):
+    """
+    Writes every frame to its own file, named after the index of the frame
+    ('000000.png', '000001.png', ...).
+
+    :param directory: The directory that the files are written to. Defaults to
+        '<save_location>/<video_name>', as taken from the metadata. The
+        directory is created if it does not exist.
+    :param format: Either "PNG", or "RAW" for the bare RGB bytes of each frame
+        (in which case the files are suffixed with '.rgb').
+    """
+
+    __slots__ = ("_directory", "_format", "directory")
+
+    _formats = ("PNG", "RAW")
+
+    def __init__(self, directory: str | Path | None = None, *, format: str = "PNG"):
+        format = format.upper()
+        if format not in self._formats:
+            raise errors.TypeError(f"`format` must be one of {self._formats}; got {format!r}.")
+
+        if isinstance(directory, str):
+            directory = Path(directory)
+
+        self._directory = directory
+        self._format = format
+        self.directory = directory
+
+    def __repr__(self):
+        directory = self._directory
+        format = self._format
+        return f"{self.__class__.__name__}({directory=!r}, {format=!r})"
+
+    def open(self, metadata: Metadata, frame_count: int):
+        directory = self._directory
+        if directory is None:
+            directory = metadata.save_location / metadata.video_name
+
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+
+    def write(self, index: int, frame: Image.Image):
+        if self._format == "PNG":
+            frame.save(self.directory / f"{index:06d}.png", "PNG")
+        else:
+            (self.directory / f"{index:06d}.rgb").write_bytes(_as_rgb(frame).tobytes())
+
+    def close(self):
+        pass
+
+
+class MemorySink(Sink):
+    """
+    Keeps a copy of every frame in the `frames` list, in order. Intended for
+    short videos and testing, since nothing is ever written to disk.
+    """
+
+    __slots__ = ("frames",)
+
+    frames: list[Image.Image]
+
+    def __init__(self):
+        self.frames = []
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(<{len(self.frames)} frames>)"
+
+    def open(self, metadata: Metadata, frame_count: int):
+        self.frames = []
+
+    def write(self, index: int, frame: Image.Image):
+        self.frames.append(frame.copy())
+
+    def close(self):
+        pass
+
+
+class RawFrameStoreSink(Sink):
+    """
+    Writes the frames into a frame_store.RawFrameStore, which keeps them as
+    raw RGB bytes in one memory-mapped file. This avoids compressing every
+    frame, for when the frames are encoded separately from the render.
+
+    :param path: The path of the data file of the store. Defaults to
+        '<save_location>/<video_name>.rgb', as taken from the metadata.
+    """
+
+    __slots__ = ("_path", "store")
+
+    store: RawFrameStore | None
+
+    def __init__(self, path: str | Path | None = None):
+        if isinstance(path, str):
+            path = Path(path)
+
+        self._path = path
+        self.store = None
+
+    def __repr__(self):
+        path = self._path
+        return f"{self.__class__.__name__}({path=!r})"
+
+    def open(self, metadata: Metadata, frame_count: int):
+        path = self._path
+        if path is None:
+            path = metadata.save_location / f"{metadata.video_name}.rgb"
+
+        self.store = RawFrameStore.create(path, metadata.window_size, metadata.frame_rate, frame_count)
+
+    def write(self, index: int, frame: Image.Image):
+        self.store.write(index, frame)
+
+    def write_buffer(self, index: int, buffer: memoryview, size: tuple[int, int]):
+        self.store.write(index, buffer)
+
+    def close(self):
+        self.store.close()
+
+
+class NullSink(Sink):
+    """
+    Discards every frame, only counting how many were written. Useful for
+    measuring how fast the frames are rendered, without the cost of encoding
+    them.
+    """
+
+    __slots__ = ("frame_count",)
+
+    frame_count: int
+
+    def __init__(self):
+        self.frame_count = 0
+
+    def __repr__(self):
+        frame_count = self.frame_count
+        return f"{self.__class__.__name__}({frame_count=})"
+
+    def open(self, metadata: Metadata, frame_count: int):
+        self.frame_count = 0
+
+    def write(self, index: int, frame: Image.Image):
+        self.frame_count += 1
+
+    def write_buffer(self, index: int, buffer: memoryview, size: tuple[int, int]):
+        self.frame_count += 1
+
+    def close(self):
+        pass
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from . import adjustments, errors, properties
+from ._file_objects import create_image_reference
+
+import random
+from typing import TYPE_CHECKING
+
+from PIL import Image, ImageDraw
+
+if TYPE_CHECKING:
+    from ._file_objects.images import ImageReference
+    from .abc import Adjustment
+
+    from typing import TypeAlias
+
+    INSTRUCTIONS: TypeAlias = ImageReference | Adjustment
+
+
+class GeneratedImage:
+    """
+    A FileAccess object for a placeholder image that is drawn in memory when
+    opened: a block of one colour with a darker outline. Since nothing is
+    read from disk, it can be used for any number of references, and pickled
+    into worker processes.
+    """
+    __slots__ = ("_file_handler", "_pixel_handler", "colour", "size")
+
+    def __init__(self, size: tuple[int, int], colour: tuple[int, int, int], /):
+        self._file_handler = None
+        self._pixel_handler = None
+        self.colour = colour
+        self.size = size
+
+    def __repr__(self):
+        size = self.size
+        colour = self.colour
+        return f"{self.__class__.__name__}({size=}, {colour=})"
+
+    def __getstate__(self):
+        return self.size, self.colour
+
+    def __setstate__(self, state):
+        self.size, self.colour = state
+        self._file_handler = None
+        self._pixel_handler = None
+
+    @property
+    def is_opened(self):
+        return self._file_handler is not None
+
+    def get_image_height(self):
+        if not self.is_opened:
+            return None
+        return self.size[1]
+
+    def get_image_width(self):
+        if not self.is_opened:
+            return None
+        return self.size[0]
+
+    def get_pixel_value(self, coordinates: tuple[int, int]):
+        if not self.is_opened:
+            return None
+        return self._pixel_handler.__getitem__(coordinates)
+
+    def read_header(self) -> tuple[tuple[int, int], str]:
+        return self.size, "RGB"
+
+    def open(self):
+        if self._file_handler is not None:
+            return
+        image = Image.new("RGB", self.size, self.colour)
+        outline = tuple(channel // 2 for channel in self.colour)
+        ImageDraw.Draw(image).rectangle((0, 0, self.size[0] - 1, self.size[1] - 1), outline=outline)
+        self._file_handler = image
+        self._pixel_handler = image.load()
+
+    def close(self):
+        if self._file_handler is None:
+            return
+        self._file_handler.close()
+        self._file_handler = None
+        self._pixel_handler = None
+
+
+def generate_scene(
+        n_references: int,
+        n_adjustments: int,
+        frames: int,
+        window_size: tuple[int, int] = (640, 360),
+        seed: int = 0,
+        *,
+        image_size: tuple[int, int] | None = None
+) -> list[INSTRUCTIONS]:
+    """
+    Generates a list of instructions for scale testing. The same arguments
+    always give the same instructions.
+
+    The references are GeneratedImage placeholders (so nothing is written to
+    disk), on layers 1 to 3, spread over the window. The first adjustment
+    moves the first reference over the whole video, so that the video is
+    `frames` long; the rest are split between moves (which often overlap
+    other moves of the same reference) and hiding or showing references.
+
+    :param n_references: The number of ImageReference's, with the IDs 0 to
+        `n_references - 1`.
+    :param n_adjustments: The number of adjustments. A reference can have at
+        most one adjustment on each frame.
+    :param frames: The length of the video, in frames.
+    :param window_size: The size of the video that the references are placed
+        in.
+    :param seed: The seed of the random generator.
+    :param image_size: The size of every image. Defaults to an eighth of the
+        shorter side of the window, as a square.
+    """
+    if n_references < 1 or frames < 1:
+        raise errors.AttributeError("A scene needs at least one reference and one frame.")
+    if not 1 <= n_adjustments <= n_references * frames:
+        raise errors.AttributeError(
+            f"`n_adjustments` must be between 1 and {n_references * frames} (one per reference per frame)."
+        )
+
+    rng = random.Random(seed)
+    width, height = window_size
+    if image_size is None:
+        side = max(1, min(width, height) // 8)
+        image_size = (side, side)
+
+    instructions = []
+    for ID in range(n_references):
+        colour = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        instructions.append(create_image_reference(
+            ID,
+            GeneratedImage(image_size, colour),
+            layer=rng.randrange(1, 4),
+            scale=1,
+            x=rng.randrange(max(1, width - image_size[0])),
+            y=rng.randrange(max(1, height - image_size[1]))
+        ))
+
+    instructions.append(adjustments.move.create(0, 0, properties.Properties(x=1), frames))
+    used = {(0, 0)}
+    while len(used) < n_adjustments:
+        ID = rng.randrange(n_references)
+        time = rng.randrange(frames)
+        if (ID, time) in used:
+            continue
+        used.add((ID, time))
+
+        kind = rng.random()
+        if kind < 0.6:
+            duration = rng.randrange(1, frames - time + 1)
+            change = properties.Properties(
+                x=rng.randrange(-image_size[0], image_size[0] + 1),
+                y=rng.randrange(-image_size[1], image_size[1] + 1)
+            )
+            instructions.append(adjustments.move.create(ID, time, change, duration))
+        elif kind < 0.8:
+            instructions.append(adjustments.hide.create(ID, time))
+        else:
+            instructions.append(adjustments.show.create(ID, time))
+
+    return instructions
@@ -0,0 +1,118 @@
+from functions import assemble_arguments, categorize
+from samples import empty, figure_eight, image_drawing, overlap, slide
+
+from scrivid import adjustments, motion_tree
+from scrivid._separating_instructions import _handle_adjustment, separate_instructions
+from scrivid.testing import generate_scene
+
+import pickle
+
+import pytest
+
+
+MOVE = adjustments.core.MoveAdjustment
+VISIBILITY = (adjustments.core.HideAdjustment, adjustments.core.ShowAdjustment)
+
+
+def _in_order(separated_instructions):
+    # The order of the motion tree: by time, then by the order of the IDs.
+    return sorted(
+        (adjustment for values in separated_instructions.adjustments.values() for adjustment in values),
+        key=lambda adjustment: adjustment.activation_time
+    )
+
+
+def _key(found):
+    return [(adjustment.ID, adjustment.activation_time) for adjustment in found]
+
+
+@pytest.fixture(scope="module")
+def scene():
+    return separate_instructions(generate_scene(40, 1_500, 80, seed=11))
+
+
+@categorize(category="motion_tree")
+def test_active(scene):
+    index = scene.index
+    every = _in_order(scene)
+    for time in range(-1, 82):
+        expected = [
+            adjustment for adjustment in every
+            if type(adjustment) is MOVE
+            and adjustment.activation_time <= time < adjustment.activation_time + adjustment.duration
+        ]
+        assert _key(index.active(time)) == _key(expected)
+        for ID in (0, 7, 39):
+            assert _key(index.active(time, ID)) == _key(adjustment for adjustment in expected if adjustment.ID == ID)
+
+
+@categorize(category="motion_tree")
+@pytest.mark.parametrize("start,stop", [(0, 1), (5, 20), (30, 31), (79, 200), (-10, 0)])
+def test_overlapping(scene, start, stop):
+    expected = [
+        adjustment for adjustment in _in_order(scene)
+        if type(adjustment) is MOVE
+        and adjustment.activation_time < stop and start < adjustment.activation_time + adjustment.duration
+    ]
+    assert _key(scene.index.overlapping(start, stop)) == _key(expected)
+    assert scene.index.overlapping(stop, start) == []
+
+
+@categorize(category="motion_tree")
+def test_applied_and_visibility(scene):
+    index = scene.index
+    for ID, values in scene.adjustments.items():
+        for time in range(-1, 82):
+            applied = [adjustment for adjustment in values if adjustment.activation_time <= time]
+            assert index.applied(ID, time) == applied
+
+            events = [adjustment for adjustment in applied if isinstance(adjustment, VISIBILITY)]
+            assert index.visibility(ID, time) is (events[-1] if events else None)
+
+    assert index.applied("missing", 10) == []
+    assert index.visibility("missing", 10) is None
+    assert index.active(10, "missing") == []
+
+
+@categorize(category="motion_tree")
+@pytest.mark.parametrize(
+    "sample_module",
+    assemble_arguments(
+        (empty,),
+        (figure_eight,),
+        (image_drawing,),
+        (overlap,),
+        (slide,)
+    )
+)
+def test_index_of_parsed_tree(sample_module):
+    parsed_motion_tree = motion_tree.parse(sample_module.INSTRUCTIONS())
+    index = parsed_motion_tree.index
+    assert isinstance(index, motion_tree.AdjustmentIndex)
+
+    # Every MoveImage node is in progress at its own time.
+    for node in motion_tree.walk(parsed_motion_tree):
+        if type(node) is motion_tree.MoveImage:
+            assert (node.id, node.time) in _key(index.active(node.time, node.id))
+
+
+def test_index_is_rebuilt():
+    separated_instructions = separate_instructions(generate_scene(3, 5, 10))
+    index = separated_instructions.index
+    assert separated_instructions.index is index
+    assert len(index) == 5
+
+    _handle_adjustment(separated_instructions, adjustments.hide.create("extra", 9))
+    assert separated_instructions.index is not index
+    assert len(separated_instructions.index) == 6
+
+    copy = pickle.loads(pickle.dumps(separated_instructions))
+    assert copy._index is None
+    assert len(copy.index) == 6
+
+
+def test_empty_index():
+    index = motion_tree.VideoInstructions().index
+    assert len(index) == 0
+    assert index.active(0) == []
+    assert index.overlapping(0, 100) == []
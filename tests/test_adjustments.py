@@ -0,0 +1,162 @@
+from scrivid import adjustments, errors, properties
+
+from array import array
+import pickle
+
+import pytest
+
+
+class IntLike:
+    def __init__(self, value):
+        self.value = value
+
+    def __index__(self):
+        return self.value
+
+
+def test_move_create_many():
+    moves = adjustments.move.create_many(
+        ["A", "B", "A"], array("q", [0, 4, 2]), [IntLike(3), IntLike(1), IntLike(5)], x=[1, -2, 3]
+    )
+    expected = [
+        adjustments.move.create("A", 0, properties.Properties(x=1), 3),
+        adjustments.move.create("B", 4, properties.Properties(x=-2), 1),
+        adjustments.move.create("A", 2, properties.Properties(x=3), 5)
+    ]
+    assert [repr(move) for move in moves] == [repr(move) for move in expected]
+    assert all(type(move.duration) is int for move in moves)
+
+
+@pytest.mark.parametrize("module", [adjustments.hide, adjustments.show])
+def test_visibility_create_many(module):
+    created = module.create_many((ID for ID in "ABC"), range(3))
+    assert [repr(adjustment) for adjustment in created] == [
+        repr(module.create(ID, time)) for ID, time in zip("ABC", range(3))
+    ]
+
+
+@pytest.mark.parametrize(
+    "arguments,exception",
+    [
+        ((["A"], [True], [1]), errors.TypeError),
+        ((["A"], [0], [1.5]), errors.TypeError),
+        (([["unhashable"]], [0], [1]), errors.TypeError),
+        ((["A", "B"], [0], [1]), errors.AttributeError)
+    ]
+)
+def test_move_create_many_invalid(arguments, exception):
+    with pytest.raises(exception):
+        adjustments.move.create_many(*arguments)
+
+
+def test_move_create_many_invalid_position():
+    with pytest.raises(errors.AttributeError):
+        adjustments.move.create_many(["A"], [0], [1], y=[1, 2])
+    with pytest.raises(errors.TypeError):
+        adjustments.move.create_many(["A"], [0], [1], x=["1"])
+
+
+def _positions(move):
+    return [move._enact(length).x for length in range(move.duration + 1)]
+
+
+def test_move_linear_unchanged():
+    change = properties.Properties(x=10, y=-7)
+    linear = adjustments.move.create("A", 0, change, 4)
+    named = adjustments.move.create("A", 0, change, 4, easing="linear")
+
+    assert linear.easing is adjustments.easing.LINEAR
+    assert _positions(linear) == _positions(named) == [0, 2, 4, 6, 10]
+    assert repr(linear) == repr(named)
+    assert "easing" not in repr(linear)
+
+
+@pytest.mark.parametrize("easing", ["ease", "ease-in", "ease-out", "ease-in-out"])
+def test_move_easing(easing):
+    move = adjustments.move.create("A", 0, properties.Properties(x=100, y=-50, scale=2.0), 10, easing=easing)
+    positions = _positions(move)
+
+    assert positions[0] == 0
+    assert positions[-1] == 100
+    assert positions == sorted(positions)
+    assert move._enact(10).y == -50
+    assert move._enact(10).scale == 2.0
+    assert "easing" in repr(move)
+
+
+def test_move_ease_in_out_shape():
+    ease_in = _positions(adjustments.move.create("A", 0, properties.Properties(x=1000), 10, easing="ease-in"))
+    ease_out = _positions(adjustments.move.create("A", 0, properties.Properties(x=1000), 10, easing="ease-out"))
+
+    # Slow, then fast; and fast, then slow.
+    assert ease_in[1] - ease_in[0] < ease_in[10] - ease_in[9]
+    assert ease_out[1] - ease_out[0] > ease_out[10] - ease_out[9]
+    assert ease_in[5] < 500 < ease_out[5]
+
+
+def test_move_cubic_bezier():
+    # A curve along the diagonal is linear (up to rounding).
+    easing = adjustments.easing.cubic_bezier(1 / 3, 1 / 3, 2 / 3, 2 / 3)
+    move = adjustments.move.create("A", 0, properties.Properties(x=-90), 9, easing=easing)
+    assert _positions(move) == list(range(0, -100, -10))
+
+    # The y coordinates can go past the end, and come back.
+    overshoot = adjustments.easing.cubic_bezier(0.3, 0, 0.7, 1.6)
+    positions = _positions(adjustments.move.create("A", 0, properties.Properties(x=100), 20, easing=overshoot))
+    assert max(positions) > 100
+    assert positions[-1] == 100
+
+
+@pytest.mark.parametrize(
+    "start,expected",
+    [
+        (False, [0, 0, 25, 25, 50, 50, 75, 75, 100]),
+        (True, [25, 25, 50, 50, 75, 75, 100, 100, 100])
+    ]
+)
+def test_move_steps(start, expected):
+    easing = adjustments.easing.steps(4, start=start)
+    assert _positions(adjustments.move.create("A", 0, properties.Properties(x=100), 8, easing=easing)) == expected
+
+
+def test_easing_table():
+    easing = adjustments.easing.EASE_IN
+    table = easing.table(6)
+
+    assert table is easing.table(6)
+    assert len(table) == 7
+    assert table[0] == 0
+    assert table[-1] == adjustments.easing.ONE
+    assert list(table) == sorted(table)
+
+
+def test_easing_pickle():
+    easing = adjustments.easing.steps(3, start=True)
+    move = adjustments.move.create("A", 2, properties.Properties(x=9), 6, easing=easing)
+    copied = pickle.loads(pickle.dumps(move))
+
+    assert copied.easing == easing
+    assert hash(copied.easing) == hash(easing)
+    assert _positions(copied) == _positions(move)
+
+
+def test_move_create_many_easing():
+    moves = adjustments.move.create_many(["A", "B"], [0, 1], [4, 4], x=[8, 8], easing="ease-out")
+    assert all(move.easing is adjustments.easing.EASE_OUT for move in moves)
+
+
+@pytest.mark.parametrize(
+    "make,exception",
+    [
+        (lambda: adjustments.easing.get("bounce"), errors.AttributeError),
+        (lambda: adjustments.easing.get(1), errors.TypeError),
+        (lambda: adjustments.easing.cubic_bezier(1.5, 0, 0.5, 1), errors.AttributeError),
+        (lambda: adjustments.easing.cubic_bezier("0", 0, 0.5, 1), errors.TypeError),
+        (lambda: adjustments.easing.steps(0), errors.AttributeError),
+        (lambda: adjustments.easing.steps(2.0), errors.TypeError),
+        (lambda: adjustments.easing.Easing("spring"), errors.TypeError)
+    ]
+)
+def test_easing_invalid(make, exception):
+    with pytest.raises(exception):
+        make()
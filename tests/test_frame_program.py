@@ -0,0 +1,160 @@
+from functions import assemble_arguments, categorize
+from samples import empty, figure_eight, image_drawing, overlap, slide
+
+from scrivid import adjustments, create_image_reference, motion_tree, properties
+from scrivid._frame_plan import FrameKind, plan_frames
+from scrivid._frame_program import compile_program, DRAW, HOLD, ProgramRunner
+from scrivid._rendering import evaluate_frame
+from scrivid._separating_instructions import separate_instructions
+from scrivid.testing import generate_scene
+
+import pickle
+import random
+
+import pytest
+
+
+def _compile(instructions):
+    separated_instructions = separate_instructions(instructions)
+    return separated_instructions, compile_program(motion_tree.parse(separated_instructions), separated_instructions)
+
+
+def _evaluated_state(index, separated_instructions):
+    return sorted(
+        (layer, reference.ID, reference.x, reference.y)
+        for layer, references in evaluate_frame(index, separated_instructions).items()
+        for reference in references
+    )
+
+
+def _assert_matches_evaluation(separated_instructions, program):
+    runner = ProgramRunner(program)
+    drawn = 0
+    for span in runner:
+        if span.kind is FrameKind.HOLD:
+            continue
+        drawn += 1
+        placements = runner.placements()
+        state = sorted(
+            (separated_instructions.references[reference.ID].layer, reference.ID, x, y)
+            for reference, x, y in placements
+        )
+        assert state == _evaluated_state(span.index, separated_instructions)
+        # Drawn from the lowest layer up.
+        layers = [separated_instructions.references[reference.ID].layer for reference, _, _ in placements]
+        assert layers == sorted(layers)
+    assert drawn == program.drawn_frame_count
+
+
+@categorize(category="motion_tree")
+@pytest.mark.parametrize(
+    "sample_module",
+    assemble_arguments(
+        (empty,),
+        (figure_eight,),
+        (image_drawing,),
+        (overlap,),
+        (slide,)
+    )
+)
+def test_compile_samples(sample_module):
+    separated_instructions, program = _compile(sample_module.INSTRUCTIONS())
+    parsed_motion_tree = motion_tree.parse(separated_instructions)
+
+    assert list(program.spans()) == list(plan_frames(parsed_motion_tree))
+    assert program.frame_count == list(plan_frames(parsed_motion_tree))[-1].end
+    _assert_matches_evaluation(separated_instructions, program)
+
+
+@categorize(category="motion_tree")
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_compile_generated_scene(seed):
+    separated_instructions, program = _compile(generate_scene(30, 400, 60, (320, 240), seed))
+    assert list(program.spans()) == list(plan_frames(motion_tree.parse(separated_instructions)))
+    _assert_matches_evaluation(separated_instructions, program)
+
+
+@categorize(category="motion_tree")
+def test_compile_eased_scene():
+    instructions = [
+        create_image_reference("A", "", layer=1, scale=1, x=0, y=0),
+        create_image_reference("B", "", layer=2, scale=1, x=10, y=10),
+        adjustments.move.create("A", 0, properties.Properties(x=100), 10, easing="ease-in-out"),
+        adjustments.move.create("A", 4, properties.Properties(y=-30), 6, easing=adjustments.easing.steps(3)),
+        adjustments.move.create("B", 2, properties.Properties(x=-40, y=40), 8, easing="ease-out"),
+        adjustments.hide.create("B", 12),
+        adjustments.move.create("A", 14, properties.Properties(x=-100), 5)
+    ]
+    separated_instructions, program = _compile(instructions)
+    _assert_matches_evaluation(separated_instructions, program)
+
+    runner = ProgramRunner(program)
+    positions = {span.index: runner.placements()[0][1] for span in runner if span.kind is FrameKind.DRAW}
+    ease_in_out = adjustments.easing.EASE_IN_OUT.table(10)
+    for index in range(10):
+        assert positions[index] == (100 * ease_in_out[index] + (adjustments.easing.ONE >> 1)) >> 16
+
+
+@categorize(category="motion_tree")
+def test_compile_visibility_moves():
+    # The move hides A once it's done (at frame 8), but the show started after
+    # it, so A is still shown; the move of B keeps the video going.
+    hide = properties.VisibilityStatus.HIDE
+    instructions = [
+        create_image_reference("A", "", layer=1, scale=1, x=0, y=0),
+        create_image_reference("B", "", layer=2, scale=1, x=300, y=0),
+        adjustments.move.create("A", 2, properties.Properties(x=7, visibility=hide), 6),
+        adjustments.show.create("A", 4),
+        adjustments.move.create("B", 12, properties.Properties(x=1), 2)
+    ]
+    separated_instructions, program = _compile(instructions)
+    _assert_matches_evaluation(separated_instructions, program)
+
+    runner = ProgramRunner(program)
+    for span in runner:
+        if span.index in (12, 13):
+            assert [(reference.ID, x, y) for reference, x, y in runner.placements()][0] == ("A", 7, 0)
+
+
+@categorize(category="motion_tree")
+@pytest.mark.parametrize("seed", range(10))
+def test_compile_random_visibility_moves(seed):
+    rng = random.Random(seed)
+    visibilities = [properties.EXCLUDED, properties.VisibilityStatus.HIDE, properties.VisibilityStatus.SHOW]
+    instructions = [create_image_reference(ID, "", layer=ID, scale=1, x=0, y=0) for ID in range(3)]
+    for _ in range(12):
+        ID, time = rng.randrange(3), rng.randrange(20)
+        kind = rng.randrange(3)
+        if kind == 0:
+            change = properties.Properties(x=rng.randrange(-20, 20), visibility=rng.choice(visibilities))
+            instructions.append(adjustments.move.create(ID, time, change, rng.randrange(1, 10)))
+        elif kind == 1:
+            instructions.append(adjustments.hide.create(ID, time))
+        else:
+            instructions.append(adjustments.show.create(ID, time))
+    _assert_matches_evaluation(*_compile(instructions))
+
+
+def test_instructions():
+    _, program = _compile(figure_eight.INSTRUCTIONS())
+    instructions = list(program.instructions())
+    assert sum(len(instruction) for instruction in instructions) == len(program.code)
+    assert [instruction[1] for instruction in instructions if instruction[0] == DRAW] == list(range(0, 1)) + list(
+        range(6, 46)
+    )
+    assert [instruction[1] for instruction in instructions if instruction[0] == HOLD] == [5]
+
+
+def test_only_changes_are_emitted():
+    # Image drawing only hides and shows one image; the others are set once.
+    separated_instructions, program = _compile(image_drawing.INSTRUCTIONS())
+    sets = [instruction for instruction in program.instructions() if instruction[0] != DRAW]
+    assert len(sets) <= len(separated_instructions.references) + 2
+
+
+def test_pickle():
+    separated_instructions, program = _compile(generate_scene(10, 40, 24, (160, 90)))
+    copy = pickle.loads(pickle.dumps(program))
+    assert copy.code == program.code
+    assert [reference.ID for reference in copy.references] == [reference.ID for reference in program.references]
+    _assert_matches_evaluation(separated_instructions, copy)
@@ -0,0 +1,108 @@
+from functions import categorize
+from samples import slide
+
+import scrivid
+from scrivid.frame_store import RawFrameStore
+
+import pathlib
+import tempfile
+
+from PIL import Image
+import pytest
+
+
+@pytest.fixture
+def temp_dir():
+    with tempfile.TemporaryDirectory(prefix=".scrivid-cache-") as tempdir:
+        yield pathlib.Path(tempdir)
+
+
+def test_create_write_read(temp_dir):
+    frame = Image.new("RGB", (4, 2), (10, 20, 30))
+
+    with RawFrameStore.create(temp_dir / "frames.rgb", (4, 2), 12, 3) as store:
+        store.write(1, frame)
+
+        assert len(store) == 3
+        assert store.frame_size == 4 * 2 * 3
+        assert store.is_written(1)
+        assert not store.is_written(0)
+        assert store.read(1).tobytes() == frame.tobytes()
+
+    assert (temp_dir / "frames.rgb").stat().st_size == 3 * 4 * 2 * 3
+
+
+def test_reopen(temp_dir):
+    with RawFrameStore.create(temp_dir / "frames.rgb", (2, 2), 12, 4) as store:
+        store.write(2, bytes(range(12)))
+        store.write(3, bytes(range(12, 24)))
+
+    with RawFrameStore.open(temp_dir / "frames.rgb") as store:
+        assert store.window_size == (2, 2)
+        assert store.frame_rate == 12
+        assert [store.is_written(index) for index in range(4)] == [False, False, True, True]
+        assert store.read_bytes(3) == bytes(range(12, 24))
+
+
+def test_read_copies(temp_dir):
+    store = RawFrameStore.create(temp_dir / "frames.rgb", (2, 2), 12, 1)
+    store.write(0, bytes(range(12)))
+    data = store.read_bytes(0)
+    image = store.read(0)
+
+    # Neither holds on to the file, so the store can be closed with them.
+    store.close()
+    assert type(data) is bytes
+    assert data == bytes(range(12))
+    assert image.tobytes() == bytes(range(12))
+
+
+def test_read_view(temp_dir):
+    store = RawFrameStore.create(temp_dir / "frames.rgb", (2, 2), 12, 2)
+    store.write(1, bytes(range(12)))
+    view = store.read_view(1)
+    assert view.tobytes() == bytes(range(12))
+
+    with pytest.raises(scrivid.errors.AttributeError):
+        store.close()
+    assert store.is_opened
+
+    view.release()
+    store.close()
+    assert not store.is_opened
+
+    with RawFrameStore.open(temp_dir / "frames.rgb") as store:
+        assert store.is_written(1)
+        with store.read_view(1) as view:
+            assert view.tobytes() == bytes(range(12))
+
+
+def test_index_out_of_range(temp_dir):
+    with RawFrameStore.create(temp_dir / "frames.rgb", (2, 2), 12, 1) as store:
+        with pytest.raises(IndexError):
+            store.read(1)
+
+
+def test_write_wrong_size(temp_dir):
+    with RawFrameStore.create(temp_dir / "frames.rgb", (2, 2), 12, 1) as store:
+        with pytest.raises(scrivid.errors.AttributeError):
+            store.write(0, Image.new("RGB", (4, 4)))
+        with pytest.raises(scrivid.errors.AttributeError):
+            store.write(0, bytes(3))
+
+
+@categorize(category="sinks")
+def test_raw_frame_store_sink(temp_dir):
+    instructions, metadata = slide.ALL()
+    metadata.save_location = temp_dir
+    memory_sink = scrivid.sinks.MemorySink()
+    scrivid.compile_video(instructions, metadata, sink=memory_sink)
+
+    instructions, _ = slide.ALL()
+    store_sink = scrivid.sinks.RawFrameStoreSink()
+    scrivid.compile_video(instructions, metadata, sink=store_sink)
+
+    with RawFrameStore.open(temp_dir / f"{metadata.video_name}.rgb") as store:
+        assert len(store) == len(memory_sink.frames)
+        assert all(store.is_written(index) for index in range(len(store)))
+        assert store.read(20).tobytes() == memory_sink.frames[20].tobytes()
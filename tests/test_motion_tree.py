@@ -1,7 +1,13 @@
 from functions import assemble_arguments, categorize, unwrap_string
 from samples import empty, figure_eight, image_drawing, overlap, slide
 
-from scrivid import create_image_reference, errors, motion_tree
+from scrivid import adjustments, create_image_reference, errors, motion_tree, properties
+from scrivid._frame_plan import count_frames, FrameKind, plan_frames
+from scrivid._frame_program import compile_program, ProgramRunner
+from scrivid._separating_instructions import _handle_adjustment, separate_instructions, SeparatedInstructions
+from scrivid.testing import generate_scene
+
+import random
 
 import pytest
 
@@ -187,3 +193,476 @@ def test_walk(sample_module, expected_node_order):
     for actual, expected_node in zip(motion_tree.walk(parsed_motion_tree), expected_node_order):
         actual_node = type(actual)
         assert actual_node is expected_node
+
+
+@categorize(category="motion_tree")
+@pytest_parametrize(
+    "sample_module,expected_spans",
+    assemble_arguments(
+        (empty, [(0, 12, FrameKind.DRAW)]),
+        (figure_eight, [(0, 1, FrameKind.DRAW), (1, 5, FrameKind.HOLD), (6, 40, FrameKind.DRAW)]),
+        (image_drawing, [(0, 1, FrameKind.DRAW), (1, 19, FrameKind.HOLD), (20, 1, FrameKind.DRAW)]),
+        (overlap, [(0, 1, FrameKind.DRAW), (1, 11, FrameKind.HOLD), (12, 1, FrameKind.DRAW)]),
+        (slide, [(0, 37, FrameKind.DRAW)])
+    )
+)
+def test_plan_frames(sample_module, expected_spans):
+    parsed_motion_tree = motion_tree.parse(sample_module.INSTRUCTIONS())
+    actual = [(span.index, span.length, span.kind) for span in plan_frames(parsed_motion_tree)]
+    assert actual == expected_spans
+    assert count_frames(parsed_motion_tree) == expected_spans[-1][0] + expected_spans[-1][1]
+
+
+@categorize(category="motion_tree")
+@pytest_parametrize(
+    "sample_module",
+    assemble_arguments(
+        (empty,),
+        (figure_eight,),
+        (image_drawing,),
+        (overlap,),
+        (slide,)
+    )
+)
+def test_iterparse(sample_module):
+    parsed_motion_tree = motion_tree.parse(sample_module.INSTRUCTIONS())
+    nodes = motion_tree.iterparse(sample_module.INSTRUCTIONS())
+    assert [repr(node) for node in nodes] == [repr(node) for node in parsed_motion_tree.body]
+    assert count_frames(motion_tree.iterparse(sample_module.INSTRUCTIONS())) == count_frames(parsed_motion_tree)
+
+
+def test_iterparse_is_lazy():
+    separated_instructions = separate_instructions(generate_scene(50, 2_000, 100, seed=4))
+    nodes = motion_tree.iterparse(separated_instructions)
+    assert type(next(nodes)) is motion_tree.Start
+
+    # Nothing is copied out of the separated instructions, so changing them
+    # before the rest of the stream is read changes what it yields.
+    separated_instructions.adjustments.clear()
+    assert [type(node) for node in nodes] == [motion_tree.End]
+
+
+def test_iterparse_merges_in_order():
+    # Adjustments at the same time, for different IDs, come out in the order
+    # that their IDs were first seen.
+    separated_instructions = separate_instructions(generate_scene(200, 5_000, 60, seed=9))
+    nodes = list(motion_tree.iterparse(separated_instructions))
+
+    expected = sorted(
+        (adjustment for adjustments in separated_instructions.adjustments.values() for adjustment in adjustments),
+        key=lambda adjustment: adjustment.activation_time
+    )
+    actual = [node for node in nodes if hasattr(node, "id")]
+    assert [(node.id, node.time) for node in actual] == [
+        (adjustment.ID, adjustment.activation_time) for adjustment in expected
+    ]
+    assert count_frames(nodes) == 60
+
+
+@categorize(category="motion_tree")
+@pytest_parametrize(
+    "sample_module",
+    assemble_arguments(
+        (empty,),
+        (figure_eight,),
+        (image_drawing,),
+        (overlap,),
+        (slide,)
+    )
+)
+def test_serialize(sample_module):
+    parsed_motion_tree = motion_tree.parse(sample_module.INSTRUCTIONS())
+    expected = motion_tree.dump(parsed_motion_tree)
+
+    data = motion_tree.to_bytes(parsed_motion_tree)
+    assert motion_tree.dump(motion_tree.from_bytes(data)) == expected
+    assert len(data) < len(expected) // 4
+
+    text = motion_tree.to_json(parsed_motion_tree)
+    assert motion_tree.dump(motion_tree.from_json(text)) == expected
+
+
+def test_serialize_generated_scene():
+    # Integer IDs, and times that need more than one byte.
+    parsed_motion_tree = motion_tree.parse(generate_scene(300, 3_000, 500, seed=2))
+    expected = motion_tree.dump(parsed_motion_tree)
+    assert motion_tree.dump(motion_tree.from_bytes(motion_tree.to_bytes(parsed_motion_tree))) == expected
+    assert motion_tree.dump(motion_tree.from_json(motion_tree.to_json(parsed_motion_tree, indent=2))) == expected
+
+
+def test_serialize_unsupported_id():
+    instructions = [
+        create_image_reference(("tuple", 1), ""),
+        adjustments.hide.create(("tuple", 1), 0)
+    ]
+    parsed_motion_tree = motion_tree.parse(instructions)
+    with pytest.raises(errors.TypeError):
+        motion_tree.to_bytes(parsed_motion_tree)
+    with pytest.raises(errors.TypeError):
+        motion_tree.to_json(parsed_motion_tree)
+
+
+@pytest_parametrize(
+    "data",
+    [b"", b"NOPE", b"SCMT\x04", b"SCMT\x02\x00\x02\x0e", b"SCMT\x02\x00\x02\x04", b"SCMT\x02\x00\x00\x00"]
+)
+def test_from_bytes_invalid(data):
+    with pytest.raises(errors.DecodeError):
+        motion_tree.from_bytes(data)
+
+
+@pytest_parametrize(
+    "text",
+    ["", "[]", '{"version": 2, "body": []}', '{"version": 1, "body": [["Nothing"]]}',
+     '{"version": 1, "body": [["MoveImage", "A", 1]]}']
+)
+def test_from_json_invalid(text):
+    with pytest.raises(errors.DecodeError):
+        motion_tree.from_json(text)
+
+
+def test_parse_cache():
+    cache = motion_tree.ParseCache(maxsize=2)
+    first = motion_tree.parse(figure_eight.INSTRUCTIONS(), cache=cache)
+    second = motion_tree.parse(figure_eight.INSTRUCTIONS(), cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert motion_tree.dump(first) == motion_tree.dump(second) == motion_tree.dump(
+        motion_tree.parse(figure_eight.INSTRUCTIONS())
+    )
+
+    # The references are the ones that were just given.
+    instructions = figure_eight.INSTRUCTIONS()
+    third = motion_tree.parse(instructions, cache=cache)
+    references = [instruction for instruction in instructions if not hasattr(instruction, "activation_time")]
+    assert list(third._instructions.references.values()) == references
+    assert third.index.applied("BLOCK", 100) == first.index.applied("BLOCK", 100)
+
+    motion_tree.parse(slide.INSTRUCTIONS(), cache=cache)
+    motion_tree.parse(empty.INSTRUCTIONS(), cache=cache)
+    assert len(cache) == 2
+    motion_tree.parse(figure_eight.INSTRUCTIONS(), cache=cache)
+    assert cache.misses == 4
+
+    with pytest.raises(errors.DuplicateIDError):
+        motion_tree.parse([create_image_reference(0, ""), create_image_reference(0, "")], cache=cache)
+
+
+def test_parse_cache_key():
+    def instructions(x, easing="linear"):
+        return [
+            create_image_reference("A", "", layer=1, scale=1, x=0, y=0),
+            adjustments.move.create("A", 0, properties.Properties(x=x), 3, easing=easing),
+            adjustments.hide.create("A", 5)
+        ]
+
+    cache = motion_tree.ParseCache()
+    for arguments in [(1,), (1.0,), (True,), (1, "ease-in"), (2,)]:
+        cached = motion_tree.parse(instructions(*arguments), cache=cache)
+        assert motion_tree.dump(cached) == motion_tree.dump(motion_tree.parse(instructions(*arguments)))
+        assert type(cached._instructions.adjustments["A"][0].change.x) is type(arguments[0])
+    assert (cache.hits, cache.misses, len(cache)) == (0, 5, 5)
+    motion_tree.parse(instructions(1.0), cache=cache)
+    assert cache.hits == 1
+
+
+def _placements(parsed_motion_tree):
+    program = compile_program(parsed_motion_tree, parsed_motion_tree._instructions)
+    runner = ProgramRunner(program)
+    frames = []
+    for span in runner:
+        placements = [(reference.ID, x, y) for reference, x, y in runner.placements()]
+        frames.extend([placements] * span.length)
+    return frames
+
+
+@categorize(category="motion_tree")
+@pytest_parametrize(
+    "sample_module",
+    assemble_arguments(
+        (empty,),
+        (figure_eight,),
+        (image_drawing,),
+        (overlap,),
+        (slide,)
+    )
+)
+def test_optimize_samples(sample_module):
+    # The samples are already as simple as they can be.
+    parsed_motion_tree = motion_tree.parse(sample_module.INSTRUCTIONS())
+    optimized = motion_tree.optimize(parsed_motion_tree)
+    assert motion_tree.dump(optimized) == motion_tree.dump(parsed_motion_tree)
+    assert motion_tree.dump(motion_tree.parse(sample_module.INSTRUCTIONS(), optimize=True)) == \
+        motion_tree.dump(parsed_motion_tree)
+
+
+def test_optimize():
+    instructions = [
+        create_image_reference("A", "", layer=1, scale=1, x=0, y=0),
+        adjustments.move.create("A", 0, properties.Properties(x=10), 10),
+        adjustments.show.create("A", 5),
+        adjustments.move.create("A", 10, properties.Properties(x=20), 20),
+        adjustments.move.create("A", 40, properties.Properties(x=0, y=0), 5)
+    ]
+    parsed_motion_tree = motion_tree.parse(instructions)
+    optimized = motion_tree.optimize(parsed_motion_tree)
+
+    assert motion_tree.dump(optimized) == (
+        "VideoInstructions(body=[Start(), MoveImage(id='A', time=0, duration=30), InvokePrevious(length=31), "
+        "Continue(length=14), End()])"
+    )
+    assert count_frames(optimized) == count_frames(parsed_motion_tree) == 45
+    assert _placements(optimized) == _placements(parsed_motion_tree)
+    assert len(optimized.index) == 1
+
+
+def test_optimize_eased_moves():
+    # Eased moves don't move at the same speed throughout, so they're kept.
+    instructions = [
+        create_image_reference("A", "", layer=1, scale=1, x=0, y=0),
+        adjustments.move.create("A", 0, properties.Properties(x=10), 10, easing="ease-in"),
+        adjustments.move.create("A", 10, properties.Properties(x=20), 20, easing="ease-in")
+    ]
+    parsed_motion_tree = motion_tree.parse(instructions)
+    optimized = motion_tree.optimize(parsed_motion_tree)
+
+    assert len(optimized.index) == 2
+    assert _placements(optimized) == _placements(parsed_motion_tree)
+
+
+def test_optimize_nodes():
+    tree = motion_tree.VideoInstructions()
+    tree.body.extend([
+        motion_tree.Start(),
+        motion_tree.Continue(0),
+        motion_tree.Continue(2),
+        motion_tree.Continue(3),
+        motion_tree.InvokePrevious(1),
+        motion_tree.InvokePrevious(2),
+        motion_tree.InvokePrevious(0),
+        motion_tree.End()
+    ])
+    optimized = motion_tree.optimize(tree)
+    assert motion_tree.dump(optimized) == \
+        "VideoInstructions(body=[Start(), Continue(length=5), InvokePrevious(length=3), End()])"
+    assert list(plan_frames(optimized)) == list(plan_frames(tree))
+
+
+@pytest_parametrize("seed", [0, 1, 2])
+def test_optimize_generated_scene(seed):
+    parsed_motion_tree = motion_tree.parse(generate_scene(50, 800, 300, seed=seed))
+    optimized = motion_tree.optimize(parsed_motion_tree)
+    assert len(optimized.body) < len(parsed_motion_tree.body)
+    assert count_frames(optimized) == count_frames(parsed_motion_tree)
+    assert _placements(optimized) == _placements(parsed_motion_tree)
+
+
+def _random_adjustment(rng, ID_count, frame_count, longest_move=30):
+    time, ID, kind = rng.randrange(frame_count), rng.randrange(ID_count), rng.random()
+    if kind < 0.3:
+        return adjustments.hide.create(ID, time)
+    elif kind < 0.6:
+        return adjustments.show.create(ID, time)
+    else:
+        duration = rng.randrange(1, longest_move)
+        return adjustments.move.create(ID, time, properties.Properties(x=rng.randrange(-200, 200)), duration)
+
+
+@pytest_parametrize(
+    "seed,scene,longest_move",
+    [
+        (0, (8, 60, 120), 30),
+        (1, (8, 60, 120), 30),
+        (2, (8, 60, 120), 30),
+        # Few IDs and long moves, so that most edits land while moves (of
+        # their own ID or another) are still running.
+        *((seed, (3, 12, 40), 40) for seed in range(3, 13))
+    ]
+)
+def test_timeline_edits(seed, scene, longest_move):
+    rng = random.Random(seed)
+    ID_count, adjustment_count, frame_count = scene
+    instructions = [
+        *(create_image_reference(ID, "", layer=1, scale=1, x=0, y=0) for ID in range(ID_count)),
+        *(_random_adjustment(rng, ID_count, frame_count, longest_move) for _ in range(adjustment_count))
+    ]
+    timeline = motion_tree.Timeline(instructions if seed > 2 else generate_scene(*scene, seed=seed))
+
+    for _ in range(30):
+        # The tree shares the SeparatedInstructions that the edit changes, so
+        # its frames are worked out before the edit.
+        before = motion_tree.parse(timeline.instructions)
+        old_frames = _placements(before)
+        kind = rng.random()
+        if kind < 0.1 and timeline.instructions.adjustments:
+            # Every adjustment of an ID, after which it's added again after
+            # the other IDs.
+            *others, last = timeline.instructions.adjustments[rng.choice(list(timeline.instructions.adjustments))]
+            for adjustment in others:
+                timeline.remove(adjustment)
+            before = motion_tree.parse(timeline.instructions)
+            old_frames = _placements(before)
+            affected = timeline.remove(last)
+        elif kind < 0.5 and timeline.instructions.adjustments:
+            every_adjustment = [
+                adjustment for values in timeline.instructions.adjustments.values() for adjustment in values
+            ]
+            affected = timeline.remove(rng.choice(every_adjustment))
+        else:
+            affected = timeline.insert(_random_adjustment(rng, ID_count, frame_count + 30, longest_move))
+
+        after = motion_tree.parse(timeline.instructions)
+        assert motion_tree.dump(timeline.motion_tree) == motion_tree.dump(after)
+        # The same as parsing the instructions again from a list.
+        listed = [
+            *timeline.instructions.references.values(),
+            *(adjustment for values in timeline.instructions.adjustments.values() for adjustment in values)
+        ]
+        assert motion_tree.dump(timeline.motion_tree) == motion_tree.dump(motion_tree.parse(listed))
+        assert timeline.frame_count == count_frames(after)
+
+        # Every frame outside of the affected range stays the same.
+        frame_count = max(count_frames(before), timeline.frame_count)
+        new_frames = _placements(after)
+        old_frames += old_frames[-1:] * (frame_count - len(old_frames))
+        new_frames += new_frames[-1:] * (frame_count - len(new_frames))
+        assert all(
+            old_frames[index] == new_frames[index] for index in range(frame_count) if index not in affected
+        )
+
+
+def test_timeline_remove_every_adjustment_of_an_ID():
+    instructions = [
+        *(create_image_reference(ID, "", layer=1, scale=1, x=0, y=0) for ID in (0, 1)),
+        adjustments.move.create(0, 8, properties.Properties(x=10), 4),
+        adjustments.show.create(1, 8),
+        adjustments.hide.create(0, 20)
+    ]
+    timeline = motion_tree.Timeline(instructions)
+    timeline.remove(instructions[2])
+    timeline.remove(instructions[4])
+    assert list(timeline.instructions.adjustments) == [1]
+
+    # The ID now comes after the others, like it would in a new list.
+    timeline.insert(adjustments.hide.create(0, 8))
+    listed = [*instructions[:2], instructions[3], adjustments.hide.create(0, 8)]
+    assert repr(timeline.motion_tree.body) == repr(motion_tree.parse(listed).body)
+
+
+def test_timeline_local_range():
+    instructions = [
+        create_image_reference("A", "", layer=1, scale=1, x=0, y=0),
+        adjustments.hide.create("A", 10),
+        adjustments.show.create("A", 20),
+        adjustments.move.create("A", 100, properties.Properties(x=100), 50)
+    ]
+    timeline = motion_tree.Timeline(instructions)
+    assert timeline.frame_count == 150
+
+    affected = timeline.insert(adjustments.show.create("A", 15))
+    assert affected.start == 10 and affected.stop <= 22
+    assert timeline.insert(adjustments.show.create("A", 15)) == range(0)
+    assert timeline.remove(adjustments.show.create("A", 15)) == affected
+
+    # A move changes every frame after it.
+    assert timeline.insert(adjustments.move.create("A", 30, properties.Properties(y=5), 5)).stop == 150
+    assert len(timeline) == 4
+
+
+def test_timeline_range_after_stretched_move():
+    # The nodes of the move of 1 are held until frame 20, the end of the move
+    # of 2, so they're past the time of the hide.
+    instructions = [
+        *(create_image_reference(ID, "", layer=1, scale=1, x=0, y=0) for ID in (1, 2)),
+        adjustments.move.create(1, 0, properties.Properties(x=5), 5),
+        adjustments.move.create(2, 10, properties.Properties(x=20), 20)
+    ]
+    timeline = motion_tree.Timeline(instructions)
+    assert timeline.insert(adjustments.hide.create(2, 13)).start == 13
+    assert timeline.remove(adjustments.hide.create(2, 13)).start == 13
+
+
+def test_timeline_references():
+    timeline = motion_tree.Timeline(figure_eight.INSTRUCTIONS())
+    reference = create_image_reference("NEW", "")
+    assert timeline.insert(reference) == range(timeline.frame_count)
+    with pytest.raises(errors.DuplicateIDError):
+        timeline.insert(reference)
+    timeline.remove(reference)
+    assert "NEW" not in timeline.instructions.references
+
+    with pytest.raises(errors.AttributeError):
+        timeline.remove(reference)
+    with pytest.raises(errors.AttributeError):
+        timeline.remove(adjustments.hide.create("NOTHING", 0))
+
+
+@categorize(category="motion_tree")
+@pytest_parametrize(
+    "sample_module",
+    assemble_arguments(
+        (empty,),
+        (figure_eight,),
+        (image_drawing,),
+        (overlap,),
+        (slide,)
+    )
+)
+def test_columnar(sample_module):
+    parsed_motion_tree = motion_tree.parse(sample_module.INSTRUCTIONS())
+    columnar = motion_tree.parse(sample_module.INSTRUCTIONS(), columnar=True)
+
+    assert isinstance(columnar.body, motion_tree.ColumnarBody)
+    assert motion_tree.dump(columnar) == motion_tree.dump(parsed_motion_tree)
+    assert [repr(node) for node in motion_tree.walk(columnar)][1:] == \
+        [repr(node) for node in motion_tree.walk(parsed_motion_tree)][1:]
+    assert list(plan_frames(columnar)) == list(plan_frames(parsed_motion_tree))
+    assert motion_tree.to_bytes(columnar) == motion_tree.to_bytes(parsed_motion_tree)
+    assert _placements(columnar) == _placements(parsed_motion_tree)
+
+
+def test_columnar_body():
+    body = motion_tree.ColumnarBody([motion_tree.Start(), motion_tree.End()])
+    body.insert(1, motion_tree.MoveImage("A", 2, 5))
+    body.insert(1, motion_tree.Continue(2))
+    body.append(motion_tree.HideImage(("tuple", 1), 9))
+    assert repr(body) == (
+        "ColumnarBody([Start(), Continue(length=2), MoveImage(id='A', time=2, duration=5), End(), "
+        "HideImage(id=('tuple', 1), time=9)])"
+    )
+    assert body.ids == ["A", ("tuple", 1)]
+    assert list(body.tags) == [0, 2, 6, 1, 4]
+
+    del body[-1]
+    body[1] = motion_tree.InvokePrevious(3)
+    body[2:3] = [motion_tree.ShowImage("A", 2), motion_tree.ShowImage("B", 3)]
+    assert repr(body[1:4]) == "[InvokePrevious(length=3), ShowImage(id='A', time=2), ShowImage(id='B', time=3)]"
+    assert len(body) == 5
+    assert list(body.kinds()) == [
+        (motion_tree.Start, 0), (motion_tree.InvokePrevious, 3), (motion_tree.ShowImage, 0),
+        (motion_tree.ShowImage, 0), (motion_tree.End, 0)
+    ]
+
+    with pytest.raises(errors.TypeError):
+        body.append(motion_tree.VideoInstructions())
+
+
+def test_separate_instructions_stream():
+    instructions = generate_scene(20, 400, 50, seed=3)
+    # Adjustments at the same time as another of the same ID are ignored;
+    # the first one is kept.
+    instructions.append(adjustments.hide.create(0, 0))
+    instructions.append(adjustments.show.create(1, instructions[-2].activation_time))
+
+    separated_instructions = separate_instructions(instruction for instruction in instructions)
+    expected = SeparatedInstructions()
+    for instruction in instructions:
+        if hasattr(instruction, "activation_time"):
+            _handle_adjustment(expected, instruction)
+
+    assert list(separated_instructions.adjustments) == list(expected.adjustments)
+    assert {ID: [repr(value) for value in values] for ID, values in separated_instructions.adjustments.items()} == \
+        {ID: [repr(value) for value in values] for ID, values in expected.adjustments.items()}
+    assert list(separated_instructions.references) == list(range(20))
+    assert motion_tree.dump(motion_tree.parse(iter(instructions))) == motion_tree.dump(
+        motion_tree.parse(instructions)
+    )
@@ -0,0 +1,70 @@
+from functions import assemble_arguments
+from samples import empty, figure_eight, image_drawing, overlap, slide
+
+import scrivid
+from scrivid import _scene_store
+
+import pathlib
+
+import pytest
+
+
+# ALIAS
+parametrize = pytest.mark.parametrize
+
+
+@parametrize(
+    "sample_module,frame_count,drawn_frame_count,unique_frame_count,held_spans",
+    assemble_arguments(
+        (empty, 12, 12, 1, []),
+        (figure_eight, 46, 41, 39, [(1, 5)]),
+        (image_drawing, 21, 2, 2, [(1, 19)]),
+        (overlap, 13, 2, 1, [(1, 11)]),
+        (slide, 37, 37, 36, []),
+        id_convention=lambda args: f"{args[0].NAME()}"
+    )
+)
+def test_plan_frames(sample_module, frame_count, drawn_frame_count, unique_frame_count, held_spans):
+    instructions, metadata = sample_module.ALL()
+    metadata.save_location = pathlib.Path()
+    render_plan = scrivid.plan(instructions, metadata)
+
+    assert render_plan.frame_count == frame_count
+    assert render_plan.drawn_frame_count == drawn_frame_count
+    assert render_plan.unique_frame_count == unique_frame_count
+    assert render_plan.held_spans == held_spans
+    assert len(render_plan.pixels_per_frame) == drawn_frame_count
+
+
+def test_plan_does_not_decode_images():
+    instructions, metadata = image_drawing.ALL()
+    metadata.save_location = pathlib.Path()
+    render_plan = scrivid.plan(instructions, metadata)
+
+    references = [instruction for instruction in instructions if isinstance(instruction, scrivid.ImageReference)]
+    assert not any(reference.is_opened for reference in references)
+    # All five images are 255x255 RGB, kept as 4 bytes per pixel.
+    assert render_plan.asset_sizes == {ID: 255 * 255 * 4 for ID in ("TL", "TR", "BL", "BR", "HIDDEN")}
+    # The hidden image is only composited on the last frame.
+    assert render_plan.pixels_per_frame == {0: 4 * 255 * 255, 20: 5 * 255 * 255}
+
+
+def test_plan_peak_memory_grows_with_workers():
+    instructions, metadata = slide.ALL()
+    metadata.save_location = pathlib.Path()
+
+    serial = scrivid.plan(instructions, metadata).peak_memory
+    parallel = scrivid.plan(instructions, metadata, workers=4).peak_memory
+    assert 0 < serial < parallel
+
+
+@parametrize("sample_module", [figure_eight, slide])
+def test_plan_without_scene_store(monkeypatch, sample_module):
+    instructions, metadata = sample_module.ALL()
+    metadata.save_location = pathlib.Path()
+    expected = scrivid.plan(instructions, metadata)
+
+    monkeypatch.setattr(_scene_store, "is_available", lambda: False)
+    render_plan = scrivid.plan(sample_module.INSTRUCTIONS(), metadata)
+    assert render_plan.unique_frame_count == expected.unique_frame_count
+    assert render_plan.pixels_per_frame == expected.pixels_per_frame
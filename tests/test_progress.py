@@ -0,0 +1,106 @@
+from functions import categorize
+from samples import figure_eight, image_drawing
+
+import scrivid
+from scrivid import _ffmpeg
+
+import pathlib
+import sys
+import tempfile
+import time
+
+import pytest
+
+
+# ALIAS
+parametrize = pytest.mark.parametrize
+
+
+class AbortingSink(scrivid.sinks.NullSink):
+    __slots__ = ("aborted",)
+
+    def __init__(self):
+        super().__init__()
+        self.aborted = False
+
+    def abort(self):
+        self.aborted = True
+
+
+@pytest.fixture
+def temp_dir():
+    with tempfile.TemporaryDirectory(prefix=".scrivid-cache-") as tempdir:
+        yield pathlib.Path(tempdir)
+
+
+def test_progress_properties():
+    progress = scrivid.progress.Progress(100, 10, 5, 50, 2.0)
+    assert progress.fraction == 0.5
+    assert progress.fps == 25.0
+    # Five drawn frames are left, at 0.4 seconds each.
+    assert progress.eta == pytest.approx(2.0)
+
+    assert scrivid.progress.Progress(100, 10, 0, 0, 0.0).eta is None
+    assert scrivid.progress.Progress(100, 10, 10, 80, 2.0).eta == pytest.approx(0.5)
+    assert scrivid.progress.Progress(100, 10, 10, 100, 2.0).eta == 0.0
+
+
+@categorize(category="sinks")
+@parametrize("workers", [1, 2])
+def test_progress_callback(temp_dir, workers):
+    instructions, metadata = image_drawing.ALL()
+    metadata.save_location = temp_dir
+    reports = []
+    scrivid.compile_video(
+        instructions, metadata, sink=scrivid.sinks.NullSink(), workers=workers, progress=reports.append
+    )
+
+    # Once before the first frame, then after every frame.
+    assert len(reports) == 22
+    assert [report.frames_encoded for report in reports] == list(range(22))
+    assert reports[0].eta is None
+    assert (reports[-1].frames_rendered, reports[-1].frames_encoded) == (2, 21)
+    assert (reports[-1].drawn_frame_count, reports[-1].frame_count) == (2, 21)
+    assert reports[-1].eta == 0.0
+
+
+@categorize(category="sinks")
+@parametrize("workers", [1, 2])
+def test_cancellation(temp_dir, workers):
+    instructions, metadata = figure_eight.ALL()
+    metadata.save_location = temp_dir
+    sink = AbortingSink()
+    token = scrivid.progress.CancellationToken()
+
+    def cancel_after_five(progress):
+        if progress.frames_encoded == 5:
+            token.cancel()
+
+    with pytest.raises(scrivid.errors.CancelledError):
+        scrivid.compile_video(
+            instructions, metadata, sink=sink, workers=workers, progress=cancel_after_five, cancellation=token
+        )
+    assert sink.frame_count == 5
+    assert sink.aborted
+
+
+def test_cancelled_before_start(temp_dir):
+    instructions, metadata = image_drawing.ALL()
+    metadata.save_location = temp_dir
+    sink = AbortingSink()
+    token = scrivid.progress.CancellationToken()
+    token.cancel()
+
+    with pytest.raises(scrivid.errors.CancelledError):
+        scrivid.compile_video(instructions, metadata, sink=sink, cancellation=token)
+    assert sink.frame_count == 0
+
+
+def test_cancellation_kills_subprocess():
+    token = scrivid.progress.CancellationToken()
+    token.cancel()
+
+    start = time.perf_counter()
+    with pytest.raises(scrivid.errors.CancelledError):
+        _ffmpeg.run([sys.executable, "-c", "import time; time.sleep(30)"], token)
+    assert time.perf_counter() - start < 10
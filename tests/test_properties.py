@@ -1,4 +1,7 @@
-from scrivid import errors, ImageReference, properties
+from scrivid import adjustments, errors, ImageReference, properties
+
+import copy
+import pickle
 
 import pytest
 
@@ -173,3 +176,150 @@ def test_merge_invalid_type_ampersand_operator():
 
     with pytest.raises(errors.TypeError):
         a & b
+
+
+def _attributes(properties_):
+    return tuple(getattr(properties_, attr) for attr in properties.Properties.__slots__)
+
+
+_DELTAS = [
+    properties.Properties(x=1, y=-2),
+    properties.Properties(visibility=properties.VisibilityStatus.HIDE),
+    properties.Properties(layer=2, scale=0.5, x=3),
+    properties.Properties(visibility=properties.VisibilityStatus.SHOW, y=4)
+]
+
+
+@pytest.mark.parametrize("mode", [
+    properties.MergeMode.APPEND, properties.MergeMode.REPLACEMENT, properties.MergeMode.REVERSE_APPEND,
+    properties.MergeMode.REVERSE_REPLACEMENT
+])
+def test_merge_all(mode):
+    base = properties.create(layer=1, x=0)
+
+    expected = base
+    for delta in _DELTAS:
+        expected = expected.merge(delta, mode=mode)
+
+    assert _attributes(properties.merge_all(base, _DELTAS, mode=mode)) == _attributes(expected)
+    assert _attributes(properties.merge_all(base, iter(_DELTAS), mode=mode)) == _attributes(expected)
+    assert _attributes(properties.merge_all(base, [], mode=mode)) == _attributes(base)
+
+
+def test_merge_all_strict():
+    base = properties.Properties(x=1)
+
+    c = properties.merge_all(base, [properties.Properties(y=2), properties.Properties(x=1, layer=0)])
+    assert _attributes(c) == (0, properties.EXCLUDED, properties.EXCLUDED, 1, 2)
+
+    with pytest.raises(errors.ConflictingAttributesError):
+        properties.merge_all(base, [properties.Properties(y=2), properties.Properties(y=3)])
+
+
+def test_merge_all_invalid_type():
+    with pytest.raises(errors.TypeError):
+        properties.merge_all(
+            properties.Properties(x=1), [properties.Properties(x=1), object()], mode=properties.MergeMode.APPEND
+        )
+
+
+def test_merge_each():
+    bases = [properties.Properties(x=0), properties.Properties(x=10, y=10)]
+    merged = properties.merge_each(bases, [_DELTAS, _DELTAS[:1]], mode=properties.MergeMode.REVERSE_APPEND)
+
+    assert [(c.x, c.y, c.visibility) for c in merged] == [
+        (4, 2, properties.VisibilityStatus.SHOW), (11, 8, properties.EXCLUDED)
+    ]
+
+    with pytest.raises(errors.AttributeError):
+        properties.merge_each(bases, [_DELTAS])
+
+
+@pytest.mark.parametrize("mode", list(properties.MergeMode))
+def test_merge_function(mode):
+    a = properties.Properties(visibility=properties.VisibilityStatus.HIDE, x=1)
+    b = properties.Properties(x=1, y=2)
+
+    merge = properties.merge_function(mode)
+    assert merge is properties.merge_function(mode)
+    assert _attributes(merge(a, b)) == _attributes(a.merge(b, mode=mode))
+
+
+def test_frozen():
+    a = properties.FrozenProperties(layer=1, x=2)
+
+    with pytest.raises(errors.AttributeError):
+        a.x = 3
+    with pytest.raises(errors.AttributeError):
+        del a.x
+    assert a.x == 2
+
+    b = a.thaw()
+    b.x = 3
+    assert type(b) is properties.Properties
+    assert a.x == 2
+
+
+def test_frozen_equality():
+    a = properties.FrozenProperties(layer=1, x=2)
+    b = properties.FrozenProperties(layer=1, x=2)
+    c = properties.FrozenProperties(layer=1, y=2)
+
+    assert a == b
+    assert hash(a) == hash(b)
+    assert a != c
+    assert a != properties.Properties(layer=1, x=2)
+    assert {a: "a"}[b] == "a"
+
+
+def test_freeze_interning():
+    a = properties.Properties(visibility=properties.VisibilityStatus.HIDE)
+
+    assert a.freeze() is properties.HIDDEN
+    assert properties.freeze(properties.FrozenProperties(visibility=properties.VisibilityStatus.SHOW)) \
+        is properties.SHOWN
+    assert adjustments.hide.create("A", 1)._enact() is adjustments.hide.create("B", 2)._enact()
+    assert adjustments.show.create("A", 1)._enact() is properties.SHOWN
+
+    b = properties.Properties(x=5, y=-5).freeze()
+    assert b is properties.Properties(x=5, y=-5).freeze()
+    assert b.freeze() is b
+
+    with pytest.raises(errors.TypeError):
+        properties.freeze(object())
+
+
+def test_frozen_copies():
+    a = properties.Properties(layer=3, scale=0.5, x=5).freeze()
+
+    assert copy.copy(a) is a
+    assert copy.deepcopy(a) is a
+    assert pickle.loads(pickle.dumps(a)) is a
+    assert pickle.loads(pickle.dumps(properties.HIDDEN)) is properties.HIDDEN
+
+
+def test_frozen_merge():
+    a = properties.FrozenProperties(layer=1, x=2)
+    b = a.merge(properties.Properties(x=1), mode=properties.MergeMode.APPEND)
+
+    assert type(b) is properties.FrozenProperties
+    assert b == properties.FrozenProperties(layer=1, x=3)
+    assert properties.merge_all(a, [properties.SHOWN], mode=properties.MergeMode.REVERSE_APPEND) \
+        == properties.FrozenProperties(layer=1, visibility=properties.VisibilityStatus.SHOW, x=2)
+
+
+def test_freeze_keeps_types():
+    as_int = properties.freeze(properties.Properties(x=1, y=0))
+    as_float = properties.freeze(properties.Properties(x=1.0, y=False))
+    as_bool = properties.freeze(properties.Properties(x=True, y=0))
+
+    assert as_int is not as_float and as_int is not as_bool
+    assert (type(as_int.x), type(as_int.y)) == (int, int)
+    assert (type(as_float.x), type(as_float.y)) == (float, bool)
+    assert type(as_bool.x) is bool
+    assert as_int != as_float
+    assert properties.freeze(properties.Properties(x=1.0, y=False)) is as_float
+
+    # A frozen float move is still split like a float one.
+    move = adjustments.move.create("A", 0, properties.Properties(x=1.0).freeze(), 4)
+    assert move._enact(2).x == adjustments.move.create("A", 0, properties.Properties(x=1.0), 4)._enact(2).x
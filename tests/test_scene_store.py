@@ -0,0 +1,109 @@
+from functions import assemble_arguments
+from samples import empty, figure_eight, image_drawing, overlap, slide
+
+from scrivid import adjustments, create_image_reference, errors, motion_tree, properties
+from scrivid._rendering import evaluate_frame
+from scrivid._separating_instructions import separate_instructions
+from scrivid.testing import generate_scene
+
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+
+def _expected_rows(separated_instructions, index):
+    return sorted(
+        (
+            (reference.ID, layer, reference.x, reference.y, reference.scale)
+            for layer, references in evaluate_frame(index, separated_instructions).items()
+            for reference in references
+        ),
+        key=repr
+    )
+
+
+def _check_states(separated_instructions, indices):
+    store = separated_instructions.to_store()
+    states = list(store.states(indices))
+    assert [state.index for state in states] == list(indices)
+    for state in states:
+        assert sorted(state.rows(), key=repr) == _expected_rows(separated_instructions, state.index)
+
+
+@pytest.mark.parametrize(
+    "sample_module",
+    assemble_arguments(
+        (empty,),
+        (figure_eight,),
+        (image_drawing,),
+        (overlap,),
+        (slide,)
+    )
+)
+def test_states_samples(sample_module):
+    _check_states(separate_instructions(sample_module.INSTRUCTIONS()), range(50))
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_states_generated_scene(seed):
+    # Going back to an earlier frame starts the sweep again.
+    indices = [*range(0, 120, 3), 7, 8, 200]
+    _check_states(separate_instructions(generate_scene(30, 500, 120, seed=seed)), indices)
+
+
+def test_states_visibility():
+    instructions = [
+        create_image_reference("A", "", layer=1, scale=1, x=0, y=0),
+        create_image_reference("B", "", layer=2, scale=1, x=5, y=5),
+        # A move that hides the image once it's done, and a show that starts
+        # after it (and so wins, once both are in effect).
+        adjustments.move.create(
+            "A", 2, properties.Properties(x=7, visibility=properties.VisibilityStatus.HIDE), 6
+        ),
+        adjustments.show.create("A", 4),
+        adjustments.hide.create("B", 1),
+        adjustments.move.create("B", 3, properties.Properties(layer=-1, y=-3), 1),
+        adjustments.move.create("B", 5, properties.Properties(x=4, visibility=properties.VisibilityStatus.SHOW), 0)
+    ]
+    separated_instructions = separate_instructions(instructions)
+    _check_states(separated_instructions, range(12))
+
+    state = separated_instructions.to_store().state(5)
+    assert state.visible.tolist() == [True, True]
+    assert state.x.tolist() == [3, 9]
+    assert state.layer.tolist() == [1, 1]
+
+
+def test_store_columns():
+    separated_instructions = separate_instructions(generate_scene(10, 50, 30, seed=5))
+    store = motion_tree.parse(separated_instructions).to_store()
+
+    assert len(store) == 10
+    assert store.ids == list(range(10))
+    assert len(store.kinds) == 50
+    assert store.changes.shape == (50, 3)
+    assert store.kinds.dtype == numpy.uint8
+    assert len(motion_tree.VideoInstructions().to_store()) == 0
+
+
+@pytest.mark.parametrize(
+    "instructions",
+    [
+        [create_image_reference("A", "", layer=1, x=0.5, y=0)],
+        [
+            create_image_reference("A", "", layer=1, scale=1, x=0, y=0),
+            adjustments.move.create("A", 0, properties.Properties(scale=2), 4)
+        ],
+        [
+            create_image_reference("A", "", layer=1),
+            adjustments.move.create("A", 0, properties.Properties(x=2), 4)
+        ],
+        [
+            create_image_reference("A", "", layer=1, scale=1, x=0, y=0),
+            adjustments.move.create("A", 0, properties.Properties(x=2), 4, easing="ease-in")
+        ]
+    ]
+)
+def test_store_unsupported(instructions):
+    with pytest.raises(errors.TypeError):
+        separate_instructions(instructions).to_store()
@@ -0,0 +1,114 @@
+from functions import assemble_arguments, categorize
+from samples import empty, figure_eight, image_drawing, overlap, slide
+
+import scrivid
+
+import pathlib
+import tempfile
+
+import pytest
+
+
+# ALIAS
+parametrize = pytest.mark.parametrize
+
+
+class RecordingSink(scrivid.abc.Sink):
+    def __init__(self):
+        self.calls = []
+
+    def open(self, metadata, frame_count):
+        self.calls.append(("open", frame_count))
+
+    def write(self, index, frame):
+        self.calls.append(("write", index))
+
+    def close(self):
+        self.calls.append(("close",))
+
+
+@pytest.fixture
+def temp_dir():
+    with tempfile.TemporaryDirectory(prefix=".scrivid-cache-") as tempdir:
+        yield pathlib.Path(tempdir)
+
+
+@categorize(category="sinks")
+@parametrize(
+    "sample_module,frame_count",
+    assemble_arguments(
+        (empty, 12),
+        (figure_eight, 46),
+        (image_drawing, 21),
+        (overlap, 13),
+        (slide, 37),
+        id_convention=lambda args: f"{args[0].NAME()}"
+    )
+)
+def test_null_sink_frame_count(temp_dir, sample_module, frame_count):
+    instructions, metadata = sample_module.ALL()
+    metadata.save_location = temp_dir
+    sink = scrivid.sinks.NullSink()
+    scrivid.compile_video(instructions, metadata, sink=sink)
+    assert sink.frame_count == frame_count
+
+
+@categorize(category="sinks")
+def test_custom_sink_call_order(temp_dir):
+    instructions, metadata = slide.ALL()
+    metadata.save_location = temp_dir
+    sink = RecordingSink()
+    scrivid.compile_video(instructions, metadata, sink=sink)
+
+    assert sink.calls[0] == ("open", 37)
+    assert sink.calls[1:-1] == [("write", index) for index in range(37)]
+    assert sink.calls[-1] == ("close",)
+
+
+@categorize(category="sinks")
+def test_memory_sink_frames(temp_dir):
+    instructions, metadata = image_drawing.ALL()
+    metadata.save_location = temp_dir
+    sink = scrivid.sinks.MemorySink()
+    scrivid.compile_video(instructions, metadata, sink=sink)
+
+    assert len(sink.frames) == 21
+    assert all(frame.size == metadata.window_size for frame in sink.frames)
+    # The hidden image is only shown on the last frame.
+    assert sink.frames[0].tobytes() == sink.frames[19].tobytes()
+    assert sink.frames[19].tobytes() != sink.frames[20].tobytes()
+
+
+@categorize(category="sinks")
+@parametrize("format_,suffix", [("PNG", ".png"), ("RAW", ".rgb")])
+def test_image_sequence_sink(temp_dir, format_, suffix):
+    instructions, metadata = overlap.ALL()
+    metadata.save_location = temp_dir
+    sink = scrivid.sinks.ImageSequenceSink(format=format_)
+    scrivid.compile_video(instructions, metadata, sink=sink)
+
+    files = sorted(sink.directory.iterdir())
+    assert [file.name for file in files] == [f"{index:06d}{suffix}" for index in range(13)]
+
+
+def test_image_sequence_sink_invalid_format():
+    with pytest.raises(scrivid.errors.TypeError):
+        scrivid.sinks.ImageSequenceSink(format="GIF")
+
+
+def test_sink_abort_on_error(temp_dir):
+    class FailingSink(RecordingSink):
+        def write(self, index, frame):
+            raise RuntimeError
+
+        def abort(self):
+            self.calls.append(("abort",))
+
+    instructions, metadata = slide.ALL()
+    metadata.save_location = temp_dir
+    sink = FailingSink()
+
+    with pytest.raises(RuntimeError):
+        scrivid.compile_video(instructions, metadata, sink=sink)
+
+    assert sink.calls == [("open", 37), ("abort",)]
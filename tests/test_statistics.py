@@ -0,0 +1,93 @@
+from functions import categorize
+from samples import image_drawing, slide
+
+import scrivid
+
+import json
+import pathlib
+import tempfile
+
+import pytest
+
+
+# ALIAS
+parametrize = pytest.mark.parametrize
+
+
+@pytest.fixture
+def temp_dir():
+    with tempfile.TemporaryDirectory(prefix=".scrivid-cache-") as tempdir:
+        yield pathlib.Path(tempdir)
+
+
+@categorize(category="sinks")
+@parametrize("workers", [1, 2])
+def test_render_statistics(temp_dir, workers):
+    instructions, metadata = image_drawing.ALL()
+    metadata.save_location = temp_dir
+    statistics = scrivid.compile_video(instructions, metadata, sink=scrivid.sinks.NullSink(), workers=workers)
+
+    assert isinstance(statistics, scrivid.RenderStatistics)
+    assert (statistics.frame_count, statistics.drawn_frame_count, statistics.workers) == (21, 2, workers)
+    assert {"separate_instructions", "parse", "plan", "evaluate", "composite", "write", "close"} <= set(
+        statistics.stages
+    )
+    assert all(stage.wall >= 0 and stage.cpu >= 0 for stage in statistics.stages.values())
+    assert statistics.total.wall > 0
+
+    # Four images on the first frame, and the hidden one shown on the last;
+    # every image is 255x255.
+    assert [(frame.index, frame.references) for frame in statistics.frames] == [(0, 4), (20, 5)]
+    assert statistics.references_drawn == 9
+    assert statistics.pixels_composited == 9 * 255 * 255
+
+
+@categorize(category="sinks")
+def test_render_statistics_cache_counts(temp_dir):
+    instructions, metadata = slide.ALL()
+    metadata.save_location = temp_dir
+    statistics = scrivid.compile_video(instructions, metadata, sink=scrivid.sinks.NullSink())
+
+    # The one image is decoded once, and reused for every other drawn frame.
+    assert statistics.cache_misses == 1
+    assert statistics.cache_hits == statistics.drawn_frame_count - 1
+
+    render_plan = scrivid.plan(instructions, metadata)
+    assert statistics.pixels_composited == render_plan.composited_pixels
+
+
+@categorize(category="sinks")
+@parametrize("workers", [1, 2])
+def test_trace_file(temp_dir, workers):
+    instructions, metadata = image_drawing.ALL()
+    metadata.save_location = temp_dir
+    trace_file = temp_dir / "trace.json"
+    scrivid.compile_video(
+        instructions, metadata, sink=scrivid.sinks.NullSink(), workers=workers, trace_file=trace_file
+    )
+
+    events = json.loads(trace_file.read_text())["traceEvents"]
+    process_names = {event["args"]["name"] for event in events if event["ph"] == "M"}
+    assert process_names == {"scrivid"} | {f"render worker {worker}" for worker in range(workers if workers > 1 else 0)}
+
+    spans = [event for event in events if event["ph"] == "X"]
+    assert all(span["ts"] >= 0 and span["dur"] >= 0 for span in spans)
+    assert sorted(span["args"]["frame"] for span in spans if span["cat"] == "frame") == [0, 20]
+    # Every frame is written to the sink, held frames included.
+    assert len([span for span in spans if span["name"] == "write"]) == 21
+    assert {"parse", "evaluate", "composite", "close"} <= {span["name"] for span in spans}
+
+
+def test_trace_file_written_on_failure(temp_dir):
+    instructions, metadata = image_drawing.ALL()
+    metadata.save_location = temp_dir
+    trace_file = temp_dir / "trace.json"
+    token = scrivid.progress.CancellationToken()
+    token.cancel()
+
+    with pytest.raises(scrivid.errors.CancelledError):
+        scrivid.compile_video(
+            instructions, metadata, sink=scrivid.sinks.NullSink(), cancellation=token, trace_file=trace_file
+        )
+    names = {event["name"] for event in json.loads(trace_file.read_text())["traceEvents"]}
+    assert "parse" in names
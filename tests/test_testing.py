@@ -0,0 +1,79 @@
+from functions import categorize
+
+import scrivid
+from scrivid._frame_plan import count_frames
+
+import pathlib
+import pickle
+import tempfile
+
+import pytest
+
+
+def _scene_repr(instructions):
+    return [repr(instruction) for instruction in instructions]
+
+
+def test_generate_scene_is_deterministic():
+    a = scrivid.testing.generate_scene(20, 100, 48, (320, 240), 7)
+    b = scrivid.testing.generate_scene(20, 100, 48, (320, 240), 7)
+    c = scrivid.testing.generate_scene(20, 100, 48, (320, 240), 8)
+
+    assert _scene_repr(a) == _scene_repr(b)
+    assert _scene_repr(a) != _scene_repr(c)
+
+
+def test_generate_scene_counts():
+    instructions = scrivid.testing.generate_scene(50, 400, 60, (640, 360))
+
+    references = [instruction for instruction in instructions if isinstance(instruction, scrivid.ImageReference)]
+    adjustments = [instruction for instruction in instructions if isinstance(instruction, scrivid.abc.Adjustment)]
+    assert [reference.ID for reference in references] == list(range(50))
+    assert len(adjustments) == 400
+    assert {type(adjustment) for adjustment in adjustments} == {
+        scrivid.adjustments.core.HideAdjustment,
+        scrivid.adjustments.core.MoveAdjustment,
+        scrivid.adjustments.core.ShowAdjustment
+    }
+    assert count_frames(scrivid.motion_tree.parse(instructions)) == 60
+
+
+def test_generate_scene_large():
+    instructions = scrivid.testing.generate_scene(10_000, 20_000, 240)
+    assert count_frames(scrivid.motion_tree.parse(instructions)) == 240
+
+
+@pytest.mark.parametrize("arguments", [(0, 1, 1), (1, 1, 0), (2, 5, 2), (2, 0, 2)])
+def test_generate_scene_invalid(arguments):
+    with pytest.raises(scrivid.errors.AttributeError):
+        scrivid.testing.generate_scene(*arguments)
+
+
+def test_generated_image():
+    image = scrivid.testing.GeneratedImage((4, 3), (200, 100, 50))
+    assert isinstance(image, scrivid.file_access.FileAccess)
+    assert image.get_pixel_value((0, 0)) is None
+
+    image.open()
+    assert (image.get_image_width(), image.get_image_height()) == (4, 3)
+    assert image.get_pixel_value((1, 1)) == (200, 100, 50)
+    assert image.get_pixel_value((0, 0)) == (100, 50, 25)  # The outline.
+
+    copy = pickle.loads(pickle.dumps(image))
+    assert not copy.is_opened
+    assert copy.size == (4, 3)
+    image.close()
+
+
+@categorize(category="sinks")
+@pytest.mark.parametrize("workers", [1, 2])
+def test_render_generated_scene(workers):
+    instructions = scrivid.testing.generate_scene(30, 120, 12, (160, 90), 3)
+    with tempfile.TemporaryDirectory(prefix=".scrivid-cache-") as tempdir:
+        metadata = scrivid.Metadata(
+            frame_rate=12, save_location=pathlib.Path(tempdir), video_name="generated", window_size=(160, 90)
+        )
+        sink = scrivid.sinks.MemorySink()
+        scrivid.compile_video(instructions, metadata, sink=sink, workers=workers)
+
+    assert len(sink.frames) == 12
@@ -0,0 +1,143 @@
+from functions import categorize
+from samples import slide
+
+import scrivid
+from scrivid import _tuning
+from scrivid._frame_program import compile_program, ProgramRunner
+from scrivid._memory import MemoryBudget, read_header
+from scrivid._separating_instructions import separate_instructions
+
+import json
+import pathlib
+import tempfile
+
+import pytest
+
+
+class Workload:
+    def __init__(self, drawn_frames, frame_count, pixels, references, window_size):
+        self.drawn_frames = drawn_frames
+        self.frame_count = frame_count
+        self.pixels = pixels
+        self.references = references
+        self.window_size = window_size
+
+    @property
+    def canvas_pixels(self):
+        return self.window_size[0] * self.window_size[1]
+
+
+COST_MODEL = _tuning.CostModel(evaluate_seconds=1e-4, composite_seconds=1e-6, copy_seconds=1e-9)
+
+
+@pytest.fixture
+def cache_dir(monkeypatch):
+    with tempfile.TemporaryDirectory(prefix=".scrivid-cache-") as tempdir:
+        monkeypatch.setenv("SCRIVID_CACHE_DIR", tempdir)
+        yield pathlib.Path(tempdir)
+
+
+def test_choose_settings_small_workload():
+    workload = Workload(10, 10, 1000, 1, (100, 100))
+    workers, chunk_size, _ = _tuning.choose_settings(COST_MODEL, workload, cpu_count=8)
+
+    assert workers == 1
+    assert chunk_size == 10  # Never more than the worker's share of the frames.
+
+
+def test_choose_settings_large_workload():
+    workload = Workload(10_000, 12_000, 500_000, 50, (1920, 1080))
+    workers, chunk_size, queue_depth = _tuning.choose_settings(COST_MODEL, workload, cpu_count=8)
+
+    assert workers == 8
+    assert chunk_size == 1  # Each frame takes longer than a chunk needs to.
+    assert queue_depth == 16
+
+
+def test_choose_settings_chunks_cheap_frames():
+    workload = Workload(100_000, 100_000, 1000, 1, (100, 100))
+    workers, chunk_size, _ = _tuning.choose_settings(COST_MODEL, workload, cpu_count=4)
+
+    assert workers == 4
+    assert chunk_size > 1
+
+
+def test_choose_settings_keeps_specified_values():
+    workload = Workload(10_000, 12_000, 500_000, 50, (1920, 1080))
+    settings = _tuning.choose_settings(COST_MODEL, workload, cpu_count=8, chunk_size=3, queue_depth=5)
+    assert settings[1:] == (3, 5)
+
+
+def test_cost_model_cache_round_trip(cache_dir):
+    path = _tuning.cache_file()
+    assert path.parent == cache_dir
+    assert _tuning.load_cost_model(path) is None
+
+    _tuning.store_cost_model(path, COST_MODEL)
+    loaded = _tuning.load_cost_model(path)
+    assert loaded.to_dict() == COST_MODEL.to_dict()
+
+
+def test_cost_model_cache_ignores_other_versions(cache_dir):
+    path = _tuning.cache_file()
+    path.write_text(json.dumps({"version": -1, "machines": {}}))
+    assert _tuning.load_cost_model(path) is None
+
+
+@categorize(category="sinks")
+def test_compile_video_auto_workers(cache_dir):
+    instructions, metadata = slide.ALL()
+    metadata.save_location = cache_dir
+    sink = scrivid.sinks.NullSink()
+    scrivid.compile_video(instructions, metadata, sink=sink, workers="auto")
+
+    assert sink.frame_count == 37
+    assert _tuning.load_cost_model(_tuning.cache_file()) is not None
+    # Calibrating leaves the images of the instructions closed.
+    assert not any(getattr(instruction, "is_opened", False) for instruction in instructions)
+
+
+def _program(sample_module):
+    separated_instructions = separate_instructions(sample_module.INSTRUCTIONS())
+    return compile_program(scrivid.motion_tree.parse(separated_instructions), separated_instructions)
+
+
+def test_calibrate_runs_the_program():
+    program = _program(slide)
+    cost_model, pixels = _tuning.calibrate(program, (100, 100))
+
+    assert cost_model.evaluate_seconds > 0
+    assert cost_model.composite_seconds > 0
+    assert pixels == _tuning._average_pixels(program)
+
+    # The pixels are those of the placements that the render draws.
+    runner = ProgramRunner(program)
+    for span in runner:
+        expected = sum(
+            width * height for (width, height), _ in (read_header(reference) for reference, _, _ in runner.placements())
+        )
+        break
+    assert pixels == expected
+
+
+def test_calibrate_closes_images():
+    program = _program(slide)
+    for reference in program.references:
+        reference.close()
+    budget = MemoryBudget()
+    _tuning.calibrate(program, (100, 100), budget)
+
+    # The images were counted against the budget, and closed afterwards.
+    assert budget.peak > 100 * 100 * 3
+    assert budget.usage == 0
+    assert not any(reference.is_opened for reference in program.references)
+
+
+def test_average_pixels_reads_headers():
+    program = _program(slide)
+    for reference in program.references:
+        reference.close()
+
+    assert _tuning._average_pixels(program) > 0
+    # The sizes come from the headers; no image is decoded.
+    assert not any(reference.is_opened for reference in program.references)
@@ -0,0 +1,181 @@
+from functions import assemble_arguments, categorize
+from samples import image_drawing, slide
+
+import scrivid
+from scrivid import _memory, _rendering
+
+import pathlib
+import tempfile
+
+from PIL import Image
+import pytest
+
+
+# ALIAS
+parametrize = pytest.mark.parametrize
+
+
+def test_canvas_pool_reuses_buffer():
+    pool = _rendering.CanvasPool((4, 4))
+
+    canvas = pool.acquire(0)
+    image = canvas.image
+    canvas.set_pixel((1, 1), (0, 0, 0))
+    pool.release(canvas)
+
+    canvas = pool.acquire(1)
+    assert canvas.image is image
+    assert canvas.index == 1
+    # The reused buffer is cleared back to the background.
+    assert canvas.image.tobytes() == Image.new("RGB", (4, 4), (255, 255, 255)).tobytes()
+
+    pool.release(canvas)
+    pool.close()
+
+
+def test_canvas_pool_capacity():
+    pool = _rendering.CanvasPool((4, 4), capacity=1)
+
+    a = pool.acquire(0)
+    b = pool.acquire(1)
+    assert a.image is not b.image
+
+    pool.release(a)
+    pool.release(b)
+    assert pool.acquire(2).image is a.image
+    pool.close()
+
+
+def test_asset_cache_evicts_least_recently_used():
+    instructions, _ = image_drawing.ALL()
+    a, b, c = [instruction for instruction in instructions if isinstance(instruction, scrivid.ImageReference)][:3]
+    # Every image is 255x255 RGB, kept as 4 bytes per pixel.
+    budget = _memory.MemoryBudget(2 * 255 * 255 * 4)
+    cache = _memory.AssetCache(budget)
+
+    cache.get(a)
+    cache.get(b)
+    cache.get(a)
+    cache.get(c)  # Evicts `b`, the least recently used.
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 3, 1)
+    assert len(cache) == 2
+    assert budget.usage == budget.limit
+    # The references themselves are left closed.
+    assert not any(reference.is_opened for reference in (a, b, c))
+
+    cache.get(a)
+    assert cache.hits == 2
+
+    cache.close()
+    assert budget.usage == 0
+
+
+def test_asset_cache_image_larger_than_budget():
+    instructions, _ = image_drawing.ALL()
+    a, b = [instruction for instruction in instructions if isinstance(instruction, scrivid.ImageReference)][:2]
+    budget = _memory.MemoryBudget(1)
+    cache = _memory.AssetCache(budget)
+
+    assert cache.get(a).is_opened
+    assert len(cache) == 0
+    cache.get(b)
+    assert cache.misses == 2
+    cache.close()
+    assert budget.usage == 0
+
+
+@pytest.fixture
+def temp_dir():
+    with tempfile.TemporaryDirectory(prefix=".scrivid-cache-") as tempdir:
+        yield pathlib.Path(tempdir)
+
+
+def _render(sample_module, save_location, **kwargs):
+    instructions, metadata = sample_module.ALL()
+    metadata.save_location = save_location
+    sink = scrivid.sinks.MemorySink()
+    scrivid.compile_video(instructions, metadata, sink=sink, **kwargs)
+    return [frame.tobytes() for frame in sink.frames]
+
+
+@categorize(category="sinks")
+@parametrize(
+    "sample_module",
+    assemble_arguments(
+        (image_drawing,),
+        (slide,),
+        id_convention=lambda args: f"{args[0].NAME()}"
+    )
+)
+@parametrize("workers,chunk_size,queue_depth", [(2, 1, None), (3, 4, 2), (2, 2, 1)])
+def test_parallel_render_matches_serial(temp_dir, sample_module, workers, chunk_size, queue_depth):
+    expected = _render(sample_module, temp_dir)
+    actual = _render(sample_module, temp_dir, workers=workers, chunk_size=chunk_size, queue_depth=queue_depth)
+    assert actual == expected
+
+
+@categorize(category="sinks")
+def test_parallel_render_worker_failure(temp_dir):
+    instructions = (
+        scrivid.create_image_reference("MISSING", temp_dir / "missing.png", layer=1, x=0, y=0),
+    )
+    metadata = scrivid.Metadata(frame_rate=12, save_location=temp_dir, video_name="missing", window_size=(10, 10))
+
+    with pytest.raises(FileNotFoundError):
+        scrivid.compile_video(instructions, metadata, sink=scrivid.sinks.NullSink(), workers=2)
+
+
+@parametrize("name,value", [("workers", 0), ("chunk_size", -1), ("queue_depth", 1.5), ("workers", True)])
+def test_invalid_concurrency_settings(temp_dir, name, value):
+    instructions, metadata = slide.ALL()
+    metadata.save_location = temp_dir
+
+    with pytest.raises(scrivid.errors.TypeError):
+        scrivid.compile_video(instructions, metadata, sink=scrivid.sinks.NullSink(), **{name: value})
+
+
+@categorize(category="sinks")
+@parametrize(
+    "workers,memory_limit",
+    [
+        (1, 2 * 660 * 660 * 4 + 660 * 660 * 3 + 2 * 255 * 255 * 4),
+        (2, 660 * 660 * 3 + 2 * (660 * 660 * 3 + 255 * 255 * 4)),
+        (2, 10_000_000)
+    ]
+)
+def test_render_with_memory_limit(temp_dir, workers, memory_limit):
+    expected = _render(image_drawing, temp_dir)
+    actual = _render(image_drawing, temp_dir, workers=workers, memory_limit=memory_limit)
+    assert actual == expected
+
+    instructions, metadata = image_drawing.ALL()
+    metadata.save_location = temp_dir
+    render_plan = scrivid.plan(instructions, metadata, workers=workers, memory_limit=memory_limit)
+    assert render_plan.peak_memory <= memory_limit
+
+
+def test_memory_limit_too_small(temp_dir):
+    instructions, metadata = image_drawing.ALL()
+    metadata.save_location = temp_dir
+
+    with pytest.raises(scrivid.errors.AttributeError):
+        scrivid.compile_video(instructions, metadata, sink=scrivid.sinks.NullSink(), memory_limit=1_000_000)
+    with pytest.raises(scrivid.errors.TypeError):
+        scrivid.compile_video(instructions, metadata, sink=scrivid.sinks.NullSink(), memory_limit=0)
+
+
+@categorize(category="sinks")
+@parametrize("workers", [1, 2])
+def test_render_with_parse_cache(temp_dir, workers):
+    expected = _render(slide, temp_dir)
+    cache = scrivid.motion_tree.ParseCache()
+
+    assert _render(slide, temp_dir, workers=workers, parse_cache=cache) == expected
+    assert _render(slide, temp_dir, workers=workers, parse_cache=cache) == expected
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@categorize(category="sinks")
+@parametrize("sample_module", [image_drawing, slide])
+def test_render_optimized(temp_dir, sample_module):
+    assert _render(sample_module, temp_dir, optimize=True) == _render(sample_module, temp_dir)